@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Compare VinScrapper browser backends against the local stand-in site.
+
+For every backend it measures:
+    startup  driver resolution, browser start and first page load, over --starts runs.
+    lookups  --lookups selenium lookups on one warm session, lookups/sec and stages.
+    memory   peak RSS of the backend's driver/browser process tree.
+
+Results are saved under benchmarks/results/ like run_benchmarks.py, a run with
+failed lookups exits with status 1.
+"""
+import argparse
+import datetime
+import json
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from run_benchmarks import RESULTS_DIR, git_revision, plates, warn_errors  # noqa: E402
+from stub_site import StubSite  # noqa: E402
+from vin_scrapper import StageMetrics, VinScrapper  # noqa: E402
+
+
+def scrapper_for(args, site, browser, metrics):
+    return VinScrapper(
+        url=site.url,
+        engine="selenium",
+        browser=browser,
+        headless=not args.no_headless,
+        metrics=metrics,
+        no_coalesce=True,
+        log_level=args.log_level,
+    )
+
+
+def tree_rss(scrapper):
+    tracker = getattr(scrapper.driver, "process_tracker", None)
+    return tracker.rss() if tracker is not None else 0
+
+
+def bench_startup(args, site, browser):
+    metrics = StageMetrics()
+    seconds = []
+    for _ in range(args.starts):
+        scrapper = scrapper_for(args, site, browser, metrics)
+        start = time.perf_counter()
+        try:
+            scrapper.open_site(headless=not args.no_headless)
+            seconds.append(time.perf_counter() - start)
+        finally:
+            scrapper.close_session()
+    return {
+        "runs": len(seconds),
+        "mean_seconds": round(sum(seconds) / len(seconds), 4) if seconds else None,
+        "stages": metrics.summary(),
+    }
+
+
+def bench_lookups(args, site, browser):
+    metrics = StageMetrics()
+    scrapper = scrapper_for(args, site, browser, metrics)
+    errors = 0
+    peak_rss = 0
+    start = time.perf_counter()
+    try:
+        for licence_number, location in plates(args.lookups):
+            try:
+                scrapper.lookup(licence_number, location)
+            except Exception:
+                errors += 1
+            peak_rss = max(peak_rss, tree_rss(scrapper))
+        elapsed = time.perf_counter() - start
+    finally:
+        scrapper.close_session()
+    return {
+        "lookups": args.lookups,
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "lookups_per_sec": round(args.lookups / elapsed, 3) if elapsed else None,
+        "peak_rss_mb": round(peak_rss / 2 ** 20, 1),
+        "stages": metrics.summary(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--browsers", default="firefox,chromium", help="Comma separated backends."
+    )
+    parser.add_argument("--starts", type=int, default=3)
+    parser.add_argument("--lookups", type=int, default=20)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="Stub GraphQL latency in seconds."
+    )
+    parser.add_argument("--no-headless", action="store_true")
+    parser.add_argument("--output", help="Results file, defaults to benchmarks/results/.")
+    parser.add_argument("--loglevel", dest="log_level", default="ERROR")
+    args = parser.parse_args()
+
+    report = {
+        "revision": git_revision(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "latency": args.latency,
+        "backends": {},
+    }
+    with StubSite(latency=args.latency) as site:
+        for browser in args.browsers.split(","):
+            browser = browser.strip()
+            startup = bench_startup(args, site, browser)
+            lookups = bench_lookups(args, site, browser)
+            report["backends"][browser] = {"startup": startup, "lookups": lookups}
+            print(
+                f"{browser:<9} startup {startup['mean_seconds']}s, "
+                f"{lookups['lookups_per_sec']} lookups/s, {lookups['errors']} errors, "
+                f"peak RSS {lookups['peak_rss_mb']} MB"
+            )
+
+    output = pathlib.Path(
+        args.output
+        or RESULTS_DIR
+        / f"backends-{report['date'].replace(':', '')}-{report['revision']}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=4, sort_keys=True))
+    print(f"Saved {output}")
+    return warn_errors(
+        {
+            browser: result["lookups"]["errors"]
+            for browser, result in report["backends"].items()
+            if result["lookups"]["errors"]
+        }
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
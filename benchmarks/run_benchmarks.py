@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""End to end VinScrapper benchmarks against the local stand-in site.
+
+Modes:
+    single      a new VinScrapper per lookup, including browser start and close.
+    batch       one VinScrapper reused for every lookup.
+    concurrent  VinScrapper.lookup_many with --concurrency sessions.
+
+Each mode reports lookups/sec, per-stage latency and the peak RSS of this process
+plus its children (browsers, drivers). Results are saved under
+benchmarks/results/ and can be compared with an earlier run via --compare.
+A run with failed lookups is still saved, but exits with status 1.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import pathlib
+import subprocess
+import sys
+import threading
+import time
+
+import psutil
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from stub_site import StubSite  # noqa: E402
+from vin_scrapper import StageMetrics, VinScrapper  # noqa: E402
+
+RESULTS_DIR = pathlib.Path(__file__).resolve().parent / "results"
+
+
+class PeakRSS:
+    """Sample the RSS of this process tree on a background thread."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        process = psutil.Process()
+        total = 0
+        for proc in [process] + process.children(recursive=True):
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                pass
+        self.peak = max(self.peak, total)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._sample()
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def plates(count):
+    """`count` distinct plates, 7 characters so they are valid in every state."""
+    states = ["CA", "NY", "TX", "FL", "WA"]
+    return [(f"BN{i:05d}", states[i % len(states)]) for i in range(count)]
+
+
+def warn_errors(errors):
+    """Tell on stderr that a run had failed lookups, whose timings are not comparable.
+
+    Returns:
+        int: Exit status, 1 if there were errors.
+    """
+    if not errors:
+        return 0
+    print(
+        "WARNING failed lookups, the numbers above are not comparable: "
+        + ", ".join(f"{name} {count}" for name, count in errors.items()),
+        file=sys.stderr,
+    )
+    return 1
+
+
+def scrapper_kwargs(args, site, metrics):
+    return {
+        "url": site.url,
+        "engine": args.engine,
+        "browser": args.browser,
+        "headless": not args.no_headless,
+        "metrics": metrics,
+        "log_level": args.log_level,
+    }
+
+
+def run_single(args, site, metrics):
+    errors = 0
+    for licence_number, location in plates(args.lookups):
+        scrapper = VinScrapper(**scrapper_kwargs(args, site, metrics))
+        try:
+            scrapper.lookup(licence_number, location)
+        except Exception:
+            errors += 1
+        finally:
+            scrapper.close_session()
+    return errors
+
+
+def run_batch(args, site, metrics):
+    errors = 0
+    scrapper = VinScrapper(**scrapper_kwargs(args, site, metrics))
+    try:
+        for licence_number, location in plates(args.lookups):
+            try:
+                scrapper.lookup(licence_number, location)
+            except Exception:
+                errors += 1
+    finally:
+        scrapper.close_session()
+    return errors
+
+
+def run_concurrent(args, site, metrics):
+    scrapper = VinScrapper(**scrapper_kwargs(args, site, metrics))
+
+    async def consume():
+        errors = 0
+        async for result in scrapper.lookup_many(
+            plates(args.lookups), concurrency=args.concurrency
+        ):
+            errors += "error" in result
+        return errors
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(consume())
+    finally:
+        loop.close()
+        scrapper.close_session()
+
+
+MODES = {"single": run_single, "batch": run_batch, "concurrent": run_concurrent}
+
+
+def run_mode(mode, args):
+    metrics = StageMetrics()
+    with StubSite(latency=args.latency) as site, PeakRSS() as rss:
+        start = time.perf_counter()
+        errors = MODES[mode](args, site, metrics)
+        elapsed = time.perf_counter() - start
+    return {
+        "lookups": args.lookups,
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "lookups_per_sec": round(args.lookups / elapsed, 3) if elapsed else None,
+        "peak_rss_mb": round(rss.peak / 2 ** 20, 1),
+        "graphql_requests": site.graphql_requests,
+        "stages": metrics.summary(),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=pathlib.Path(__file__).resolve().parent,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(previous, current):
+    for mode, result in current["modes"].items():
+        before = previous.get("modes", {}).get(mode)
+        if not before or not before.get("lookups_per_sec"):
+            continue
+        change = result["lookups_per_sec"] / before["lookups_per_sec"] - 1
+        print(
+            f"{mode:<11} {before['lookups_per_sec']:>9.3f} -> "
+            f"{result['lookups_per_sec']:>9.3f} lookups/s ({change:+.1%}), "
+            f"peak RSS {before['peak_rss_mb']} -> {result['peak_rss_mb']} MB"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--modes", default="single,batch,concurrent", help="Comma separated modes."
+    )
+    parser.add_argument("--engine", choices=["http", "selenium"], default="selenium")
+    parser.add_argument("--browser", choices=["firefox", "chromium"], default="firefox")
+    parser.add_argument("--lookups", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="Stub GraphQL latency in seconds."
+    )
+    parser.add_argument("--no-headless", action="store_true")
+    parser.add_argument("--compare", help="Earlier results file to compare against.")
+    parser.add_argument("--output", help="Results file, defaults to benchmarks/results/.")
+    parser.add_argument("--loglevel", dest="log_level", default="ERROR")
+    args = parser.parse_args()
+
+    report = {
+        "revision": git_revision(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "engine": args.engine,
+        "browser": args.browser,
+        "latency": args.latency,
+        "concurrency": args.concurrency,
+        "modes": {},
+    }
+    for mode in args.modes.split(","):
+        mode = mode.strip()
+        report["modes"][mode] = result = run_mode(mode, args)
+        print(
+            f"{mode:<11} {result['lookups_per_sec']} lookups/s, "
+            f"{result['errors']} errors, peak RSS {result['peak_rss_mb']} MB"
+        )
+        for stage, stats in sorted(result["stages"].items()):
+            print(
+                f"    {stage:<15} n={stats['count']:<5} p50={stats['p50']:.4f}s "
+                f"p95={stats['p95']:.4f}s p99={stats['p99']:.4f}s errors={stats['errors']}"
+            )
+
+    output = pathlib.Path(
+        args.output
+        or RESULTS_DIR / f"{report['date'].replace(':', '')}-{report['revision']}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=4, sort_keys=True))
+    print(f"Saved {output}")
+
+    if args.compare:
+        compare(json.loads(pathlib.Path(args.compare).read_text()), report)
+    return warn_errors(
+        {
+            mode: result["errors"]
+            for mode, result in report["modes"].items()
+            if result["errors"]
+        }
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Local stand-in for the vehiclehistory.com licence plate search.
+
+Serves a page with the same hooks VinScrapper relies on (licence plate inputs,
+state dropdown, search button and `SummaryTopMenu-vin`) plus a stub `/graphql`
+endpoint answering the `licensePlate` query after a configurable latency.
+
+The page lives under `/vehiclehistory/` so VinScrapper picks its vehiclehistory
+selectors for it.
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+SEARCH_PATH = "/vehiclehistory/license-plate-search"
+NOT_FOUND_PLATES = {"NOTFND", "UNKNOWN"}
+
+STATES = {
+    "AL": "Alabama", "AK": "Alaska", "AZ": "Arizona", "AR": "Arkansas",
+    "CA": "California", "CO": "Colorado", "CT": "Connecticut", "DE": "Delaware",
+    "DC": "District of Columbia", "FL": "Florida", "GA": "Georgia", "HI": "Hawaii",
+    "ID": "Idaho", "IL": "Illinois", "IN": "Indiana", "IA": "Iowa", "KS": "Kansas",
+    "KY": "Kentucky", "LA": "Louisiana", "ME": "Maine", "MD": "Maryland",
+    "MA": "Massachusetts", "MI": "Michigan", "MN": "Minnesota", "MS": "Mississippi",
+    "MO": "Missouri", "MT": "Montana", "NE": "Nebraska", "NV": "Nevada",
+    "NH": "New Hampshire", "NJ": "New Jersey", "NM": "New Mexico", "NY": "New York",
+    "NC": "North Carolina", "ND": "North Dakota", "OH": "Ohio", "OK": "Oklahoma",
+    "OR": "Oregon", "PA": "Pennsylvania", "RI": "Rhode Island",
+    "SC": "South Carolina", "SD": "South Dakota", "TN": "Tennessee", "TX": "Texas",
+    "UT": "Utah", "VT": "Vermont", "VA": "Virginia", "WA": "Washington",
+    "WV": "West Virginia", "WI": "Wisconsin", "WY": "Wyoming",
+}
+
+VIN_ALPHABET = "0123456789ABCDEFGHJKLMNPRSTUVWXYZ"
+VIN_VALUES = dict(zip("0123456789", range(10)))
+VIN_VALUES.update(zip("ABCDEFGH", range(1, 9)))
+VIN_VALUES.update(zip("JKLMN", range(1, 6)))
+VIN_VALUES.update({"P": 7, "R": 9})
+VIN_VALUES.update(zip("STUVWXYZ", range(2, 10)))
+VIN_WEIGHTS = (8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2)
+
+
+def fake_vin(licence_number, state):
+    """Deterministic VIN, with a valid check digit, for a plate."""
+    digest = hashlib.sha256(f"{licence_number}:{state}".upper().encode()).digest()
+    chars = ["1", "H", "G"] + [VIN_ALPHABET[b % len(VIN_ALPHABET)] for b in digest[:14]]
+    total = sum(VIN_VALUES[c] * w for c, w in zip(chars, VIN_WEIGHTS))
+    chars[8] = "X" if total % 11 == 10 else str(total % 11)
+    return "".join(chars)
+
+
+def search_page():
+    options = "\n".join(
+        f'        <div id="list-item-231-{i}" data-code="{code}" class="item">{name}</div>'
+        for i, (code, name) in enumerate(STATES.items())
+    )
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<title>License Plate Search</title>
+<style>
+  #state-menu {{ display: none; max-height: 150px; overflow-y: auto; }}
+  #state-menu.open {{ display: block; }}
+  .item {{ padding: 4px; cursor: pointer; }}
+</style>
+</head>
+<body>
+<div id="app">
+  <div>
+    <div>
+      <div class="Search-licensePlate">
+        <div><input id="input-98" data-cy="license-plate-txt-field" type="text"></div>
+        <div class="VhSelect--light">
+          <div><div><div>
+            <div>State</div>
+            <div></div>
+            <div><div id="state-select" tabindex="0">Select a state</div></div>
+          </div></div></div>
+        </div>
+        <div><button id="search" type="button">Search</button></div>
+      </div>
+      <div id="state-menu" tabindex="0">
+{options}
+      </div>
+    </div>
+  </div>
+</div>
+<div id="summary"></div>
+<script>
+  const menu = document.getElementById("state-menu");
+  const select = document.getElementById("state-select");
+  let state = null;
+  select.addEventListener("click", () => {{ menu.classList.add("open"); menu.focus(); }});
+  for (const item of menu.querySelectorAll(".item")) {{
+    item.addEventListener("click", () => {{
+      state = item.dataset.code;
+      select.textContent = item.textContent;
+      menu.classList.remove("open");
+    }});
+  }}
+  document.getElementById("search").addEventListener("click", async () => {{
+    const number = document.getElementById("input-98").value;
+    const response = await fetch("/graphql", {{
+      method: "POST",
+      headers: {{"Content-Type": "application/json"}},
+      body: JSON.stringify({{
+        operationName: "licensePlate",
+        variables: {{number: number, state: state}},
+        query: "query licensePlate {{ licensePlate {{ vin }} }}",
+      }}),
+    }});
+    const body = await response.json();
+    const plate = body.data.licensePlate;
+    document.getElementById("summary").innerHTML = plate
+      ? `<div class="SummaryTopMenu-vin">VIN: ${{plate.vin}}</div>`
+      : `<div class="SummaryTopMenu-missing">No vehicle found</div>`;
+  }});
+</script>
+</body>
+</html>
+"""
+
+
+class StubSiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    graphql_requests = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        body = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.split("?")[0] == SEARCH_PATH:
+            self._send(200, search_page(), "text/html; charset=utf-8")
+        else:
+            self._send(404, "Not found", "text/plain")
+
+    def do_POST(self):
+        if self.path.split("?")[0] != "/graphql":
+            self._send(404, "Not found", "text/plain")
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        variables = payload.get("variables") or {}
+        number = str(variables.get("number") or "").upper()
+        state = str(variables.get("state") or "").upper()
+        type(self).graphql_requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if state not in STATES:
+            body = {"errors": [{"message": f"Unknown state: {state}"}]}
+        elif not number or number in NOT_FOUND_PLATES:
+            body = {"data": {"licensePlate": None}}
+        else:
+            body = {
+                "data": {
+                    "licensePlate": {
+                        "vin": fake_vin(number, state),
+                        "__typename": "LicensePlate",
+                    }
+                }
+            }
+        self._send(200, json.dumps(body), "application/json")
+
+
+class StubSiteServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubSite:
+    """
+    Run the stand-in site on a background thread.
+
+    Usage:
+        with StubSite(latency=0.05) as site:
+            VinScrapper(url=site.url, ...)
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0):
+        handler = type("Handler", (StubSiteHandler,), {"latency": latency})
+        self.server = StubSiteServer((host, port), handler)
+        self.handler = handler
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def url(self):
+        return self.base_url + SEARCH_PATH
+
+    @property
+    def graphql_requests(self):
+        return self.handler.graphql_requests
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds added to every GraphQL answer."
+    )
+    args = parser.parse_args()
+    with StubSite(args.host, args.port, args.latency) as site:
+        print(f"Serving {site.url} (GraphQL at {site.base_url}/graphql)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -28,6 +28,11 @@ REQUIRED = [
     "webdriver-manager==2.4.0",
 ]
 
+EXTRAS = {
+    # Natively async HTTP lookups for vin_scrapper.aio
+    "async": ["aiohttp"],
+}
+
 REQUIRES_PYTHON = ">=3.6.0"
 URL = "https://github.com/mmphego/vin_scrapper"
 VERSION = None
@@ -114,6 +119,7 @@ setup(
         include=["vin_scrapper"], exclude=["tests", "*.tests", "*.tests.*", "tests.*"],
     ),
     install_requires=REQUIRED,
+    extras_require=EXTRAS,
     include_package_data=True,
     scripts=SCRIPTS,
     license="BSD license",
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+import json
+import pathlib
+import sys
+import urllib.error
+import urllib.request
+
+import pytest
+from seleniumwire.proxy.client import AdminClient
+from seleniumwire.webdriver.request import InspectRequestsMixin
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "benchmarks"))
+
+from stub_site import StubSite  # noqa: E402
+from vin_scrapper.backends import seleniumwire_options  # noqa: E402
+
+
+@pytest.fixture
+def stub_site():
+    """The local stand-in site, with its stub GraphQL endpoint."""
+    with StubSite() as site:
+        yield site
+
+
+class WireProxy(InspectRequestsMixin):
+    """The seleniumwire proxy of a driver, without the browser."""
+
+    def __init__(self):
+        self._client = AdminClient()
+        host, port = self._client.create_proxy(options=seleniumwire_options())
+        proxy = f"http://{host}:{port}"
+        self._opener = urllib.request.build_opener(
+            urllib.request.ProxyHandler({"http": proxy, "https": proxy})
+        )
+
+    def fetch(self, url, payload=None):
+        """(status, body) of a GET, or of a JSON POST when there is a payload."""
+        data = None if payload is None else json.dumps(payload).encode()
+        request = urllib.request.Request(
+            url, data, {"Content-Type": "application/json"} if data else {}
+        )
+        try:
+            with self._opener.open(request, timeout=10) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as err:
+            return err.code, err.read()
+
+    def close(self):
+        self._client.destroy_proxy()
+
+
+@pytest.fixture
+def wire():
+    """A seleniumwire proxy, requests are sent through it with `fetch`."""
+    proxy = WireProxy()
+    yield proxy
+    proxy.close()
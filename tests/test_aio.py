@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+import time
+
+from vin_scrapper.aio import lookup_many
+
+
+class FakeSession:
+    """Stands in for a selenium VinScrapper session."""
+
+    cache = None
+    no_cache = True
+    refresh_cache = None
+    engine = "selenium"
+    graphql_url = None
+    proxy = None
+    _timeout = 60
+    rate_controller = None
+    single_flight = None
+    validate = False
+    url = "http://stub/search"
+
+    def __init__(self, created):
+        self.closed = False
+        created.append(self)
+
+    def lookup(self, licence_number, location, engine=None):
+        if licence_number.startswith("SLOW"):
+            time.sleep(0.3)
+        if licence_number.startswith("BAD"):
+            raise ValueError(f"Cannot look up {licence_number}")
+        return {"VIN Number": f"VIN-{licence_number}"}
+
+    def close_session(self):
+        self.closed = True
+
+
+def collect(pairs, factory, concurrency=2, timeout=None, template=None):
+    async def run():
+        return [
+            result
+            async for result in lookup_many(
+                factory,
+                pairs,
+                concurrency=concurrency,
+                timeout=timeout,
+                template=template,
+            )
+        ]
+
+    return asyncio.run(asyncio.wait_for(run(), 10))
+
+
+def test_failed_lookups_give_their_session_back():
+    created = []
+    pairs = [("BAD1", "CA"), ("BAD2", "CA"), ("BAD3", "CA"), ("GOOD1", "CA")]
+    results = collect(pairs, lambda: FakeSession(created))
+    by_plate = {result["licence_number"]: result for result in results}
+    assert len(results) == 4
+    assert by_plate["BAD1"]["error_class"] == "ValueError"
+    assert by_plate["GOOD1"]["VIN Number"] == "VIN-GOOD1"
+    assert len(created) <= 2
+
+
+def test_a_failing_factory_gives_its_slot_back():
+    created = []
+    calls = []
+    lock = threading.Lock()
+
+    def factory():
+        with lock:
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError("Browser did not start")
+        return FakeSession(created)
+
+    pairs = [(f"GOOD{i}", "CA") for i in range(6)]
+    results = collect(pairs, factory, concurrency=2)
+    assert len(results) == 6
+    assert sum("error" in result for result in results) <= 1
+    assert len(calls) >= 3
+
+
+def test_sessions_are_closed_at_the_end():
+    created = []
+    template = FakeSession(created)
+    collect([("GOOD1", "CA"), ("GOOD2", "CA")], lambda: FakeSession(created))
+    assert all(session.closed for session in created if session is not template)
+
+
+def test_a_slow_lookup_does_not_close_the_callers_session():
+    created = []
+    template = FakeSession(created)
+    pairs = [("SLOW1", "CA"), ("GOOD1", "CA"), ("GOOD2", "CA")]
+    results = collect(
+        pairs, lambda: FakeSession(created), concurrency=1, timeout=0.1, template=template
+    )
+    by_plate = {result["licence_number"]: result for result in results}
+    assert by_plate["SLOW1"]["error_class"] == "LookupTimeout"
+    assert by_plate["GOOD2"]["VIN Number"] == "VIN-GOOD2"
+    assert not template.closed
+    # Given back once the slow lookup was done, no other session was needed.
+    assert created == [template]
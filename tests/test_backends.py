@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+from types import SimpleNamespace
+
+from selenium.webdriver import ChromeOptions
+from selenium.webdriver.remote.remote_connection import RemoteConnection
+
+from vin_scrapper import backends
+from vin_scrapper.backends import ChromiumBackend, set_command_timeout
+
+
+class FakeChrome:
+    def __init__(self, executable_path=None, options=None):
+        self.executable_path = executable_path
+        self.options = options
+        self.command_executor = RemoteConnection("http://127.0.0.1:9", keep_alive=True)
+
+
+def test_chromium_gets_the_backend_timeout(monkeypatch):
+    monkeypatch.setattr(
+        backends,
+        "webdriver",
+        SimpleNamespace(Chrome=FakeChrome, ChromeOptions=ChromeOptions),
+    )
+    driver = ChromiumBackend(timeout=7).launch("chromedriver")
+    assert driver.command_executor._timeout == 7
+    assert driver.command_executor._conn.connection_pool_kw["timeout"] == 7
+
+
+def test_command_timeout_is_per_driver():
+    driver = SimpleNamespace(
+        command_executor=RemoteConnection("http://127.0.0.1:9", keep_alive=False)
+    )
+    set_command_timeout(driver, 3)
+    assert driver.command_executor._timeout == 3
+    assert RemoteConnection.get_timeout() is None
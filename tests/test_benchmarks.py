@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+
+from run_benchmarks import plates, warn_errors
+from stub_site import NOT_FOUND_PLATES, fake_vin
+from vin_scrapper.vin import validate_plates, validate_vin
+
+
+def test_benchmark_and_stub_plates_are_valid():
+    pairs = plates(50) + [(plate, "CA") for plate in NOT_FOUND_PLATES]
+    assert validate_plates(pairs) == [None] * len(pairs)
+    for plate, state in plates(5):
+        assert validate_vin(fake_vin(plate, state))
+
+
+def test_benchmarks_fail_on_errors(capsys):
+    assert warn_errors({}) == 0
+    assert warn_errors({"batch": 3}) == 1
+    assert "batch 3" in capsys.readouterr().err
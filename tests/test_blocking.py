@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+import re
+from collections import Counter
+
+from vin_scrapper.blocking import (
+    BLOCKED_URL,
+    FONTS,
+    IMAGES,
+    TRACKERS,
+    BlockingPolicy,
+)
+
+URLS = (
+    "https://www.vehiclehistory.com/",
+    "https://www.vehiclehistory.com/img/logo.PNG?v=2",
+    "https://www.vehiclehistory.com/fonts/roboto.woff2",
+    "https://www.vehiclehistory.com/app.js",
+    "https://www.vehiclehistory.com/graphql",
+    "https://www.google-analytics.com/analytics.js",
+    "https://stats.g.doubleclick.net:443/collect",
+    "https://notdoubleclick.net/app.js",
+)
+
+
+def rewrite(rules, url):
+    """Where seleniumwire 1.0 sends a url: the first matching rule wins."""
+    for pattern, replacement in rules:
+        modified, count = re.subn(pattern, replacement, url)
+        if count:
+            return modified
+    return url
+
+
+def test_rewrite_rules_block_what_the_policy_classifies():
+    policy = BlockingPolicy()
+    rules = policy.rewrite_rules()
+    for url in URLS:
+        category = policy.classify(url)
+        expected = url if category is None else BLOCKED_URL + category
+        assert rewrite(rules, url) == expected
+
+
+def test_requests_are_blocked_through_seleniumwire(wire, stub_site):
+    BlockingPolicy().install(wire)
+
+    assert wire.fetch(stub_site.base_url + "/logo.png")[0] == 502
+    assert wire.fetch("http://www.google-analytics.com/analytics.js")[0] == 502
+    assert wire.fetch(stub_site.url)[0] == 200
+
+    assert wire.blocked_requests == Counter()
+    assert BlockingPolicy().count(wire) == Counter({IMAGES: 1, TRACKERS: 1})
+
+
+class ProbedDriver:
+    """A driver whose page references two images and a font."""
+
+    def __init__(self, blocked=None):
+        if blocked is not None:
+            self.blocked_requests = blocked
+
+    def execute_script(self, script, *args):
+        return {"images": 2, "fonts": 1}, 1024
+
+
+def test_referenced_resources_are_not_reported_as_blocked():
+    report = BlockingPolicy().report(ProbedDriver())
+    assert report["requests_blocked"] == 0
+    assert report["bytes_saved_estimate"] == 0
+    assert report["resources_referenced"] == {IMAGES: 2, FONTS: 1}
+
+
+def test_blocked_requests_are_reported_once():
+    policy = BlockingPolicy()
+    driver = ProbedDriver(blocked=Counter({IMAGES: 3}))
+    report = policy.report(driver)
+    assert report["requests_blocked"] == 3
+    assert report["by_category"] == {IMAGES: 3}
+    assert policy.report(driver)["requests_blocked"] == 0
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from vin_scrapper.cache import ResultCache, cache_key
+from vin_scrapper.vin_scrapper import VinScrapper
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"))
+    yield cache
+    cache.close()
+
+
+def test_cache_key_normalizes_plates():
+    assert cache_key(" 7abc-123", "ca ") == ("7ABC123", "CA")
+
+
+def test_put_then_get(cache):
+    cache.put("7ABC123", "CA", {"VIN Number": "1HGCM82633A004352"})
+    assert cache.get("7abc 123", "ca") == {"VIN Number": "1HGCM82633A004352"}
+    assert cache.stats()["hits"] == 1
+
+
+def test_expired_entries_miss(cache):
+    cache.put("7ABC123", "CA", {"VIN Number": "1HGCM82633A004352"}, ttl=-1)
+    assert cache.get("7ABC123", "CA") is None
+    assert len(cache) == 0
+    assert cache.stats()["misses"] == 1
+
+
+def test_results_without_a_vin_use_the_negative_ttl(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"), negative_ttl=-1)
+    cache.put("UNKNOWN", "CA", {"VIN Number": ""})
+    assert cache.get("UNKNOWN", "CA") is None
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"), max_entries=2)
+    cache.put("AAA1", "CA", {"VIN Number": "1"})
+    cache.put("AAA2", "CA", {"VIN Number": "2"})
+    cache.get("AAA1", "CA")
+    cache.put("AAA3", "CA", {"VIN Number": "3"})
+    assert cache.get("AAA2", "CA") is None
+    assert cache.get("AAA1", "CA") is not None
+    assert cache.stats()["evictions"] == 1
+    cache.close()
+
+
+def test_cache_survives_reopening(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    cache = ResultCache(path)
+    cache.put("7ABC123", "CA", {"VIN Number": "1HGCM82633A004352"})
+    cache.close()
+    cache = ResultCache(path)
+    assert cache.get("7ABC123", "CA") == {"VIN Number": "1HGCM82633A004352"}
+    cache.close()
+
+
+def test_an_empty_cache_is_shared_with_clones(cache):
+    assert len(cache) == 0
+    scrapper = VinScrapper(url="http://stub/search", cache=cache)
+    assert scrapper.cache is cache
+    assert scrapper.clone().cache is cache
+
+
+def test_lookups_are_answered_from_the_cache(stub_site, cache):
+    scrapper = VinScrapper(url=stub_site.url, cache=cache, log_level="ERROR")
+    try:
+        first = scrapper.lookup("7ABC123", "CA")
+        second = scrapper.lookup("7ABC123", "CA")
+    finally:
+        scrapper.close_session()
+    assert first == second
+    assert stub_site.graphql_requests == 1
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+import gzip
+import json
+import zlib
+from types import SimpleNamespace
+
+import pytest
+
+from vin_scrapper.capture import CaptureMiss, captured_licence_plate, decode_body
+
+ANSWER = json.dumps({"data": {"licensePlate": {"vin": "1HGCM82633A004352"}}}).encode()
+QUERY = json.dumps(
+    {"operationName": "licensePlate", "variables": {"number": "7ABC123", "state": "CA"}}
+).encode()
+
+
+def captured(body, encoding):
+    """A seleniumwire 1.0 driver that captured one licensePlate exchange."""
+    response = SimpleNamespace(
+        status_code=200, headers={"Content-Encoding": encoding}, body=body
+    )
+    request = SimpleNamespace(
+        method="POST",
+        path="https://www.vehiclehistory.com/graphql",
+        headers={},
+        body=QUERY,
+        response=response,
+    )
+    return SimpleNamespace(requests=[request])
+
+
+@pytest.mark.parametrize(
+    "body, encoding",
+    [
+        (gzip.compress(ANSWER), "gzip"),
+        (zlib.compress(ANSWER), "deflate"),
+        # seleniumwire 1.0 already decoded these, the header still says otherwise.
+        (ANSWER, "gzip"),
+        (ANSWER, "deflate"),
+        (ANSWER, "identity"),
+    ],
+)
+def test_decode_body_handles_wire_and_decoded_bodies(body, encoding):
+    assert decode_body(body, encoding) == ANSWER
+
+
+def test_unsupported_encoding_is_a_miss():
+    with pytest.raises(CaptureMiss):
+        decode_body(ANSWER, "compress")
+
+
+def test_captured_answer_under_a_stale_gzip_header():
+    driver = captured(ANSWER, "gzip")
+    assert captured_licence_plate(driver, "7abc123", "ca") == {
+        "vin": "1HGCM82633A004352"
+    }
+    with pytest.raises(CaptureMiss):
+        captured_licence_plate(driver, "7ABC124", "CA")
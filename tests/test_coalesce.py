@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from vin_scrapper.coalesce import SingleFlight
+
+
+def test_concurrent_threads_share_one_call():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def lookup(plate):
+        calls.append(plate)
+        release.wait(5)
+        return {"VIN Number": f"VIN-{plate}"}
+
+    with ThreadPoolExecutor(4) as executor:
+        futures = [
+            executor.submit(flights.do, ("7ABC123", "CA"), lookup, "7ABC123")
+            for _ in range(4)
+        ]
+        while flights.stats()["executed"] + flights.stats()["coalesced"] < 4:
+            time.sleep(0.01)
+        release.set()
+        results = [future.result(5) for future in futures]
+    assert calls == ["7ABC123"]
+    assert results == [{"VIN Number": "VIN-7ABC123"}] * 4
+    assert flights.stats() == {"executed": 1, "coalesced": 3, "in_flight": 0}
+
+
+def test_errors_are_shared_and_not_cached():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise ValueError("no page")
+
+    with ThreadPoolExecutor(2) as executor:
+        leader = executor.submit(flights.do, "key", failing)
+        started.wait(5)
+        follower = executor.submit(flights.do, "key", failing)
+        while flights.stats()["coalesced"] < 1:
+            time.sleep(0.01)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(ValueError):
+                future.result(5)
+    assert flights.do("key", lambda: "fresh") == "fresh"
+    assert flights.stats()["executed"] == 2
+
+
+def test_async_callers_join_the_same_flight():
+    flights = SingleFlight()
+    calls = []
+
+    async def lookup(plate):
+        calls.append(plate)
+        await asyncio.sleep(0.05)
+        return plate
+
+    async def scenario():
+        return await asyncio.gather(
+            *(flights.do_async("key", lookup, "7ABC123") for _ in range(5))
+        )
+
+    assert asyncio.run(scenario()) == ["7ABC123"] * 5
+    assert calls == ["7ABC123"]
+    assert flights.stats()["coalesced"] == 4
+
+
+def test_async_callers_join_a_thread_flight():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def lookup():
+        release.wait(5)
+        return "from thread"
+
+    with ThreadPoolExecutor(1) as executor:
+        leader = executor.submit(flights.do, "key", lookup)
+        while flights.stats()["executed"] < 1:
+            time.sleep(0.01)
+
+        async def scenario():
+            follower = asyncio.ensure_future(flights.do_async("key", lookup))
+            await asyncio.sleep(0.05)
+            release.set()
+            return await follower
+
+        assert asyncio.run(scenario()) == "from thread"
+        assert leader.result(5) == "from thread"
+    assert flights.stats()["executed"] == 1
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+import pytest
+
+from vin_scrapper.driver_pool import DriverPool, DriverPoolExhausted
+from vin_scrapper.vin_scrapper import VinScrapper
+
+
+class FakeDriver:
+    def __init__(self):
+        self.crashed = False
+        self.quit_calls = 0
+        self.visited = []
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def execute_script(self, script, *args):
+        if self.crashed:
+            raise RuntimeError("Browser is gone")
+        return "complete"
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+@pytest.fixture
+def pool():
+    started = []
+
+    def factory():
+        started.append(FakeDriver())
+        return started[-1]
+
+    pool = DriverPool(factory, url="http://stub/search", size=1)
+    pool.started = started
+    yield pool
+    pool.close()
+
+
+def test_released_drivers_are_reused(pool):
+    driver = pool.lease(timeout=1)
+    pool.release(driver)
+    assert pool.lease(timeout=1) is driver
+    assert len(pool.started) == 1
+    assert driver.visited == ["http://stub/search", "http://stub/search"]
+
+
+def test_lease_times_out_when_every_driver_is_leased(pool):
+    pool.lease(timeout=1)
+    start = time.monotonic()
+    with pytest.raises(DriverPoolExhausted):
+        pool.lease(timeout=0.2)
+    assert time.monotonic() - start >= 0.2
+
+
+def test_discard_wakes_a_waiting_lease(pool):
+    driver = pool.lease(timeout=1)
+    leased = []
+    waiter = threading.Thread(target=lambda: leased.append(pool.lease(timeout=10)))
+    start = time.monotonic()
+    waiter.start()
+    time.sleep(0.1)
+    pool.discard(driver)
+    waiter.join(5)
+    assert leased and leased[0] is not driver
+    assert time.monotonic() - start < 2
+    assert driver.quit_calls == 1
+
+
+def test_crashed_drivers_are_replaced(pool):
+    driver = pool.lease(timeout=1)
+    pool.release(driver)
+    driver.crashed = True
+    replacement = pool.lease(timeout=1)
+    assert replacement is not driver
+    assert driver.quit_calls == 1
+    assert len(pool) == 1
+
+
+def test_closed_pool_refuses_leases(pool):
+    pool.close()
+    with pytest.raises(RuntimeError):
+        pool.lease(timeout=1)
+
+
+def test_an_empty_pool_is_shared_with_clones(pool):
+    assert len(pool) == 0
+    scrapper = VinScrapper(url="http://stub/search", driver_pool=pool)
+    assert scrapper.driver_pool is pool
+    assert scrapper.clone().driver_pool is pool
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+
+from stub_site import fake_vin
+from vin_scrapper.farm import WorkerFarm, WorkerFarmFailed, worker_filename
+
+
+def test_farm_spreads_lookups_over_workers(stub_site):
+    pairs = [(f"7ABC12{i}", "CA") for i in range(4)]
+    with WorkerFarm(
+        workers=2, poll_interval=0.05, url=stub_site.url, log_level="ERROR"
+    ) as farm:
+        results = list(farm.map(pairs))
+    assert sorted(result["licence_number"] for result in results) == [
+        plate for plate, _ in pairs
+    ]
+    for result in results:
+        assert result["VIN Number"] == fake_vin(result["licence_number"], "CA")
+    assert farm.restarts == 0
+
+
+def test_workers_dying_on_startup_fail_the_farm():
+    # An unknown log level makes every worker die before its first lookup.
+    farm = WorkerFarm(
+        workers=1,
+        poll_interval=0.05,
+        max_restarts=2,
+        restart_backoff=0.01,
+        url="http://stub/search",
+        log_level="NO-SUCH-LEVEL",
+    )
+    with farm:
+        with pytest.raises(WorkerFarmFailed):
+            list(farm.map([("7ABC123", "CA")]))
+    assert farm.restarts == 2
+
+
+def test_workers_write_their_own_metrics(stub_site, tmp_path):
+    metrics_file = tmp_path / "metrics.json"
+    with WorkerFarm(
+        workers=1,
+        poll_interval=0.05,
+        url=stub_site.url,
+        log_level="ERROR",
+        metrics_file=str(metrics_file),
+    ) as farm:
+        list(farm.map([("7ABC123", "CA")]))
+    worker_metrics = tmp_path / "metrics.worker-0.json"
+    assert worker_filename(str(metrics_file), 0) == str(worker_metrics)
+    assert json.loads(worker_metrics.read_text())["http_lookup"]["count"] == 1
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+import json
+import pathlib
+import runpy
+
+import pytest
+
+from stub_site import fake_vin
+from vin_scrapper.graphql import GraphQLEngine, GraphQLError
+from vin_scrapper.vin_scrapper import VinScrapper
+
+SCRIPT = pathlib.Path(__file__).resolve().parents[1] / "scripts" / "scrapper.py"
+
+
+def test_lookup_fills_the_vin(stub_site):
+    with GraphQLEngine(url=stub_site.base_url + "/graphql") as engine:
+        data = engine.lookup("7ABC123", "ca")
+    assert data == {"VIN Number": fake_vin("7ABC123", "CA")}
+
+
+def test_unknown_plate_has_no_vin(stub_site):
+    with GraphQLEngine(url=stub_site.base_url + "/graphql") as engine:
+        assert engine.lookup("UNKNOWN", "CA") == {"VIN Number": ""}
+
+
+def test_graphql_errors_raise(stub_site):
+    with GraphQLEngine(url=stub_site.base_url + "/graphql") as engine:
+        with pytest.raises(GraphQLError):
+            engine.query("7ABC123", "XX")
+
+
+def test_library_defaults_to_http(stub_site):
+    scrapper = VinScrapper(url=stub_site.url, log_level="ERROR")
+    try:
+        assert scrapper.engine == "http"
+        data = scrapper.lookup("7ABC124", "CA")
+    finally:
+        scrapper.close_session()
+    assert data["VIN Number"] == fake_vin("7ABC124", "CA")
+    assert scrapper.driver is None
+    assert scrapper.cache is None
+
+
+def test_cli_defaults_match_the_library(stub_site):
+    main = runpy.run_path(str(SCRIPT))["main"]
+    output = main(
+        [
+            "--url",
+            stub_site.url,
+            "--licence-number",
+            "7ABC125",
+            "--location",
+            "CA",
+            "--loglevel",
+            "ERROR",
+        ]
+    )
+    (data,) = json.loads(output)
+    assert data["VIN Number"] == fake_vin("7ABC125", "CA")
+    assert stub_site.graphql_requests >= 1
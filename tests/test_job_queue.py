@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+import pytest
+
+from vin_scrapper.job_queue import (
+    LEASE_EXPIRED,
+    LEASED,
+    QUEUED,
+    LeaseLost,
+    QueueWorker,
+    SQLiteQueue,
+)
+from vin_scrapper.jobs import DONE, FAILED, RetryPolicy
+
+VISIBILITY = 0.2
+
+
+@pytest.fixture
+def queues(tmp_path):
+    """Two connections to one queue file, as two workers would have."""
+    path = str(tmp_path / "plates.queue")
+    first, second = SQLiteQueue(path), SQLiteQueue(path)
+    yield first, second
+    first.close()
+    second.close()
+
+
+def pairs(count):
+    return [(f"7ABC{i:03d}", "CA") for i in range(count)]
+
+
+def test_put_ignores_plates_already_queued(queues):
+    first, second = queues
+    assert first.put(pairs(3)) == 3
+    assert second.put([("7abc000", "ca"), ("7ABC003", "CA")]) == 1
+    assert first.counts() == {QUEUED: 4}
+
+
+def test_put_queues_finished_plates_again(queues):
+    first, second = queues
+    first.put(pairs(3))
+    done, failed, leased = first.lease("first", limit=3, visibility=60)
+    first.complete(done, {"VIN Number": "done"})
+    first.fail(failed, {"error": "no page"})
+    assert second.put(pairs(3)) == 2
+    assert second.counts() == {QUEUED: 2, LEASED: 1}
+    assert list(second.results()) == []
+    again = second.lease("second", limit=3, visibility=60)
+    assert sorted(job.id for job in again) == sorted([done.id, failed.id])
+    assert [job.attempts for job in again] == [1, 1]
+
+
+def test_two_workers_never_lease_the_same_job(queues):
+    first, second = queues
+    first.put(pairs(200))
+    leased = {"first": [], "second": []}
+
+    def drain(queue, name):
+        while True:
+            jobs = queue.lease(name, limit=3, visibility=60)
+            if not jobs:
+                return
+            leased[name].extend(job.id for job in jobs)
+
+    threads = [
+        threading.Thread(target=drain, args=(queue, name))
+        for queue, name in ((first, "first"), (second, "second"))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ids = leased["first"] + leased["second"]
+    assert len(ids) == len(set(ids)) == 200
+    assert first.counts() == {LEASED: 200}
+
+
+def test_expired_lease_is_reclaimed_by_another_worker(queues):
+    first, second = queues
+    first.put(pairs(1))
+    (job,) = first.lease("first", visibility=VISIBILITY)
+    assert second.lease("second", visibility=VISIBILITY) == []
+    time.sleep(VISIBILITY * 1.5)
+    (stolen,) = second.lease("second", visibility=60)
+    assert stolen.id == job.id
+    assert stolen.attempts == 2
+    assert stolen.token != job.token
+
+
+def test_reclaim_queues_expired_leases(queues):
+    first, second = queues
+    first.put(pairs(2))
+    first.lease("first", limit=2, visibility=VISIBILITY)
+    time.sleep(VISIBILITY * 1.5)
+    assert second.reclaim() == 2
+    assert first.counts() == {QUEUED: 2}
+
+
+def test_stale_worker_loses_its_lease(queues):
+    first, second = queues
+    first.put(pairs(1))
+    (stale,) = first.lease("first", visibility=VISIBILITY)
+    time.sleep(VISIBILITY * 1.5)
+    (fresh,) = second.lease("second", visibility=60)
+    with pytest.raises(LeaseLost):
+        first.heartbeat(stale, VISIBILITY)
+    with pytest.raises(LeaseLost):
+        first.complete(stale, {"VIN Number": "stale"})
+    with pytest.raises(LeaseLost):
+        first.fail(stale, {"error": "stale"})
+    second.complete(fresh, {"VIN Number": "fresh"})
+    assert list(first.results()) == [{"VIN Number": "fresh"}]
+
+
+def test_heartbeat_keeps_the_lease(queues):
+    first, second = queues
+    first.put(pairs(1))
+    (job,) = first.lease("first", visibility=VISIBILITY)
+    for _ in range(3):
+        time.sleep(VISIBILITY / 2)
+        first.heartbeat(job, VISIBILITY)
+    assert second.lease("second", visibility=60) == []
+    first.complete(job, {"VIN Number": "kept"})
+    assert first.counts() == {DONE: 1}
+
+
+def test_leases_expiring_too_often_fail_the_job(queues):
+    first, second = queues
+    first.put(pairs(1))
+    for queue in (first, second):
+        assert queue.lease("crashing", visibility=VISIBILITY, max_attempts=2)
+        time.sleep(VISIBILITY * 1.5)
+    assert first.lease("next", visibility=60, max_attempts=2) == []
+    assert second.counts() == {FAILED: 1}
+    (result,) = second.results()
+    assert result["error_class"] == LEASE_EXPIRED
+
+
+def test_fail_with_retry_at_queues_the_job_again(queues):
+    first, second = queues
+    first.put(pairs(1))
+    (job,) = first.lease("first", visibility=60)
+    first.fail(job, {"error": "no page"}, retry_at=time.time() + VISIBILITY)
+    assert second.lease("second", visibility=60) == []
+    time.sleep(VISIBILITY * 1.5)
+    (retry,) = second.lease("second", visibility=60)
+    assert retry.attempts == 2
+
+
+def test_workers_share_the_queue(queues):
+    first, second = queues
+    first.put(pairs(6) + [("7BAD000", "CA")])
+    calls = []
+
+    def lookup(todo):
+        for licence_number, location in todo:
+            calls.append(licence_number)
+            result = {"licence_number": licence_number, "location": location}
+            if licence_number == "7BAD000":
+                result.update(error="no page", error_class="MissingPageSource")
+            else:
+                result["VIN Number"] = f"VIN-{licence_number}"
+            yield result
+
+    policies = {"MissingPageSource": RetryPolicy(2, base_delay=0.01, max_delay=0.01)}
+    workers = [
+        QueueWorker(
+            queue, lookup, worker_id=name, retry_policies=policies, poll_interval=0.01
+        )
+        for queue, name in ((first, "first"), (second, "second"))
+    ]
+    results = []
+    threads = [
+        threading.Thread(target=lambda worker=worker: results.extend(worker.run()))
+        for worker in workers
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 7
+    assert calls.count("7BAD000") == 2
+    assert len(calls) == 8
+    assert first.counts() == {DONE: 6, FAILED: 1}
+    assert sum(worker.counters[DONE] for worker in workers) == 6
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from vin_scrapper.jobs import DONE, FAILED, BatchJob, JobJournal, RetryPolicy
+
+
+def flaky_lookup(failures, calls):
+    """Lookup failing each plate `failures[plate]` times with MissingPageSource."""
+
+    def lookup(pairs):
+        for licence_number, location in pairs:
+            calls.append(licence_number)
+            result = {"licence_number": licence_number, "location": location}
+            if failures.get(licence_number, 0) > 0:
+                failures[licence_number] -= 1
+                result["error"] = "no page"
+                result["error_class"] = "MissingPageSource"
+            else:
+                result["VIN Number"] = f"VIN-{licence_number}"
+            yield result
+
+    return lookup
+
+
+@pytest.mark.parametrize("attempt", [1, 2, 3, 8])
+def test_retry_delay_stays_within_its_bounds(attempt):
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+    ceiling = min(5.0, 2 ** (attempt - 1))
+    for _ in range(100):
+        assert ceiling / 2 <= policy.delay(attempt) <= ceiling
+
+
+def test_transient_errors_are_retried_until_they_succeed():
+    policies = {"MissingPageSource": RetryPolicy(3, base_delay=0.01)}
+    calls = []
+    job = BatchJob(retry_policies=policies)
+    results = list(job.run([("7ABC123", "CA")], flaky_lookup({"7ABC123": 2}, calls)))
+    assert calls == ["7ABC123"] * 3
+    assert results[0]["VIN Number"] == "VIN-7ABC123"
+    assert job.summary()["retries"] == 2
+
+
+def test_errors_without_a_policy_fail_straight_away():
+    calls = []
+    job = BatchJob(retry_policies={})
+    (result,) = job.run([("7ABC123", "CA")], flaky_lookup({"7ABC123": 1}, calls))
+    assert result["error_class"] == "MissingPageSource"
+    assert calls == ["7ABC123"]
+    assert job.journal.status("7ABC123", "CA") == (FAILED, 1)
+
+
+def test_rerun_resumes_from_the_journal(tmp_path):
+    path = str(tmp_path / "plates.journal")
+    pairs = [("7ABC123", "CA"), ("7ABC124", "CA"), ("7ABC125", "CA")]
+    failures = {"7ABC124": 1}
+
+    calls = []
+    job = BatchJob(JobJournal(path), retry_policies={})
+    list(job.run(pairs, flaky_lookup(failures, calls)))
+    job.journal.close()
+    assert calls == ["7ABC123", "7ABC124", "7ABC125"]
+
+    calls = []
+    job = BatchJob(JobJournal(path), retry_policies={})
+    assert list(job.run(pairs, flaky_lookup(failures, calls))) == []
+    assert calls == []
+    assert job.summary()["skipped"] == 3
+
+    job = BatchJob(JobJournal(path), retry_policies={}, retry_failed=True)
+    (result,) = job.run(pairs, flaky_lookup(failures, calls))
+    assert calls == ["7ABC124"]
+    assert result["VIN Number"] == "VIN-7ABC124"
+    assert job.journal.counts() == {DONE: 3}
+    job.journal.close()
+
+
+def test_duplicates_are_looked_up_once():
+    calls = []
+    job = BatchJob(retry_policies={})
+    list(job.run([("7ABC123", "CA"), ("7abc123", "ca")], flaky_lookup({}, calls)))
+    assert calls == ["7ABC123"]
+    assert job.summary()["duplicates"] == 1
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+import subprocess
+import sys
+import textwrap
+
+from vin_scrapper.lazy import LazyModule
+
+
+def test_module_is_imported_on_first_attribute(monkeypatch):
+    monkeypatch.delitem(sys.modules, "colorsys", raising=False)
+    colorsys = LazyModule("colorsys")
+    assert "colorsys" not in sys.modules
+    assert "not loaded" in repr(colorsys)
+
+    assert colorsys.rgb_to_hsv(1, 0, 0) == (0, 1, 1)
+    assert "colorsys" in sys.modules
+    assert "(loaded)" in repr(colorsys)
+
+
+def test_attribute_stand_in_is_callable(monkeypatch):
+    monkeypatch.delitem(sys.modules, "colorsys", raising=False)
+    rgb_to_hsv = LazyModule("colorsys", "rgb_to_hsv")
+    assert "colorsys" not in sys.modules
+    assert rgb_to_hsv(0, 1, 0) == (1 / 3, 1, 1)
+
+
+def test_http_lookup_never_imports_the_browser_stack(stub_site):
+    script = textwrap.dedent(
+        """
+        import sys
+        from vin_scrapper import VinScrapper
+
+        scrapper = VinScrapper(url=sys.argv[1], log_level="ERROR")
+        scrapper.lookup("7ABC123", "CA")
+        scrapper.close_session()
+        loaded = sorted({"selenium", "seleniumwire", "bs4"} & set(sys.modules))
+        assert not loaded, loaded
+        """
+    )
+    subprocess.run([sys.executable, "-c", script, stub_site.url], check=True, timeout=60)
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+
+import importlib
+import pkgutil
+
+import vin_scrapper
+
+
+def test_package_only_exports_public_names():
+    for module_info in pkgutil.iter_modules(vin_scrapper.__path__):
+        module = importlib.import_module(f"vin_scrapper.{module_info.name}")
+        for name in getattr(module, "__all__", ()):
+            assert getattr(vin_scrapper, name) is getattr(module, name), name
+    for name in ("json", "queue", "asyncio", "logger", "webdriver", "_header"):
+        assert not hasattr(vin_scrapper, name), name
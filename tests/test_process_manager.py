@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import psutil
+import pytest
+
+from vin_scrapper.process_manager import ProcessTracker
+
+# Stands in for geckodriver: a driver process with a browser child.
+DRIVER = "import subprocess, time; subprocess.Popen(['sleep', '60']); time.sleep(60)"
+
+
+@pytest.fixture
+def driver():
+    process = subprocess.Popen([sys.executable, "-c", DRIVER])
+    root = psutil.Process(process.pid)
+    deadline = time.monotonic() + 10
+    while not root.children() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    yield SimpleNamespace(service=SimpleNamespace(process=process))
+    for proc in [root] + root.children(recursive=True) if root.is_running() else []:
+        proc.kill()
+    process.wait()
+
+
+@pytest.fixture
+def bystander():
+    """Another scraper's browser, which must survive."""
+    process = subprocess.Popen(["sleep", "60"])
+    yield process
+    process.kill()
+    process.wait()
+
+
+def test_shutdown_only_stops_the_tracked_tree(driver, bystander, tmp_path):
+    tracker = ProcessTracker(registry_dir=str(tmp_path)).track(driver)
+    procs = tracker.processes()
+    assert len(procs) == 2
+    assert len(os.listdir(tmp_path)) == 1
+
+    tracker.shutdown(deadline=2)
+
+    assert not any(proc.is_running() for proc in procs)
+    assert bystander.poll() is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_orphans_of_a_dead_owner_are_reaped(bystander, tmp_path):
+    orphan = psutil.Process(bystander.pid)
+    record = {
+        "owner": os.getpid(),
+        "owner_create_time": 0,  # Not this process, its pid was recycled.
+        "pids": {str(orphan.pid): orphan.create_time()},
+    }
+    (tmp_path / "gone.json").write_text(json.dumps(record))
+
+    assert ProcessTracker.reap_orphans(registry_dir=str(tmp_path), deadline=2) == 1
+    assert bystander.wait(5) is not None
+    assert os.listdir(tmp_path) == []
+
+
+def test_live_owners_keep_their_processes(bystander, tmp_path):
+    record = {
+        "owner": os.getpid(),
+        "owner_create_time": psutil.Process().create_time(),
+        "pids": {str(bystander.pid): psutil.Process(bystander.pid).create_time()},
+    }
+    (tmp_path / "alive.json").write_text(json.dumps(record))
+
+    assert ProcessTracker.reap_orphans(registry_dir=str(tmp_path), deadline=2) == 0
+    assert bystander.poll() is None
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import time
+
+from vin_scrapper.rate_control import TIMEOUT, AIMDController
+
+
+def test_async_waiters_leave_the_executor_free():
+    controller = AIMDController("stub", initial=1)
+    controller.acquire()
+
+    async def wait_for_slot():
+        async with controller.slot():
+            pass
+
+    async def scenario():
+        loop = asyncio.get_event_loop()
+        waiters = [asyncio.ensure_future(wait_for_slot()) for _ in range(64)]
+        await asyncio.sleep(0.1)
+        # Blocked acquires in the default executor would starve this call.
+        assert await asyncio.wait_for(loop.run_in_executor(None, int), 1) == 0
+        controller.release()
+        await asyncio.wait_for(asyncio.gather(*waiters), 10)
+
+    asyncio.run(scenario())
+    assert controller.in_flight == 0
+
+
+def test_cancelled_async_waiter_holds_nothing():
+    controller = AIMDController("stub", initial=1)
+    controller.acquire()
+
+    async def scenario():
+        waiter = asyncio.ensure_future(controller.acquire_async())
+        await asyncio.sleep(0.1)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+    asyncio.run(scenario())
+    controller.release()
+    assert controller.in_flight == 0
+    assert controller.acquire(timeout=0)
+
+
+def test_max_rate_spaces_async_starts():
+    controller = AIMDController("stub", initial=4, max_rate=20)
+
+    async def scenario():
+        for _ in range(3):
+            await controller.acquire_async()
+
+    start = time.monotonic()
+    asyncio.run(scenario())
+    assert time.monotonic() - start >= 0.09
+    assert controller.in_flight == 3
+
+
+def test_congestion_halves_the_limit():
+    controller = AIMDController("stub", initial=8, backoff_interval=0)
+    controller.record(TIMEOUT)
+    assert controller.limit == 4
+    assert controller.snapshot()["decisions"][-1]["reason"] == TIMEOUT
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+from types import SimpleNamespace
+
+from vin_scrapper.recycle import LOOKUPS, RecyclePolicy
+from vin_scrapper.vin_scrapper import VinScrapper
+
+
+class FakeWireDriver:
+    """Stands in for a seleniumwire driver: a request store that can be cleared."""
+
+    def __init__(self):
+        self._requests = [SimpleNamespace(path=path) for path in ("/", "/app.js")]
+        self.quit_called = False
+
+    @property
+    def requests(self):
+        return list(self._requests)
+
+    @requests.deleter
+    def requests(self):
+        self._requests = []
+
+    def close(self):
+        pass
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_policy_asks_for_a_restart_after_max_lookups():
+    policy = RecyclePolicy(max_lookups=2)
+    driver = RecyclePolicy.started(FakeWireDriver())
+    RecyclePolicy.served(driver)
+    assert policy.reason(driver) is None
+    RecyclePolicy.served(driver)
+    assert policy.reason(driver) == LOOKUPS
+
+
+def test_recycle_drops_captured_requests_before_quitting():
+    scrapper = VinScrapper(url="http://stub/search", engine="selenium", recycle_after=1)
+    driver = scrapper.driver = RecyclePolicy.started(FakeWireDriver())
+    scrapper.recycle_browser(LOOKUPS)
+    assert driver.requests == []
+    assert driver.quit_called
+    assert scrapper.driver is None
+    assert scrapper.recycle.stats()["by_reason"] == {LOOKUPS: 1}
+
+
+class CrashedDriver(FakeWireDriver):
+    """A driver whose browser is already gone."""
+
+    def close(self):
+        raise ConnectionRefusedError("geckodriver is gone")
+
+
+def test_recycle_survives_a_crashed_browser():
+    scrapper = VinScrapper(url="http://stub/search", engine="selenium", recycle_after=1)
+    scrapper.driver = RecyclePolicy.started(CrashedDriver())
+    scrapper.recycle_browser(LOOKUPS)
+    assert scrapper.driver is None
+    assert scrapper._closed
+
+
+def test_close_session_survives_a_crashed_browser():
+    scrapper = VinScrapper(url="http://stub/search", engine="selenium")
+    scrapper.driver = CrashedDriver()
+    scrapper.close_session()
+    assert scrapper.driver is None
+    assert scrapper._closed
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from stub_site import StubSite, fake_vin
+from vin_scrapper.replay import TrafficArchive
+
+QUERY = {
+    "operationName": "licensePlate",
+    "variables": {"number": "7ABC123", "state": "CA"},
+}
+
+
+def test_record_then_replay_without_the_site(wire, tmp_path):
+    path = str(tmp_path / "lookups.replay.gz")
+    with StubSite() as site:
+        recorded_page = wire.fetch(site.url)
+        recorded_answer = wire.fetch(site.base_url + "/graphql", QUERY)
+        archive = TrafficArchive()
+        assert archive.collect(wire) == 2
+        del wire.requests
+        archive.save(path)
+        graphql_url = site.base_url + "/graphql"
+
+    replay = TrafficArchive.load(path)
+    replay.install(wire)
+    try:
+        assert wire.fetch(site.url) == recorded_page
+        assert wire.fetch(graphql_url, QUERY) == recorded_answer
+        other = dict(QUERY, variables={"number": "7ABC124", "state": "CA"})
+        assert wire.fetch(graphql_url, other)[0] == 404
+    finally:
+        replay.close()
+    answer = json.loads(recorded_answer[1])
+    assert answer["data"]["licensePlate"]["vin"] == fake_vin("7ABC123", "CA")
+    assert dict(replay.stats) == {"replayed": 2, "missed": 1}
+    # Replayed requests are captured rewritten, still naming the endpoint for capture.
+    paths = [request.path for request in wire.requests]
+    assert len([path for path in paths if path.endswith("/graphql")]) == 2
+    assert all(path.startswith("http://127.0.0.1:") for path in paths)
+
+
+def test_replay_repeats_responses_in_recorded_order():
+    url = "https://www.vehiclehistory.com/app.js"
+    archive = TrafficArchive(
+        [
+            {
+                "key": f"GET {url} ",
+                "method": "GET",
+                "url": url,
+                "status": status,
+                "headers": [["Content-Type", "text/javascript"]],
+                "body": "body",
+            }
+            for status in (200, 304)
+        ],
+        {"body": b"app"},
+    )
+    assert [archive.match("GET", url + "#top")["status"] for _ in range(3)] == [
+        200,
+        304,
+        304,
+    ]
+    assert archive.match("POST", url) is None
+
+
+def test_replay_fails_loudly_without_rewrite_rules():
+    driver = SimpleNamespace(requests=[])
+    with pytest.raises(RuntimeError, match="rewrite_rules"):
+        TrafficArchive().install(driver)
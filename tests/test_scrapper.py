@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import pathlib
+import runpy
+
+SCRIPT = pathlib.Path(__file__).resolve().parents[1] / "scripts" / "scrapper.py"
+
+
+def test_queue_worker_writes_the_metrics_file(stub_site, tmp_path, capsys):
+    main = runpy.run_path(str(SCRIPT))["main"]
+    batch = tmp_path / "plates.csv"
+    batch.write_text("licence_number,location\n7ABC123,CA\n7ABC124,CA\n")
+    queue = str(tmp_path / "queue.sqlite")
+    metrics = tmp_path / "metrics.json"
+    common = ["--url", stub_site.url, "--queue", queue, "--loglevel", "ERROR"]
+    main(common + ["--batch", str(batch)])
+    main(common + ["--metrics-file", str(metrics)])
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert sorted(result["licence_number"] for result in results) == [
+        "7ABC123",
+        "7ABC124",
+    ]
+    assert json.loads(metrics.read_text())["http_lookup"]["count"] == 2
+
+
+def test_bad_jsonl_lines_are_reported_and_skipped():
+    read_batch = runpy.run_path(str(SCRIPT))["read_batch"]
+    handle = io.StringIO(
+        "\n"
+        '{"plate": "7ABC123", "state": "CA"}\n'
+        '{"plate": "7ABC124", "state": \n'
+        '["7ABC125", "CA"]\n'
+        '{"plate": 1234567, "state": "CA"}\n'
+    )
+    errors = io.StringIO()
+    pairs = list(read_batch(handle, errors=errors))
+    assert pairs == [("7ABC123", "CA"), ("1234567", "CA")]
+    reported = [json.loads(line) for line in errors.getvalue().splitlines()]
+    assert [error["line"] for error in reported] == [3, 4]
+    assert [error["error_class"] for error in reported] == [
+        "JSONDecodeError",
+        "ValueError",
+    ]
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+
+from stub_site import StubSite, fake_vin
+from vin_scrapper.server import LookupServer, LookupService
+
+
+@contextmanager
+def serving(service):
+    """Serve a service, already started or not, on a free local port."""
+    server = LookupServer(service, port=0, request_timeout=10)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+def request(url, body=None):
+    """(status, json body) of a GET, or of a POST when there is a body."""
+    data = None if body is None else json.dumps(body).encode()
+    try:
+        with urllib.request.urlopen(url, data, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as err:
+        return err.code, json.loads(err.read())
+
+
+def test_lookup_and_batch(stub_site):
+    service = LookupService(sessions=2, url=stub_site.url, log_level="ERROR")
+    service.start()
+    with serving(service) as base:
+        status, body = request(base + "/lookup?licence_number=7ABC123&location=CA")
+        assert status == 200
+        assert body["VIN Number"] == fake_vin("7ABC123", "CA")
+        status, body = request(
+            base + "/batch",
+            {
+                "items": [
+                    {"licence_number": "7ABC124", "location": "CA"},
+                    {"licence_number": "TOOLONG99", "location": "CA"},
+                    "7ABC125",
+                ]
+            },
+        )
+    assert status == 200
+    ok, invalid, not_an_object = body["results"]
+    assert ok["VIN Number"] == fake_vin("7ABC124", "CA")
+    assert "at most 7" in invalid["error"]
+    assert "Expected an object" in not_an_object["error"]
+
+
+def test_invalid_requests_are_answered_with_400(stub_site):
+    service = LookupService(url=stub_site.url, log_level="ERROR")
+    with serving(service) as base:
+        for query in (
+            "licence_number=7ABC123",
+            "licence_number=7ABC123&location=XX",
+            "licence_number=7ABC12345&location=CA",
+        ):
+            status, body = request(base + "/lookup?" + query)
+            assert status == 400, query
+            assert body["error"]
+        status, body = request(base + "/batch", {"items": "7ABC123"})
+        assert status == 400
+        status, body = request(base + "/lookup", ["7ABC123", "CA"])
+        assert status == 400
+        status, body = request(
+            base + "/lookup", {"licence_number": 1234567, "location": "CA"}
+        )
+        assert status == 400
+    assert stub_site.graphql_requests == 0
+
+
+def test_full_queue_is_answered_with_503(stub_site):
+    # Never started, so the one queued lookup keeps the queue full.
+    service = LookupService(queue_size=1, url=stub_site.url, log_level="ERROR")
+    service.submit("7ABC123", "CA")
+    with serving(service) as base:
+        status, body = request(base + "/lookup?licence_number=7ABC124&location=CA")
+        assert status == 503
+        assert "already queued" in body["error"]
+        status, _ = request(
+            base + "/lookup", {"licence_number": "7ABC124", "location": "CA"}
+        )
+        assert status == 503
+
+
+def test_plates_are_not_checked_with_no_validate(stub_site):
+    service = LookupService(url=stub_site.url, no_validate=True, log_level="ERROR")
+    service.start()
+    with serving(service) as base:
+        status, body = request(base + "/lookup?licence_number=TOOLONG99&location=CA")
+    assert status == 200
+    assert body["VIN Number"] == fake_vin("TOOLONG99", "CA")
+
+
+def test_close_cancels_queued_lookups_instead_of_waiting_for_room():
+    with StubSite(latency=0.5) as site:
+        service = LookupService(
+            sessions=1, queue_size=1, url=site.url, no_coalesce=True, log_level="ERROR"
+        )
+        service.start()
+        running = service.submit("7ABC123", "CA")
+        while not running.running():
+            time.sleep(0.01)
+        queued = service.submit("7ABC124", "CA")
+        closing = threading.Thread(target=service.close)
+        closing.start()
+        closing.join(5)
+        assert not closing.is_alive()
+    assert queued.cancelled()
+    assert running.result(0)["VIN Number"] == fake_vin("7ABC123", "CA")
+    assert service.served == 1
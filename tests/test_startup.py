@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+from selenium.webdriver import FirefoxProfile
+
+from vin_scrapper.startup import DriverCache, ProfileTemplates
+
+
+@pytest.fixture
+def binary(tmp_path):
+    """A stand-in driver binary, executable like the real one."""
+    path = tmp_path / "geckodriver"
+    path.write_text("#!/bin/sh\n")
+    path.chmod(0o755)
+    return str(path)
+
+
+class Installer:
+    """Counts the downloads webdriver_manager would make."""
+
+    def __init__(self, path):
+        self.path = path
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.path
+
+
+def test_binary_is_resolved_once_then_read_from_disk(tmp_path, binary):
+    records = str(tmp_path / "drivers.json")
+    install = Installer(binary)
+    cache = DriverCache(records)
+    assert cache.resolve("geckodriver", install) == binary
+    assert cache.resolve("geckodriver", install) == binary
+    assert install.calls == 1
+
+    # A new process reads the record instead of checking online.
+    assert DriverCache(records).resolve("geckodriver", install) == binary
+    assert install.calls == 1
+
+
+def test_stale_or_missing_binaries_are_resolved_again(tmp_path, binary):
+    records = str(tmp_path / "drivers.json")
+    install = Installer(binary)
+    DriverCache(records).resolve("geckodriver", install)
+
+    DriverCache(records, max_age=0).resolve("geckodriver", install)
+    assert install.calls == 2
+
+    os.remove(binary)
+    DriverCache(records).resolve("geckodriver", install)
+    assert install.calls == 3
+
+
+def test_pinned_versions_do_not_expire(tmp_path, binary):
+    records = str(tmp_path / "drivers.json")
+    install = Installer(binary)
+    DriverCache(records).resolve("geckodriver", install, version="0.26.0")
+    DriverCache(records, max_age=0).resolve("geckodriver", install, version="0.26.0")
+    assert install.calls == 1
+    DriverCache(records).resolve("geckodriver", install, version="0.27.0")
+    assert install.calls == 2
+
+
+def test_profiles_are_built_once_per_configuration():
+    paths = []
+
+    def build():
+        profile = FirefoxProfile()
+        profile.set_preference("permissions.default.image", 2)
+        profile.update_preferences()
+        paths.append(profile.path)
+        return profile
+
+    templates = ProfileTemplates()
+    first = templates.get(("no proxy",), build)
+    second = templates.get(("no proxy",), build)
+    assert (templates.built, templates.reused) == (1, 1)
+    assert first.encoded == second.encoded
+    # The profile directory is only needed to encode the template.
+    assert not os.path.exists(paths[0])
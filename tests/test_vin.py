@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from vin_scrapper.vin import (
+    InvalidPlate,
+    InvalidVIN,
+    check_digit,
+    decode_vin,
+    enrich,
+    validate_plate,
+    validate_plates,
+    validate_vin,
+    validate_vins,
+)
+
+VALID_VINS = ["1HGCM82633A004352", "1M8GDM9AXKP042788", "11111111111111111"]
+
+
+@pytest.mark.parametrize("vin", VALID_VINS)
+def test_check_digit_of_known_vins(vin):
+    assert check_digit(vin) == vin[8]
+    assert validate_vin(vin.lower()) == vin
+
+
+@pytest.mark.parametrize(
+    "vin, message",
+    [
+        ("1HGCM82633A00435", "16 characters"),
+        ("1HGCM82633A00435I", "not a VIN character"),
+        ("1HGCM82643A004352", "check digit"),
+    ],
+)
+def test_invalid_vins_say_why(vin, message):
+    with pytest.raises(InvalidVIN, match=message):
+        validate_vin(vin)
+
+
+def test_validate_vins_matches_validate_vin():
+    vins = VALID_VINS + ["1HGCM82643A004352", "1HGCM82633A00435I", "", None]
+    assert validate_vins(vins) == [True, True, True, False, False, False, False]
+
+
+def test_decode_vin():
+    assert decode_vin("1HGCM82633A004352") == {
+        "WMI": "1HG",
+        "Manufacturer": "Honda",
+        "Country": "United States",
+        "Region": "North America",
+        "Model Year": 2003,
+        "Plant Code": "A",
+        "Plant": "Marysville, Ohio",
+    }
+
+
+def test_enrich_leaves_unknown_plates_alone():
+    assert enrich({"VIN Number": ""}) == {"VIN Number": ""}
+    assert enrich({"VIN Number": "1hgcm82633a004352"})["Manufacturer"] == "Honda"
+
+
+def test_validate_plate():
+    assert validate_plate("7abc-123", "ca") == "7ABC123"
+    assert validate_plate("ABCD1234", "NY") == "ABCD1234"
+    with pytest.raises(InvalidPlate, match="CA plates have at most 7"):
+        validate_plate("ABCD1234", "CA")
+    with pytest.raises(InvalidPlate, match="not a supported state"):
+        validate_plate("7ABC123", "XX")
+    with pytest.raises(InvalidPlate, match="letters and digits"):
+        validate_plate("7AB_123", "CA")
+
+
+def test_validate_plates_reports_per_pair():
+    errors = validate_plates([("7ABC123", "CA"), ("", "CA")])
+    assert errors[0] is None
+    assert errors[1] == "Empty licence plate."
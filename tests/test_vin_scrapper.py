@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.keys import Keys
+
+from vin_scrapper.rate_control import ERROR, OK, AIMDController
+from vin_scrapper.vin_scrapper import (
+    AVAILABLE_LOCATIONS,
+    DOM_VERSION_SCRIPT,
+    FORM_STATE_SCRIPT,
+    VinScrapper,
+)
+
+VIN = "1HGCM82633A004352"
+URL = "https://www.vehiclehistory.com/license-plate-search"
+
+
+class FakeDriver:
+    """Stands in for a webdriver on the search page, every call succeeds."""
+
+    current_url = URL
+
+    def __init__(self):
+        self.loads = 0
+        self.quit_called = False
+
+    def get(self, url):
+        self.loads += 1
+
+    def execute_script(self, script, *args):
+        return True
+
+    def back(self):
+        pass
+
+    def close(self):
+        pass
+
+    def quit(self):
+        self.quit_called = True
+
+
+class DeadDriver(FakeDriver):
+    """A driver whose browser and geckodriver crashed."""
+
+    def get(self, url):
+        raise WebDriverException("Failed to decode response from marionette")
+
+    def execute_script(self, script, *args):
+        raise WebDriverException("Failed to decode response from marionette")
+
+    def close(self):
+        raise WebDriverException("Tried to run command without establishing a connection")
+
+
+def selenium_scrapper(**kwargs):
+    options = dict(
+        url=URL,
+        engine="selenium",
+        blocking="none",
+        no_coalesce=True,
+        no_rate_control=True,
+        no_validate=True,
+    )
+    scrapper = VinScrapper(**dict(options, **kwargs))
+    scrapper.navigate_site = lambda: None
+    scrapper.get_vehicle_details = lambda: scrapper._set_vin(VIN)
+    return scrapper
+
+
+def test_dead_browser_is_replaced_on_the_next_lookup():
+    scrapper = selenium_scrapper()
+    scrapper.driver = DeadDriver()
+    fresh = FakeDriver()
+    scrapper._start_driver = lambda headless=False: fresh
+
+    with pytest.raises(WebDriverException):
+        scrapper.lookup("7ABC123", "CA")
+    assert scrapper.driver is None
+    assert scrapper._closed
+
+    assert scrapper.lookup("7ABC124", "CA")["VIN Number"] == VIN
+    assert scrapper.driver is fresh
+    assert fresh.loads == 1
+
+
+class RecordingController(AIMDController):
+    def __init__(self):
+        super().__init__("stub")
+        self.outcomes = []
+
+    def record(self, outcome, latency=None):
+        self.outcomes.append(outcome)
+        super().record(outcome, latency)
+
+
+def test_failed_http_lookup_is_recorded_once():
+    controller = RecordingController()
+    scrapper = selenium_scrapper(
+        engine="http", graphql_url="http://127.0.0.1:9/graphql", rate_control=controller
+    )
+    scrapper.driver = FakeDriver()
+
+    assert scrapper.lookup("7ABC123", "CA")["VIN Number"] == VIN
+    assert controller.outcomes == [ERROR]
+
+    scrapper.engine = "selenium"
+    scrapper.lookup("7ABC124", "CA")
+    assert controller.outcomes == [ERROR, OK]
+
+
+def test_search_form_is_reset_in_place_and_reloaded_after_a_failure():
+    scrapper = selenium_scrapper()
+    driver = scrapper.driver = FakeDriver()
+
+    scrapper.lookup("7ABC123", "CA")
+    assert driver.loads == 0
+
+    scrapper._page_dirty = True
+    scrapper.lookup("7ABC124", "CA")
+    assert driver.loads == 1
+
+
+class LazyDropdown:
+    """A state list that renders ten more items each time it is scrolled to the end."""
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.rendered = 10
+        self.keys = []
+
+    def send_keys(self, key):
+        self.keys.append(key)
+        self.rendered += 10
+
+    def options(self):
+        shown = self.labels[: self.rendered]
+        return {f"list-item-{i}": label for i, label in enumerate(shown)}
+
+
+def test_state_map_scrolls_until_every_state_is_mapped():
+    labels = sorted(AVAILABLE_LOCATIONS.values())
+    dropdown = LazyDropdown(labels)
+    scrapper = selenium_scrapper(poll_frequency=0.01)
+    scrapper.form_state = lambda: {"options": dropdown.options()}
+
+    state_map = scrapper._build_state_map(dropdown)
+
+    assert state_map == {label: f"list-item-{i}" for i, label in enumerate(labels)}
+    assert dropdown.keys[-1] == Keys.HOME
+
+
+def test_state_map_gives_up_on_a_list_that_stops_growing():
+    dropdown = LazyDropdown(["california", "texas"])
+    scrapper = selenium_scrapper(poll_frequency=0.01)
+    scrapper.form_state = lambda: {"options": dropdown.options()}
+
+    state_map = scrapper._build_state_map(dropdown)
+
+    assert state_map == {"california": "list-item-0", "texas": "list-item-1"}
+
+
+def test_wait_until_returns_the_condition_value_and_times_the_wait():
+    scrapper = selenium_scrapper(poll_frequency=0.01)
+    scrapper.driver = FakeDriver()
+    calls = []
+
+    def ready_on_third_poll(driver):
+        calls.append(driver)
+        return len(calls) >= 3 and ["input-98"]
+
+    assert scrapper._wait_until(ready_on_third_poll, "inputs") == ["input-98"]
+    assert len(calls) == 3
+    assert 0 < scrapper.wait_timings["inputs"] < 1
+
+
+def test_wait_until_times_out_with_the_description():
+    scrapper = selenium_scrapper(poll_frequency=0.01, wait_timeout=0.05)
+    scrapper.driver = FakeDriver()
+    with pytest.raises(TimeoutException, match="search button"):
+        scrapper._wait_until(lambda driver: False, "search button")
+    assert scrapper.wait_timings["search button"] >= 0.05
+
+
+class DomDriver(FakeDriver):
+    """A page whose DOM version is bumped by `mutate`, like the MutationObserver."""
+
+    def __init__(self):
+        super().__init__()
+        self.version = 0
+        self.source_reads = 0
+        self.scripts = []
+
+    def mutate(self):
+        self.version += 1
+
+    @property
+    def page_source(self):
+        self.source_reads += 1
+        return f"<p class='SummaryTopMenu-vin'>{self.version}</p>"
+
+    def execute_script(self, script, *args):
+        self.scripts.append(script)
+        if script == DOM_VERSION_SCRIPT:
+            return ["page-token", self.version]
+        if script == FORM_STATE_SCRIPT:
+            return {"inputs": ["input-98"], "interactable": [], "options": {}}
+        return super().execute_script(script, *args)
+
+
+def test_snapshot_is_reparsed_only_when_the_dom_changed():
+    scrapper = selenium_scrapper()
+    driver = scrapper.driver = DomDriver()
+
+    first = scrapper.page_source
+    assert scrapper.page_source is first
+    assert driver.source_reads == 1
+
+    driver.mutate()
+    assert scrapper.page_source.p.text == "1"
+    assert driver.source_reads == 2
+
+    scrapper.snapshot(refresh=True)
+    scrapper.invalidate_snapshot()
+    scrapper.snapshot()
+    assert driver.source_reads == 4
+
+
+def test_form_state_is_one_round_trip():
+    scrapper = selenium_scrapper()
+    driver = scrapper.driver = DomDriver()
+    assert scrapper.form_state()["inputs"] == ["input-98"]
+    assert not scrapper._licence_plate_input_interactable(driver)
+    assert driver.scripts == [FORM_STATE_SCRIPT, FORM_STATE_SCRIPT]
+    assert driver.source_reads == 0
@@ -6,3 +6,24 @@ __author__ = """Mpho Mphego"""
 __email__ = "mpho112@gmail.com"
 
 from vin_scrapper.vin_scrapper import *
+from vin_scrapper.aio import *
+from vin_scrapper.backends import *
+from vin_scrapper.blocking import *
+from vin_scrapper.cache import *
+from vin_scrapper.capture import *
+from vin_scrapper.coalesce import *
+from vin_scrapper.driver_pool import *
+from vin_scrapper.farm import *
+from vin_scrapper.graphql import *
+from vin_scrapper.job_queue import *
+from vin_scrapper.jobs import *
+from vin_scrapper.lazy import *
+from vin_scrapper.metrics import *
+from vin_scrapper.process_manager import *
+from vin_scrapper.proxy import *
+from vin_scrapper.rate_control import *
+from vin_scrapper.recycle import *
+from vin_scrapper.replay import *
+from vin_scrapper.server import *
+from vin_scrapper.startup import *
+from vin_scrapper.vin import *
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+"""asyncio API: concurrent lookups over a bounded set of sessions."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from vin_scrapper.cache import cache_key
+from vin_scrapper.graphql import AsyncGraphQLEngine, aiohttp
+from vin_scrapper.vin import enrich, validate_plate
+
+__all__ = ["LookupTimeout", "lookup_many"]
+
+
+class LookupTimeout(Exception):
+    pass
+
+
+async def _aiter(pairs):
+    if hasattr(pairs, "__aiter__"):
+        async for pair in pairs:
+            yield pair
+    else:
+        for pair in pairs:
+            yield pair
+
+
+async def lookup_many(factory, pairs, concurrency=4, timeout=None, template=None):
+    """Look up licence plates concurrently, yielding results in completion order.
+
+    Selenium lookups run on a thread pool, each on its own session from a bounded
+    set of at most `concurrency` sessions. With the http engine and aiohttp
+    installed, the GraphQL query is sent natively on the event loop and selenium
+    is only used as a fallback. Both hold a slot of the session's rate controller,
+    so fewer lookups run at once while the host is struggling. Duplicate plates
+    in flight at the same time share one lookup.
+
+    Args:
+        factory (callable): Returns a new VinScrapper session.
+        pairs (iterable): (licence_number, location) pairs, sync or async iterable.
+        concurrency (int, optional): Maximum number of lookups in flight.
+        timeout (float, optional): Seconds allowed per lookup.
+        template (VinScrapper, optional): First session, reused instead of created
+            and never closed, it stays the caller's.
+
+    Yields:
+        dict: The data structure plus `licence_number` and `location`, and an
+            `error` message and `error_class` if the lookup failed.
+    """
+    concurrency = max(1, int(concurrency))
+    executor = ThreadPoolExecutor(max_workers=concurrency * 2)
+    loop = asyncio.get_event_loop()
+    first = template or factory()
+    created = [first]
+    sessions = asyncio.Queue()
+    sessions.put_nowait(first)
+    for _ in range(concurrency - 1):
+        sessions.put_nowait(None)  # Created on first use.
+    cache = first.cache if first.cache is not None and not first.no_cache else None
+    http_engine = None
+    if first.engine == "http" and aiohttp is not None:
+        http_engine = AsyncGraphQLEngine(
+            url=first.graphql_url,
+            proxy=first.proxy,
+            timeout=first._timeout,
+            pool_size=concurrency,
+        )
+
+    def give_back(session):
+        # Called from the lookup's thread.
+        try:
+            loop.call_soon_threadsafe(sessions.put_nowait, session)
+        except RuntimeError:
+            pass  # The event loop is already closed.
+
+    async def selenium_lookup(licence_number, location):
+        session = await sessions.get()
+        if session is None:
+            try:
+                session = await loop.run_in_executor(executor, factory)
+            except BaseException:
+                sessions.put_nowait(None)
+                raise
+            created.append(session)
+        future = executor.submit(
+            session.lookup,
+            licence_number,
+            location,
+            engine="selenium" if http_engine is not None else None,
+        )
+        try:
+            result = await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)), timeout
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # The thread cannot be interrupted. The caller's session is given back
+            # once it is done, others are retired and replaced by a fresh one.
+            if session is template:
+                future.add_done_callback(lambda _: give_back(session))
+            else:
+                future.add_done_callback(lambda _: session.close_session())
+                created.remove(session)
+                sessions.put_nowait(None)
+            raise
+        except Exception:
+            sessions.put_nowait(session)
+            raise
+        sessions.put_nowait(session)
+        return result
+
+    async def http_lookup(licence_number, location):
+        if first.rate_controller is None:
+            data = await asyncio.wait_for(
+                http_engine.lookup(licence_number, location), timeout
+            )
+        else:
+            async with first.rate_controller.slot():
+                data = await asyncio.wait_for(
+                    http_engine.lookup(licence_number, location), timeout
+                )
+        return enrich(data) if first.validate else data
+
+    async def lookup_one(licence_number, location):
+        result = {"licence_number": licence_number, "location": location}
+        try:
+            if first.validate:
+                validate_plate(licence_number, location)
+            if cache is not None and not first.refresh_cache:
+                cached = cache.get(licence_number, location)
+                if cached is not None:
+                    result.update(cached)
+                    return result
+            data = None
+            if http_engine is not None:
+                try:
+                    if first.single_flight is None:
+                        data = await http_lookup(licence_number, location)
+                    else:
+                        data = await first.single_flight.do_async(
+                            (first.url,) + cache_key(licence_number, location),
+                            http_lookup,
+                            licence_number,
+                            location,
+                        )
+                except asyncio.CancelledError:
+                    raise
+                except Exception as err:
+                    logger.warning(
+                        "HTTP lookup failed ({}), falling back to selenium.", err
+                    )
+            if data is None:
+                data = await selenium_lookup(licence_number, location)
+            elif cache is not None:
+                cache.put(licence_number, location, data)
+            result.update(data)
+        except asyncio.TimeoutError:
+            result["error"] = str(LookupTimeout(f"Lookup exceeded {timeout}s"))
+            result["error_class"] = LookupTimeout.__name__
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:
+            result["error"] = str(err) or err.__class__.__name__
+            result["error_class"] = err.__class__.__name__
+        return result
+
+    pending = set()
+    source = _aiter(pairs).__aiter__()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    licence_number, location = await source.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                pending.add(
+                    asyncio.ensure_future(lookup_one(licence_number, location))
+                )
+            if not pending:
+                break
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        if http_engine is not None:
+            await http_engine.close()
+        for session in created:
+            if session is not template:
+                executor.submit(session.close_session)
+        executor.shutdown(wait=False)
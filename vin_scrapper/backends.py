@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+
+"""Browser backends VinScrapper can drive: Firefox and headless Chromium."""
+
+from loguru import logger
+
+from vin_scrapper.lazy import LazyModule
+from vin_scrapper.metrics import StageMetrics
+from vin_scrapper.startup import driver_cache, profile_templates
+
+__all__ = [
+    "BrowserBackend",
+    "ChromiumBackend",
+    "FirefoxBackend",
+    "firefox_proxy_profile",
+    "get_backend",
+    "seleniumwire_options",
+    "set_command_timeout",
+]
+
+webdriver = LazyModule("selenium.webdriver")
+wirewebdriver = LazyModule("seleniumwire.webdriver")
+chrome_manager = LazyModule("webdriver_manager.chrome")
+firefox_manager = LazyModule("webdriver_manager.firefox")
+
+
+def seleniumwire_options(proxy=None):
+    """seleniumwire options routing the browser through an upstream proxy.
+
+    Every method is captured, CORS preflights included, so a recording has all
+    of a page's traffic and a replay rewrites all of it, see `TrafficArchive`.
+    seleniumwire 1.0 keeps every captured request, VinScrapper drops them after
+    each lookup and before a recycle, see `VinScrapper._drain_captured`.
+    """
+    options = {"ignore_http_methods": []}
+    if proxy is not None:
+        options["proxy"] = {
+            "http": proxy.url,
+            "https": proxy.url,
+            "socks": proxy.url,
+            "no_proxy": "localhost,127.0.0.1",
+        }
+    return options
+
+
+def set_command_timeout(driver, timeout):
+    """Bound every command a driver sends to its webdriver to `timeout` seconds.
+
+    selenium's Chrome takes no `timeout` argument, unlike Firefox, so it is set
+    on the driver's own command connection, not the class wide default.
+    """
+    executor = driver.command_executor
+    executor._timeout = timeout
+    connections = getattr(executor, "_conn", None)
+    if connections is not None:
+        connections.connection_pool_kw["timeout"] = timeout
+        connections.clear()
+    return driver
+
+
+def firefox_proxy_profile(proxy, block_images=True):
+    """Firefox profile with manual proxy settings.
+
+    Args:
+        proxy (ProxySettings): Proxy to route the browser through.
+        block_images (bool, optional): Do not load images, for quicker page loads.
+
+    Returns:
+        Object: FirefoxProfile
+    """
+    firefox_profile = webdriver.FirefoxProfile()
+    # Direct = 0, Manual = 1, PAC = 2, AUTODETECT = 4, SYSTEM = 5
+    firefox_profile.set_preference("network.proxy.type", 1)
+    firefox_profile.set_preference("signon.autologin.proxy", True)
+    firefox_profile.set_preference("network.websocket.enabled", False)
+    firefox_profile.set_preference("network.proxy.http", proxy.host)
+    firefox_profile.set_preference("network.proxy.http_port", int(proxy.port))
+    firefox_profile.set_preference("network.proxy.ssl", proxy.host)
+    firefox_profile.set_preference("network.proxy.ssl_port", int(proxy.port))
+    firefox_profile.set_preference("network.proxy.socks", proxy.host)
+    firefox_profile.set_preference("network.proxy.socks_port", int(proxy.port))
+    firefox_profile.set_preference("network.proxy.no_proxies_on", "localhost, 127.0.0.1")
+    if block_images:
+        firefox_profile.set_preference("permissions.default.image", 2)
+    # Disable Flash for website to load quicker
+    firefox_profile.set_preference("dom.ipc.plugins.enabled.libflashplayer.so", "false")
+    if proxy.username and proxy.password:
+        firefox_profile.set_preference("network.proxy.socks_username", proxy.username)
+        firefox_profile.set_preference("network.proxy.socks_password", proxy.password)
+        firefox_profile.set_preference("network.proxy.https_username", proxy.username)
+        firefox_profile.set_preference("network.proxy.https_password", proxy.password)
+    firefox_profile.update_preferences()
+    return firefox_profile
+
+
+class BrowserBackend:
+    """
+    Start webdrivers of one browser kind.
+
+    Attributes:
+        headless (bool): Run without a visible window.
+        timeout (float): Seconds allowed for the driver to start and answer.
+        page_load_timeout (float): Seconds a page load may take, None for the
+            driver's default.
+        blocking (BlockingPolicy): Resources the browser may not fetch, None
+            to leave the browser defaults alone.
+        capture (bool): Start the browser through seleniumwire so its traffic
+            can be inspected, see `vin_scrapper.capture`.
+        metrics (StageMetrics): Times `driver_install` and `browser_start`.
+        driver_version (str): Pinned webdriver version, None for the latest.
+    """
+
+    name = None
+    driver_name = None
+
+    def __init__(
+        self,
+        headless=True,
+        timeout=60,
+        page_load_timeout=None,
+        blocking=None,
+        capture=False,
+        metrics=None,
+        driver_version=None,
+    ):
+        self.headless = headless
+        self.timeout = timeout
+        self.page_load_timeout = page_load_timeout
+        self.blocking = blocking
+        self.capture = capture
+        self.metrics = metrics or StageMetrics(enabled=False)
+        self.driver_version = driver_version
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(headless={self.headless})"
+
+    def download(self):
+        """Download the webdriver binary with webdriver_manager, returns its path."""
+        raise NotImplementedError
+
+    def install(self):
+        """Path of the webdriver binary, resolved once and cached on disk."""
+        return driver_cache().resolve(
+            self.driver_name, self.download, version=self.driver_version
+        )
+
+    def prebuild(self, proxies=()):
+        """Prepare whatever can be shared by drivers using these proxies."""
+
+    def launch(self, executable_path, proxy=None, headless=True):
+        """Start the browser, see `start`."""
+        raise NotImplementedError
+
+    def start(self, proxy=None, headless=None):
+        """Start a new webdriver.
+
+        Args:
+            proxy (ProxySettings, optional): Proxy to route the browser through.
+            headless (bool, optional): Overrides `headless` for this driver.
+
+        Returns:
+            Object: WebDriver
+        """
+        with self.metrics.stage("driver_install"):
+            executable_path = self.install()
+        with self.metrics.stage("browser_start"):
+            driver = self.launch(
+                executable_path,
+                proxy=proxy,
+                headless=self.headless if headless is None else headless,
+            )
+        if self.page_load_timeout:
+            driver.set_page_load_timeout(self.page_load_timeout)
+        if self.blocking is not None:
+            self.blocking.install(driver)
+        return driver
+
+
+class FirefoxBackend(BrowserBackend):
+    """
+    Firefox through geckodriver.
+
+    Proxies are set in the profile, alternative proxies (and capture) go through
+    seleniumwire.
+    """
+
+    name = "firefox"
+    driver_name = "geckodriver"
+
+    def download(self):
+        return firefox_manager.GeckoDriverManager(
+            version=self.driver_version or "latest"
+        ).install()
+
+    def options(self, headless=True):
+        options = webdriver.FirefoxOptions()
+        options.headless = headless
+        return options
+
+    def _profile_key(self, proxy=None):
+        if proxy is not None and proxy.seleniumwire:
+            proxy = None
+        prefs = self.blocking.firefox_preferences() if self.blocking is not None else {}
+        if proxy is None and not prefs:
+            return None
+        proxy_key = (
+            (proxy.host, str(proxy.port), proxy.username, proxy.password)
+            if proxy is not None
+            else None
+        )
+        return proxy_key, tuple(sorted(prefs.items()))
+
+    def _build_profile(self, proxy=None):
+        profile = None
+        if proxy is not None and not proxy.seleniumwire:
+            profile = firefox_proxy_profile(proxy)
+        if self.blocking is not None:
+            profile = profile or webdriver.FirefoxProfile()
+            for name, value in self.blocking.firefox_preferences().items():
+                profile.set_preference(name, value)
+            profile.update_preferences()
+        return profile
+
+    def profile(self, proxy=None):
+        """Profile for a proxy, from a template built once per configuration."""
+        key = self._profile_key(proxy)
+        if key is None:
+            return None
+        if key[0] is not None:
+            logger.info("Accessing URL using proxy settings: {}", proxy)
+        return profile_templates().get(key, lambda: self._build_profile(proxy))
+
+    def prebuild(self, proxies=()):
+        """Build the profile templates of these proxies ahead of the first start."""
+        for proxy in list(proxies) or [None]:
+            key = self._profile_key(proxy)
+            if key is not None:
+                profile_templates().prepare(key, lambda: self._build_profile(proxy))
+
+    def launch(self, executable_path, proxy=None, headless=True):
+        options = self.options(headless)
+        if self.capture or (proxy is not None and proxy.seleniumwire):
+            if proxy is not None:
+                logger.info("Accessing URL using alternative proxy settings: {}", proxy)
+            return wirewebdriver.Firefox(
+                executable_path=executable_path,
+                options=options,
+                firefox_profile=self.profile(),
+                seleniumwire_options=seleniumwire_options(proxy),
+                timeout=self.timeout,
+            )
+        return webdriver.Firefox(
+            executable_path=executable_path,
+            options=options,
+            firefox_profile=self.profile(proxy),
+            timeout=self.timeout,
+        )
+
+
+class ChromiumBackend(BrowserBackend):
+    """
+    Headless Chromium/Chrome through chromedriver.
+
+    Chromium cannot authenticate against a proxy from the command line, so
+    proxies with credentials, alternative proxies and capture go through
+    seleniumwire.
+    """
+
+    name = "chromium"
+    driver_name = "chromedriver"
+
+    ARGUMENTS = (
+        "--disable-dev-shm-usage",
+        "--disable-gpu",
+        "--disable-extensions",
+        "--no-first-run",
+        "--no-default-browser-check",
+        "--no-sandbox",
+        "--window-size=1280,1024",
+    )
+
+    def download(self):
+        return chrome_manager.ChromeDriverManager(
+            version=self.driver_version or "latest"
+        ).install()
+
+    def options(self, headless=True):
+        options = webdriver.ChromeOptions()
+        options.headless = headless
+        for argument in self.ARGUMENTS:
+            options.add_argument(argument)
+        if self.blocking is not None and self.blocking.chromium_preferences():
+            options.add_experimental_option("prefs", self.blocking.chromium_preferences())
+        return options
+
+    def launch(self, executable_path, proxy=None, headless=True):
+        options = self.options(headless)
+        wire = self.capture or (
+            proxy is not None and (proxy.seleniumwire or proxy.username)
+        )
+        if wire:
+            if proxy is not None:
+                logger.info("Accessing URL using alternative proxy settings: {}", proxy)
+            driver = wirewebdriver.Chrome(
+                executable_path=executable_path,
+                options=options,
+                seleniumwire_options=seleniumwire_options(proxy),
+            )
+        else:
+            if proxy is not None:
+                logger.info("Accessing URL using proxy settings: {}", proxy)
+                options.add_argument(f"--proxy-server=http://{proxy.host}:{proxy.port}")
+            driver = webdriver.Chrome(executable_path=executable_path, options=options)
+        return set_command_timeout(driver, self.timeout)
+
+
+BACKENDS = {
+    FirefoxBackend.name: FirefoxBackend,
+    ChromiumBackend.name: ChromiumBackend,
+    "chrome": ChromiumBackend,
+}
+
+
+def get_backend(name):
+    """Backend class by name, ie "firefox" or "chromium".
+
+    Raises:
+        RuntimeError: If there is no such backend.
+    """
+    try:
+        return BACKENDS[str(name).lower()]
+    except KeyError:
+        raise RuntimeError(
+            f"{name} is not a supported browser: {', '.join(sorted(BACKENDS))}"
+        )
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+
+"""Resource-blocking policy: keep images, media, fonts and trackers off the wire."""
+
+import re
+from collections import Counter
+from urllib.parse import urlparse
+
+from loguru import logger
+
+__all__ = ["BlockingPolicy"]
+
+IMAGES = "images"
+MEDIA = "media"
+FONTS = "fonts"
+STYLESHEETS = "css"
+TRACKERS = "trackers"
+
+CATEGORIES = (IMAGES, MEDIA, FONTS, STYLESHEETS, TRACKERS)
+# Stylesheets are left alone by default, the state dropdown needs them to open.
+DEFAULT_CATEGORIES = (IMAGES, MEDIA, FONTS, TRACKERS)
+
+EXTENSIONS = {
+    IMAGES: (".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".ico", ".bmp", ".avif"),
+    MEDIA: (".mp4", ".webm", ".m4v", ".mov", ".mp3", ".m4a", ".ogg", ".wav", ".m3u8"),
+    FONTS: (".woff", ".woff2", ".ttf", ".otf", ".eot"),
+    STYLESHEETS: (".css",),
+}
+
+TRACKER_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "adservice.google.com",
+    "connect.facebook.net",
+    "amazon-adsystem.com",
+    "bat.bing.com",
+    "clarity.ms",
+    "hotjar.com",
+    "segment.io",
+    "segment.com",
+    "mixpanel.com",
+    "fullstory.com",
+    "optimizely.com",
+    "nr-data.net",
+    "scorecardresearch.com",
+    "quantserve.com",
+    "criteo.com",
+    "taboola.com",
+    "outbrain.com",
+)
+
+# Rough transfer size of one blocked request, for the bytes saved estimates.
+AVERAGE_BYTES = {
+    IMAGES: 40 * 1024,
+    MEDIA: 500 * 1024,
+    FONTS: 35 * 1024,
+    STYLESHEETS: 25 * 1024,
+    TRACKERS: 30 * 1024,
+}
+
+# Where seleniumwire sends blocked requests, nothing listens on the discard port so
+# they fail without leaving the machine. The path carries the blocked category.
+BLOCKED_URL = "http://127.0.0.1:9/blocked/"
+
+PAGE_PROBE_SCRIPT = """
+const domains = arguments[0];
+const counts = {
+    images: Array.from(document.images).filter(img => img.currentSrc || img.src).length,
+    media: document.querySelectorAll(
+        "video[src], audio[src], video source, audio source").length,
+    fonts: document.fonts ? Array.from(document.fonts).length : 0,
+    css: document.querySelectorAll('link[rel~="stylesheet"]').length,
+    trackers: Array.from(document.scripts).filter(
+        s => s.src && domains.some(d => s.src.includes(d))).length,
+};
+const loaded = performance.getEntriesByType("resource").reduce(
+    (total, entry) => total + (entry.transferSize || 0), 0);
+return [counts, loaded];
+"""
+
+
+class BlockingPolicy:
+    """
+    Which resources the browser may not fetch, applied on every driver start.
+
+    The policy is applied through browser preferences (Firefox profile prefs,
+    Chromium content settings and DevTools blocked urls) and, on seleniumwire
+    drivers, by rewriting matching requests to a dead local url, see `install`.
+    Without seleniumwire, Firefox only blocks the trackers on its own tracking
+    protection list, not `domains`.
+
+    Usage:
+        policy = BlockingPolicy.from_string("images,fonts,trackers")
+
+    Attributes:
+        categories (frozenset): Blocked categories, see CATEGORIES.
+        domains (tuple): Third-party/analytics domains blocked as trackers.
+    """
+
+    def __init__(self, categories=DEFAULT_CATEGORIES, domains=TRACKER_DOMAINS):
+        unknown = set(categories) - set(CATEGORIES)
+        if unknown:
+            raise RuntimeError(
+                f"Unknown resource categories {', '.join(sorted(unknown))}, "
+                f"choose from: {', '.join(CATEGORIES)}"
+            )
+        self.categories = frozenset(categories)
+        self.domains = tuple(domains)
+        self._warned = False
+
+    @classmethod
+    def from_string(cls, value):
+        """Policy from a comma separated list of categories, "none" or "all"."""
+        value = (value or "").strip().lower()
+        if value in ("", "none"):
+            return cls(categories=())
+        if value == "all":
+            return cls(categories=CATEGORIES)
+        return cls(categories=[part.strip() for part in value.split(",") if part.strip()])
+
+    def __bool__(self):
+        return bool(self.categories)
+
+    def __repr__(self):
+        return f"BlockingPolicy({','.join(sorted(self.categories)) or 'none'})"
+
+    def classify(self, url):
+        """Blocked category of a url, None if it may be fetched."""
+        parsed = urlparse(url)
+        if TRACKERS in self.categories:
+            host = parsed.hostname or ""
+            if any(host == d or host.endswith("." + d) for d in self.domains):
+                return TRACKERS
+        path = parsed.path.lower()
+        for category, extensions in EXTENSIONS.items():
+            if category in self.categories and path.endswith(extensions):
+                return category
+        return None
+
+    def firefox_preferences(self):
+        prefs = {"permissions.default.image": 2 if IMAGES in self.categories else 1}
+        if MEDIA in self.categories:
+            prefs["media.autoplay.default"] = 5
+            prefs["media.autoplay.blocking_policy"] = 2
+            prefs["media.preload.default"] = 0
+            prefs["media.preload.auto"] = 0
+        if FONTS in self.categories:
+            prefs["gfx.downloadable_fonts.enabled"] = False
+            prefs["browser.display.use_document_fonts"] = 0
+        if STYLESHEETS in self.categories:
+            prefs["permissions.default.stylesheet"] = 2
+        if TRACKERS in self.categories:
+            prefs["privacy.trackingprotection.enabled"] = True
+            prefs["privacy.trackingprotection.socialtracking.enabled"] = True
+        return prefs
+
+    def chromium_preferences(self):
+        prefs = {}
+        if IMAGES in self.categories:
+            prefs["profile.managed_default_content_settings.images"] = 2
+        return prefs
+
+    def url_patterns(self):
+        """Wildcard url patterns for DevTools `Network.setBlockedURLs`."""
+        patterns = []
+        for category, extensions in EXTENSIONS.items():
+            if category in self.categories:
+                patterns.extend(f"*{extension}*" for extension in extensions)
+        if TRACKERS in self.categories:
+            patterns.extend(f"*{domain}/*" for domain in self.domains)
+        return patterns
+
+    def rewrite_rules(self):
+        """seleniumwire rewrite rules sending blocked requests to BLOCKED_URL."""
+        rules = []
+        if TRACKERS in self.categories and self.domains:
+            domains = "|".join(re.escape(domain) for domain in self.domains)
+            rules.append(
+                (rf"(?i)^https?://(?:[^/?#]*\.)?(?:{domains})(?=[:/?#]|$).*", TRACKERS)
+            )
+        for category, extensions in EXTENSIONS.items():
+            if category in self.categories:
+                suffixes = "|".join(re.escape(extension[1:]) for extension in extensions)
+                rules.append(
+                    (rf"(?i)^https?://[^?#]*\.(?:{suffixes})(?=[?#]|$).*", category)
+                )
+        return [(pattern, BLOCKED_URL + category) for pattern, category in rules]
+
+    def install(self, driver):
+        """Apply the runtime part of the policy to a freshly started driver.
+
+        seleniumwire drivers get `rewrite_rules`, the requests they block are
+        counted in `driver.blocked_requests` by `count`. Chromium drivers block
+        through DevTools, which does not say what it blocked.
+        """
+        driver.blocked_requests = Counter()
+        if not self:
+            return
+        if hasattr(type(driver), "rewrite_rules"):
+            driver.rewrite_rules = self.rewrite_rules()
+        elif hasattr(driver, "execute_cdp_cmd"):
+            try:
+                driver.execute_cdp_cmd("Network.enable", {})
+                driver.execute_cdp_cmd(
+                    "Network.setBlockedURLs", {"urls": self.url_patterns()}
+                )
+            except Exception as err:
+                logger.warning("Could not block urls through DevTools: {}", err)
+        elif TRACKERS in self.categories and not self._warned:
+            self._warned = True
+            logger.warning(
+                "Tracker domains are not blocked without seleniumwire, see --capture, "
+                "only the browser's own tracking protection applies."
+            )
+
+    def count(self, driver):
+        """Count the requests a seleniumwire driver blocked, before they are cleared.
+
+        Returns:
+            Counter: The driver's `blocked_requests` per category.
+        """
+        blocked = getattr(driver, "blocked_requests", None)
+        if blocked is None:
+            blocked = driver.blocked_requests = Counter()
+        for request in driver.requests:
+            if request.path.startswith(BLOCKED_URL):
+                blocked[request.path.rpartition("/")[2]] += 1
+        return blocked
+
+    def report(self, driver):
+        """Requests and bytes the policy saved since the last report.
+
+        Only requests known to be blocked are counted, see `count`, bytes saved
+        are estimated from AVERAGE_BYTES. The resources of blocked categories the
+        current page references are reported apart, whether or not the browser
+        was kept from fetching them.
+
+        Returns:
+            dict: requests_blocked, bytes_saved_estimate, bytes_loaded, blocked
+                requests per category (by_category) and referenced resources per
+                category (resources_referenced).
+        """
+        by_category = Counter()
+        referenced = Counter()
+        bytes_loaded = None
+        if self:
+            try:
+                counts, bytes_loaded = driver.execute_script(
+                    PAGE_PROBE_SCRIPT, list(self.domains)
+                )
+                referenced.update(
+                    {key: int(counts.get(key) or 0) for key in self.categories}
+                )
+            except Exception as err:
+                logger.debug("Could not probe the page for blocked resources: {}", err)
+            blocked = getattr(driver, "blocked_requests", Counter())
+            by_category = blocked - getattr(driver, "_blocked_reported", Counter())
+            driver._blocked_reported = Counter(blocked)
+        return {
+            "requests_blocked": sum(by_category.values()),
+            "bytes_saved_estimate": sum(
+                AVERAGE_BYTES[category] * count for category, count in by_category.items()
+            ),
+            "bytes_loaded": bytes_loaded,
+            "by_category": dict(+by_category),
+            "resources_referenced": dict(+referenced),
+        }
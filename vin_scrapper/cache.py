@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+"""Persistent licence plate -> VIN result cache."""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from loguru import logger
+
+__all__ = ["ResultCache", "cache_key"]
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "vin_scrapper", "results.sqlite"
+)
+DEFAULT_TTL = 30 * 24 * 60 * 60
+DEFAULT_NEGATIVE_TTL = 60 * 60
+DEFAULT_MAX_ENTRIES = 100000
+
+
+def cache_key(licence_number, state):
+    """Normalize a licence plate and state into a cache key, ie ('7ABC123', 'CA')."""
+    return (
+        re.sub(r"[^A-Z0-9]", "", str(licence_number).upper()),
+        str(state).strip().upper(),
+    )
+
+
+class ResultCache:
+    """
+    SQLite backed cache of lookup results with TTLs and an LRU size cap.
+
+    Results without a VIN are stored as negative entries with a short TTL, so
+    unknown plates are not looked up over and over.
+
+    Attributes:
+        path (str): SQLite database path, ":memory:" for a process local cache.
+        ttl (float): Seconds a positive entry stays valid.
+        negative_ttl (float): Seconds a "not found" entry stays valid.
+        max_entries (int): Least recently used entries are evicted above this.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups not in the cache, or expired.
+    """
+
+    def __init__(
+        self,
+        path=DEFAULT_CACHE_PATH,
+        ttl=DEFAULT_TTL,
+        negative_ttl=DEFAULT_NEGATIVE_TTL,
+        max_entries=DEFAULT_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " plate TEXT NOT NULL,"
+            " state TEXT NOT NULL,"
+            " data TEXT NOT NULL,"
+            " expires REAL NOT NULL,"
+            " accessed REAL NOT NULL,"
+            " PRIMARY KEY (plate, state))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)"
+        )
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get(self, licence_number, state):
+        """Get a cached result.
+
+        Returns:
+            dict: The cached data structure, an empty "VIN Number" marks a negative
+                entry. None on a miss or an expired entry.
+        """
+        key = cache_key(licence_number, state)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, expires FROM results WHERE plate = ? AND state = ?", key
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute(
+                        "DELETE FROM results WHERE plate = ? AND state = ?", key
+                    )
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE results SET accessed = ? WHERE plate = ? AND state = ?",
+                (now,) + key,
+            )
+            self._conn.commit()
+            data = json.loads(row[0])
+            self.hits += 1
+            if not data.get("VIN Number"):
+                self.negative_hits += 1
+            return data
+
+    def put(self, licence_number, state, data, ttl=None):
+        """Store a result, results without a VIN use the negative TTL.
+
+        Args:
+            licence_number (str): Licence plate number.
+            state (str): Two letter state code, ie CA.
+            data (dict): Data structure to store.
+            ttl (float, optional): Overrides the default TTL for this entry.
+        """
+        if ttl is None:
+            ttl = self.ttl if data.get("VIN Number") else self.negative_ttl
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                cache_key(licence_number, state)
+                + (json.dumps(data, sort_keys=True), now + ttl, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def invalidate(self, licence_number, state):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM results WHERE plate = ? AND state = ?",
+                cache_key(licence_number, state),
+            )
+            self._conn.commit()
+
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM results WHERE rowid IN ("
+                " SELECT rowid FROM results ORDER BY accessed LIMIT ?)",
+                (excess,),
+            )
+            self.evictions += excess
+            logger.debug("Evicted {} least recently used cache entries", excess)
+
+    def stats(self):
+        """Hit/miss counters as a dict."""
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
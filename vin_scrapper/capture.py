@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+"""Read lookup results straight from the GraphQL traffic seleniumwire intercepts."""
+
+import gzip
+import json
+import time
+import zlib
+
+from loguru import logger
+
+from vin_scrapper.graphql import licence_plate_from_body
+
+try:
+    import brotli
+except ImportError:  # Optional, only needed for `Content-Encoding: br`
+    brotli = None
+
+__all__ = [
+    "CaptureMiss",
+    "captured_licence_plate",
+    "clear_captured",
+    "decode_body",
+    "supports_capture",
+    "wait_for_licence_plate",
+]
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class CaptureMiss(Exception):
+    pass
+
+
+def decode_body(body, encoding=None):
+    """Undo the `Content-Encoding` of a captured body.
+
+    seleniumwire 1.0 hands request bodies over as they went over the wire, but
+    response bodies already gunzipped or inflated under the original header, so
+    gzip and deflate are only undone when the body is still encoded.
+
+    Args:
+        body (bytes): Raw body.
+        encoding (str, optional): `Content-Encoding` header value.
+
+    Returns:
+        bytes: The decoded body.
+
+    Raises:
+        CaptureMiss: If the encoding is not supported.
+    """
+    for coding in reversed([c.strip().lower() for c in (encoding or "").split(",")]):
+        if coding in ("", "identity"):
+            continue
+        if coding in ("gzip", "x-gzip"):
+            if body[:2] == GZIP_MAGIC:
+                body = gzip.decompress(body)
+        elif coding == "deflate":
+            try:
+                body = zlib.decompress(body)
+            except zlib.error:  # Raw deflate stream, without the zlib header.
+                try:
+                    body = zlib.decompress(body, -zlib.MAX_WBITS)
+                except zlib.error:  # Already inflated.
+                    pass
+        elif coding == "br" and brotli is not None:
+            body = brotli.decompress(body)
+        else:
+            raise CaptureMiss(f"Unsupported Content-Encoding: {coding}")
+    return body
+
+
+def _header(headers, name):
+    for key, value in dict(headers or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _is_licence_plate_query(request, licence_number, state):
+    if request.method != "POST" or "graphql" not in request.path:
+        return False
+    try:
+        encoding = _header(request.headers, "content-encoding")
+        payload = json.loads(decode_body(request.body, encoding))
+    except (ValueError, TypeError, OSError, zlib.error, CaptureMiss):
+        return False
+    for operation in payload if isinstance(payload, list) else [payload]:
+        variables = operation.get("variables") or {}
+        if operation.get("operationName") == "licensePlate" and (
+            str(variables.get("number", "")).upper() == str(licence_number).upper()
+            and str(variables.get("state", "")).upper() == str(state).upper()
+        ):
+            return True
+    return False
+
+
+def captured_licence_plate(driver, licence_number, state):
+    """Find the `licensePlate` answer for a plate among the captured requests.
+
+    Returns:
+        dict: The `licensePlate` object, None when the site knows no such plate.
+
+    Raises:
+        CaptureMiss: If no answer for the plate has been captured (yet).
+        GraphQLError: If the API answered with GraphQL errors.
+    """
+    for request in reversed(driver.requests):
+        response = request.response
+        if response is None:
+            continue
+        if not _is_licence_plate_query(request, licence_number, state):
+            continue
+        if response.status_code != 200:
+            raise CaptureMiss(f"licensePlate query answered {response.status_code}")
+        try:
+            encoding = _header(response.headers, "content-encoding")
+            body = decode_body(response.body, encoding)
+            return licence_plate_from_body(json.loads(body))
+        except (ValueError, OSError, zlib.error) as err:
+            raise CaptureMiss(f"Unreadable licensePlate response: {err}")
+    raise CaptureMiss(f"No licensePlate response captured for {licence_number}")
+
+
+def wait_for_licence_plate(driver, licence_number, state, timeout=10, poll_frequency=0.1):
+    """Wait for the `licensePlate` answer of a plate to be captured.
+
+    Returns:
+        dict: The `licensePlate` object, None when the site knows no such plate.
+
+    Raises:
+        CaptureMiss: If no usable answer was captured within `timeout` seconds.
+        GraphQLError: If the API answered with GraphQL errors.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return captured_licence_plate(driver, licence_number, state)
+        except CaptureMiss as err:
+            if time.monotonic() >= deadline:
+                raise
+            logger.trace("Waiting for capture: {}", err)
+        time.sleep(poll_frequency)
+
+
+def supports_capture(driver):
+    """Whether the driver is a seleniumwire driver with a request store."""
+    # Checked on the class, the instance property fetches every captured request.
+    return driver is not None and hasattr(type(driver), "requests")
+
+
+def clear_captured(driver):
+    """Drop captured requests so the next lookup only scans its own traffic."""
+    if supports_capture(driver):
+        del driver.requests
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+"""Single-flight coalescing of identical in-flight lookups."""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+__all__ = ["SingleFlight", "default_single_flight"]
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time, concurrent callers of the same key
+    wait for it and share its result or its error.
+
+    Every flight is backed by a `concurrent.futures.Future`, so threads and
+    asyncio tasks can join each other's flights.
+
+    Usage:
+        flights = SingleFlight()
+        flights.do(("7ABC123", "CA"), scrapper.lookup, "7ABC123", "CA")
+        await flights.do_async(("7ABC123", "CA"), engine.lookup, "7ABC123", "CA")
+
+    Attributes:
+        executed (int): Calls actually run.
+        coalesced (int): Calls answered by joining a flight, ie lookups saved.
+    """
+
+    def __init__(self):
+        self.executed = 0
+        self.coalesced = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key):
+        """Get the flight for `key` and whether the caller has to run it."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return flight, False
+            flight = self._flights[key] = Future()
+            self.executed += 1
+            return flight, True
+
+    def _land(self, key, flight, result=None, error=None):
+        with self._lock:
+            del self._flights[key]
+        if error is not None:
+            flight.set_exception(error)
+        else:
+            flight.set_result(result)
+
+    def do(self, key, fn, *args, **kwargs):
+        """Call `fn(*args, **kwargs)`, or wait for the call already in flight for `key`."""
+        flight, leader = self._join(key)
+        if not leader:
+            return flight.result()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as err:
+            self._land(key, flight, error=err)
+            raise
+        self._land(key, flight, result)
+        return result
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        """Await `fn(*args, **kwargs)`, or the call already in flight for `key`."""
+        flight, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(flight)
+        try:
+            result = await fn(*args, **kwargs)
+        except BaseException as err:
+            self._land(key, flight, error=err)
+            raise
+        self._land(key, flight, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._flights),
+            }
+
+
+_default = SingleFlight()
+
+
+def default_single_flight():
+    """The process-wide SingleFlight shared by every session."""
+    return _default
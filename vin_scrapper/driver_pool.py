@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+"""Pool of warm, already-navigated webdrivers shared across lookups."""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from loguru import logger
+
+__all__ = ["DriverPool", "DriverPoolExhausted"]
+
+CLEAR_INPUTS_SCRIPT = """
+for (const input of document.querySelectorAll("input")) {
+    input.value = "";
+    input.dispatchEvent(new Event("input", {bubbles: true}));
+}
+"""
+
+
+class DriverPoolExhausted(Exception):
+    pass
+
+
+class DriverPool:
+    """
+    Hand out already-started drivers sitting on the search page.
+
+    Drivers are started lazily up to `size`, health-checked before every lease
+    and reset (inputs cleared, search page reloaded) when they are released.
+    Crashed drivers are discarded and replaced, so are drivers the recycle
+    policy says are due for a restart. A lease waiting for a driver is woken as
+    soon as one is released or discarded.
+
+    Attributes:
+        factory (callable): Returns a new, started webdriver.
+        url (str): Search page every pooled driver is parked on.
+        size (int): Maximum number of drivers in the pool.
+        recycle (RecyclePolicy): Restart drivers when released past its limits.
+    """
+
+    def __init__(self, factory, url, size=2, recycle=None):
+        self.factory = factory
+        self.url = url
+        self.size = max(1, int(size))
+        self.recycle = recycle
+        self._idle = []
+        self._created = 0
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._created
+
+    def start(self, count=None):
+        """Start `count` drivers up front, defaults to the pool size."""
+        for _ in range(min(count or self.size, self.size) - self._created):
+            driver = self._new_driver()
+            if driver is None:
+                break
+            self._put_idle(driver)
+
+    def _new_driver(self):
+        with self._condition:
+            if self._created >= self.size:
+                return None
+            self._created += 1
+        return self._launch()
+
+    def _launch(self):
+        """Start a driver in a slot already counted in `_created`."""
+        try:
+            driver = self.factory()
+            driver.get(self.url)
+        except Exception:
+            self._free_slot()
+            raise
+        logger.debug("Started pooled driver {}/{}", self._created, self.size)
+        return driver
+
+    def _put_idle(self, driver):
+        with self._condition:
+            self._idle.append(driver)
+            self._condition.notify()
+
+    def _free_slot(self):
+        """Give a slot back and wake a lease waiting for one."""
+        with self._condition:
+            self._created -= 1
+            self._condition.notify()
+
+    @staticmethod
+    def is_healthy(driver):
+        """Check that the browser behind a driver still answers."""
+        try:
+            return driver.execute_script("return document.readyState") is not None
+        except Exception:
+            return False
+
+    def lease(self, timeout=None):
+        """Lease a healthy driver, starting or replacing one if needed.
+
+        Args:
+            timeout (float, optional): Seconds to wait for a free driver.
+
+        Raises:
+            DriverPoolExhausted: If no driver became free within `timeout`.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            driver = self._take(deadline, timeout)
+            if self.is_healthy(driver):
+                return driver
+            logger.warning("Replacing crashed pooled driver.")
+            self.discard(driver)
+
+    def _take(self, deadline, timeout):
+        """Pop an idle driver, or start one in a free slot, waiting for either."""
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Driver pool is closed.")
+                if self._idle:
+                    return self._idle.pop()
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise DriverPoolExhausted(
+                        f"No free driver within {timeout}s (size={self.size})."
+                    )
+                self._condition.wait(remaining)
+        return self._launch()
+
+    def release(self, driver):
+        """Reset a driver back to the search page and return it to the pool."""
+        if self._closed:
+            self.discard(driver)
+            return
+        reason = self.recycle.reason(driver) if self.recycle is not None else None
+        if reason is not None:
+            self.recycle.record(driver, reason)
+            self.discard(driver)
+            return
+        try:
+            driver.execute_script(CLEAR_INPUTS_SCRIPT)
+            driver.get(self.url)
+        except Exception as err:
+            logger.warning("Could not reset pooled driver ({}), discarding.", err)
+            self.discard(driver)
+            return
+        self._put_idle(driver)
+
+    def discard(self, driver):
+        """Drop a driver from the pool for good."""
+        self._quit(driver)
+        self._free_slot()
+
+    @staticmethod
+    def _quit(driver):
+        tracker = getattr(driver, "process_tracker", None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        if tracker is not None:
+            tracker.shutdown()
+
+    @contextmanager
+    def leased(self, timeout=None):
+        driver = self.lease(timeout=timeout)
+        try:
+            yield driver
+        except Exception:
+            if self.is_healthy(driver):
+                self.release(driver)
+            else:
+                self.discard(driver)
+            raise
+        else:
+            self.release(driver)
+
+    def close(self):
+        """Quit every idle driver, leased drivers are quit when released."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        for driver in idle:
+            self.discard(driver)
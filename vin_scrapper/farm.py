@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+
+"""Multi-process worker farm, one browser per process, with crash isolation."""
+
+import itertools
+import multiprocessing
+import os
+import time
+from collections import Counter
+from multiprocessing.connection import wait
+
+from loguru import logger
+
+__all__ = ["WorkerFarm", "WorkerFarmFailed", "worker_filename"]
+
+IDLE = -1
+# Longest wait before restarting a worker that keeps dying.
+MAX_RESTART_BACKOFF = 30.0
+
+
+class WorkerFarmFailed(Exception):
+    pass
+
+
+def worker_filename(filename, worker_id):
+    """Per-worker report file, ie metrics.prom -> metrics.worker-0.prom."""
+    root, extension = os.path.splitext(filename)
+    return f"{root}.worker-{worker_id}{extension}"
+
+
+def _worker_main(worker_id, jobs, results, in_flight, scrapper_kwargs):
+    """Worker process: own a VinScrapper and serve lookups until a None job.
+
+    The in-flight job id is written to shared memory and results are sent over a
+    pipe synchronously, so neither is lost when the process dies mid lookup.
+    `in_flight` is a synchronized array, every write holds its lock.
+
+    On a clean exit the worker writes its own `metrics_file` and `proxy_stats`,
+    named by `worker_filename`.
+    """
+    from vin_scrapper.vin_scrapper import VinScrapper
+
+    scrapper = VinScrapper(**scrapper_kwargs)
+    try:
+        for job_id, licence_number, location in iter(jobs.get, None):
+            in_flight[worker_id] = job_id
+            result = {"licence_number": licence_number, "location": location}
+            try:
+                result.update(scrapper.lookup(licence_number, location))
+            except Exception as err:
+                result["error"] = str(err) or err.__class__.__name__
+                result["error_class"] = err.__class__.__name__
+            results.send((job_id, result))
+            in_flight[worker_id] = IDLE
+    finally:
+        scrapper.close_session()
+        proxy_stats = scrapper_kwargs.get("proxy_stats")
+        if proxy_stats and scrapper.proxy_pool is not None:
+            scrapper.proxy_pool.export_stats(worker_filename(proxy_stats, worker_id))
+        metrics_file = scrapper_kwargs.get("metrics_file")
+        if metrics_file:
+            scrapper.metrics.dump(worker_filename(metrics_file, worker_id))
+
+
+class WorkerFarm:
+    """
+    Spread lookups over N worker processes fed from a shared job queue.
+
+    Every worker owns its own VinScrapper and browser. A worker that dies, ie a
+    crashed geckodriver taking the process down, is restarted and its in-flight
+    job is requeued, up to `max_attempts` times per job. Restarts back off
+    exponentially from `restart_backoff` seconds while a worker keeps dying
+    without finishing a lookup, after `max_restarts` such deaths in a row, ie a
+    broken driver path, the farm fails with WorkerFarmFailed.
+
+    Attributes:
+        workers (int): Number of worker processes, defaults to the cpu count.
+        max_attempts (int): Times a job may kill a worker before it is failed.
+        max_restarts (int): Restarts in a row a worker gets without finishing
+            a lookup.
+        restart_backoff (float): Seconds before the first restart of a worker.
+        scrapper_kwargs (dict): Passed to every worker's VinScrapper, must pickle.
+    """
+
+    def __init__(
+        self,
+        workers=None,
+        max_attempts=3,
+        poll_interval=0.5,
+        max_restarts=5,
+        restart_backoff=0.5,
+        **scrapper_kwargs,
+    ):
+        self.workers = int(workers or os.cpu_count() or 1)
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.max_restarts = max_restarts
+        self.restart_backoff = restart_backoff
+        self.scrapper_kwargs = scrapper_kwargs
+        self.restarts = 0
+        self._ctx = multiprocessing.get_context("spawn")
+        self._jobs = None
+        self._readers = {}
+        self._processes = {}
+        self._in_flight = None
+        self._crashes = Counter()
+        self._respawn_at = {}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        if self._jobs is not None:
+            return
+        self._jobs = self._ctx.Queue()
+        self._in_flight = self._ctx.Array("q", [IDLE] * self.workers)
+        for worker_id in range(self.workers):
+            self._spawn(worker_id)
+
+    def _spawn(self, worker_id):
+        reader, writer = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self._jobs, writer, self._in_flight, self.scrapper_kwargs),
+            name=f"vin_scrapper-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        writer.close()
+        self._processes[worker_id] = process
+        self._readers[worker_id] = reader
+        logger.debug("Started worker {} (pid {})", worker_id, process.pid)
+
+    def _receive(self, reader, pending, attempts):
+        """Collect every result waiting on a worker's pipe."""
+        results = []
+        try:
+            while reader.poll():
+                job_id, result = reader.recv()
+                if job_id in pending:
+                    del pending[job_id]
+                    del attempts[job_id]
+                    results.append(result)
+        except (EOFError, OSError):
+            pass
+        return results
+
+    def _reap(self, pending, attempts):
+        """Schedule restarts of dead workers, requeue or fail their in-flight jobs.
+
+        Raises:
+            WorkerFarmFailed: If a worker used up its `max_restarts`.
+        """
+        collected = []
+        for worker_id, process in list(self._processes.items()):
+            if process.is_alive():
+                continue
+            del self._processes[worker_id]
+            reader = self._readers.pop(worker_id)
+            collected.extend(self._receive(reader, pending, attempts))
+            reader.close()
+            with self._in_flight.get_lock():
+                job_id = self._in_flight[worker_id]
+                self._in_flight[worker_id] = IDLE
+            self._crashes[worker_id] += 1
+            crashes = self._crashes[worker_id]
+            if crashes > self.max_restarts:
+                raise WorkerFarmFailed(
+                    f"Worker {worker_id} died {crashes} times in a row without "
+                    f"finishing a lookup (exit code {process.exitcode})."
+                )
+            delay = min(self.restart_backoff * 2 ** (crashes - 1), MAX_RESTART_BACKOFF)
+            logger.warning(
+                "Worker {} died (exit code {}), restarting in {:.1f}s.",
+                worker_id,
+                process.exitcode,
+                delay,
+            )
+            self._respawn_at[worker_id] = time.monotonic() + delay
+            if job_id not in pending:
+                continue
+            attempts[job_id] += 1
+            licence_number, location = pending[job_id]
+            if attempts[job_id] >= self.max_attempts:
+                del pending[job_id]
+                collected.append(
+                    {
+                        "licence_number": licence_number,
+                        "location": location,
+                        "error": f"Worker crashed {attempts[job_id]} times",
+                        "error_class": "WorkerCrashed",
+                    }
+                )
+            else:
+                self._jobs.put((job_id, licence_number, location))
+        now = time.monotonic()
+        for worker_id, when in list(self._respawn_at.items()):
+            if when <= now:
+                del self._respawn_at[worker_id]
+                self.restarts += 1
+                self._spawn(worker_id)
+        return collected
+
+    def map(self, pairs):
+        """Look up every pair, yielding results in completion order.
+
+        Args:
+            pairs (iterable): (licence_number, location) pairs, read lazily.
+
+        Yields:
+            dict: The data structure plus `licence_number` and `location`, and an
+                `error` message and `error_class` if the lookup failed.
+        """
+        self.start()
+        pairs = iter(pairs)
+        job_ids = itertools.count()
+        pending = {}
+        attempts = {}
+        exhausted = False
+        while True:
+            # Keep the queue topped up without reading the whole input.
+            while not exhausted and len(pending) < self.workers * 2:
+                try:
+                    licence_number, location = next(pairs)
+                except StopIteration:
+                    exhausted = True
+                    break
+                job_id = next(job_ids)
+                pending[job_id] = (licence_number, location)
+                attempts[job_id] = 0
+                self._jobs.put((job_id, licence_number, location))
+            if not pending:
+                break
+            if self._readers:
+                ready = wait(list(self._readers.values()), self.poll_interval)
+            else:  # Every worker is waiting to be restarted.
+                ready = []
+                time.sleep(self.poll_interval)
+            for worker_id, reader in list(self._readers.items()):
+                if reader in ready:
+                    results = self._receive(reader, pending, attempts)
+                    if results:
+                        self._crashes.pop(worker_id, None)
+                    yield from results
+            yield from self._reap(pending, attempts)
+
+    def close(self, timeout=10):
+        """Stop the workers, giving each `timeout` seconds to close its browser."""
+        if self._jobs is None:
+            return
+        for _ in self._processes:
+            self._jobs.put(None)
+        for process in self._processes.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        for reader in self._readers.values():
+            reader.close()
+        self._processes.clear()
+        self._readers.clear()
+        self._respawn_at.clear()
+        self._crashes.clear()
+        self._jobs = self._in_flight = None
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+
+"""Browser-free lookups against the vehiclehistory.com GraphQL API."""
+
+from urllib.parse import urljoin
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp
+except ImportError:  # Optional, see `pip install vin_scrapper[async]`
+    aiohttp = None
+
+__all__ = [
+    "AsyncGraphQLEngine",
+    "GraphQLEngine",
+    "GraphQLError",
+    "graphql_url_for",
+    "licence_plate_from_body",
+    "licence_plate_payload",
+]
+
+LICENCE_PLATE_QUERY = (
+    "query licensePlate($number: String!, $state: String!) {\n"
+    "  licensePlate(number: $number, state: $state) {\n"
+    "    vin\n"
+    "    __typename\n"
+    "  }\n"
+    "}\n"
+)
+
+DEFAULT_HEADERS = {
+    "Accept": "application/json",
+    "Content-Type": "application/json",
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64; rv:68.0) Gecko/20100101 Firefox/68.0"
+    ),
+}
+
+
+class GraphQLError(Exception):
+    pass
+
+
+def graphql_url_for(url):
+    """Derive the GraphQL endpoint from a page url.
+
+    Args:
+        url (str): Any url on the target site.
+
+    Returns:
+        str: The site's `/graphql` endpoint.
+    """
+    return urljoin(url or "https://www.vehiclehistory.com", "/graphql")
+
+
+def licence_plate_payload(licence_number, state):
+    return {
+        "operationName": "licensePlate",
+        "variables": {"number": licence_number, "state": state.upper()},
+        "query": LICENCE_PLATE_QUERY,
+    }
+
+
+def licence_plate_from_body(body):
+    """Get the `licensePlate` object out of a GraphQL response body.
+
+    Raises:
+        GraphQLError: If the API answers with GraphQL errors.
+    """
+    if body.get("errors"):
+        raise GraphQLError(
+            "; ".join(err.get("message", str(err)) for err in body["errors"])
+        )
+    return (body.get("data") or {}).get("licensePlate")
+
+
+class GraphQLEngine:
+    """
+    Query the `licensePlate` GraphQL endpoint directly over a pooled session.
+
+    Attributes:
+        url (str): GraphQL endpoint.
+        session (requests.Session): Keep-alive session shared by all lookups.
+    """
+
+    def __init__(self, url=None, proxy=None, timeout=60, pool_size=10, headers=None):
+        self.url = url or graphql_url_for(None)
+        self._timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(DEFAULT_HEADERS)
+        if headers:
+            self.session.headers.update(headers)
+        if proxy and proxy.host:
+            self.session.proxies = {"http": proxy.url, "https": proxy.url}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def query(self, licence_number, state, proxy=None):
+        """Send the `licensePlate` query.
+
+        Args:
+            licence_number (str): Licence plate number.
+            state (str): Two letter state code, ie CA.
+            proxy (ProxySettings, optional): Overrides the session proxy for this query.
+
+        Returns:
+            dict: The `licensePlate` object, or None if the plate is unknown.
+
+        Raises:
+            GraphQLError: If the API answers with GraphQL errors.
+        """
+        payload = licence_plate_payload(licence_number, state)
+        logger.debug("POST {} variables={}", self.url, payload["variables"])
+        proxies = {"http": proxy.url, "https": proxy.url} if proxy else None
+        response = self.session.post(
+            self.url, json=payload, timeout=self._timeout, proxies=proxies
+        )
+        response.raise_for_status()
+        return licence_plate_from_body(response.json())
+
+    def lookup(self, licence_number, state, data_structure=None, proxy=None):
+        """Fill a data structure with the VIN for a licence plate.
+
+        Args:
+            licence_number (str): Licence plate number.
+            state (str): Two letter state code, ie CA.
+            data_structure (dict, optional): Structure to fill in place.
+            proxy (ProxySettings, optional): Overrides the session proxy.
+
+        Returns:
+            dict: The filled data structure.
+        """
+        if data_structure is None:
+            data_structure = {"VIN Number": ""}
+        result = self.query(licence_number, state, proxy=proxy) or {}
+        data_structure["VIN Number"] = result.get("vin") or ""
+        return data_structure
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncGraphQLEngine:
+    """
+    asyncio flavour of GraphQLEngine, requires aiohttp.
+
+    The aiohttp session is created on first use so that it binds to the running
+    event loop.
+
+    Attributes:
+        url (str): GraphQL endpoint.
+    """
+
+    def __init__(self, url=None, proxy=None, timeout=60, pool_size=10, headers=None):
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncGraphQLEngine requires aiohttp: pip install vin_scrapper[async]"
+            )
+        self.url = url or graphql_url_for(None)
+        self._timeout = timeout
+        self._pool_size = pool_size
+        self._headers = dict(DEFAULT_HEADERS, **(headers or {}))
+        self._proxy = proxy.url if proxy and proxy.host else None
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self._pool_size),
+                headers=self._headers,
+                timeout=aiohttp.ClientTimeout(total=self._timeout),
+            )
+        return self._session
+
+    async def query(self, licence_number, state):
+        """Send the `licensePlate` query, see GraphQLEngine.query."""
+        payload = licence_plate_payload(licence_number, state)
+        logger.debug("POST {} variables={}", self.url, payload["variables"])
+        async with self._get_session().post(
+            self.url, json=payload, proxy=self._proxy
+        ) as response:
+            response.raise_for_status()
+            return licence_plate_from_body(await response.json(content_type=None))
+
+    async def lookup(self, licence_number, state, data_structure=None):
+        """Fill a data structure with the VIN, see GraphQLEngine.lookup."""
+        if data_structure is None:
+            data_structure = {"VIN Number": ""}
+        result = await self.query(licence_number, state) or {}
+        data_structure["VIN Number"] = result.get("vin") or ""
+        return data_structure
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -0,0 +1,534 @@
+# -*- coding: utf-8 -*-
+
+"""Shared lookup queue: workers on many hosts lease, heartbeat and settle jobs."""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+
+from loguru import logger
+
+from vin_scrapper.cache import cache_key
+from vin_scrapper.jobs import DONE, FAILED, default_retry_policies
+
+__all__ = [
+    "Job",
+    "LeaseLost",
+    "QueueBackend",
+    "QueueWorker",
+    "SQLiteQueue",
+    "default_worker_id",
+]
+
+QUEUED = "queued"
+LEASED = "leased"
+
+# error_class of jobs whose workers kept dying with the lease held.
+LEASE_EXPIRED = "LeaseExpired"
+
+
+class LeaseLost(Exception):
+    pass
+
+
+class Job:
+    """
+    A leased lookup job.
+
+    Attributes:
+        id (int): Job id in the queue.
+        licence_number (str): Licence plate number.
+        location (str): Two letter state code.
+        attempts (int): Leases so far, this one included.
+        token (str): Proves the lease is still this worker's.
+    """
+
+    __slots__ = ("id", "licence_number", "location", "attempts", "token")
+
+    def __init__(self, id, licence_number, location, attempts, token):
+        self.id = id
+        self.licence_number = licence_number
+        self.location = location
+        self.attempts = attempts
+        self.token = token
+
+    def __repr__(self):
+        return (
+            f"Job({self.id}, {self.licence_number!r}, {self.location!r}, "
+            f"attempts={self.attempts})"
+        )
+
+
+class QueueBackend:
+    """
+    Where lookup jobs live, shared by every worker.
+
+    A job is queued, leased by one worker for `visibility` seconds, then either
+    done, failed or queued again. A lease nobody heartbeats expires and the job
+    can be leased by another worker. Settling a job checks the lease token, so a
+    worker whose lease was reclaimed cannot overwrite the new owner's outcome.
+
+    Subclass it to put the queue on another store, SQLiteQueue is the reference.
+    """
+
+    def put(self, pairs):
+        """Queue (licence_number, location) pairs.
+
+        Plates already queued or leased are ignored. Finished plates, done or
+        failed, are queued again with their attempts reset, ie a later batch or
+        a retry of the failures.
+
+        Returns:
+            int: Jobs added or queued again.
+        """
+        raise NotImplementedError
+
+    def lease(self, worker, limit=1, visibility=300, max_attempts=None):
+        """Lease up to `limit` available jobs.
+
+        Args:
+            worker (str): Worker id, recorded on the lease.
+            limit (int, optional): Most jobs to lease.
+            visibility (float, optional): Seconds until the lease expires.
+            max_attempts (int, optional): Fail expired jobs leased this many times.
+
+        Returns:
+            list: Job objects.
+        """
+        raise NotImplementedError
+
+    def heartbeat(self, job, visibility=300):
+        """Extend a lease by `visibility` seconds from now.
+
+        Raises:
+            LeaseLost: If the lease expired and was taken by another worker.
+        """
+        raise NotImplementedError
+
+    def complete(self, job, result):
+        """Write the result of a job back.
+
+        Raises:
+            LeaseLost: If the lease is no longer this job's.
+        """
+        raise NotImplementedError
+
+    def fail(self, job, result, retry_at=None):
+        """Fail a job for good, or queue it again at `retry_at` (epoch seconds).
+
+        Raises:
+            LeaseLost: If the lease is no longer this job's.
+        """
+        raise NotImplementedError
+
+    def reclaim(self):
+        """Queue jobs whose leases expired again, returns how many."""
+        raise NotImplementedError
+
+    def counts(self):
+        """Number of jobs per status."""
+        raise NotImplementedError
+
+    def results(self):
+        """Yield the result dicts of finished jobs, done or failed."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SQLiteQueue(QueueBackend):
+    """
+    Queue in a SQLite file, shared by every process that can open it.
+
+    Leases are taken in `BEGIN IMMEDIATE` transactions, so two workers never
+    lease the same job. Across hosts, the file must be on a filesystem with
+    working POSIX locks; network filesystems without them need another backend.
+
+    Attributes:
+        path (str): SQLite database path.
+    """
+
+    def __init__(self, path, timeout=30):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY,"
+            " plate TEXT NOT NULL,"
+            " state TEXT NOT NULL,"
+            " licence_number TEXT NOT NULL,"
+            " location TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " available REAL NOT NULL,"
+            " worker TEXT,"
+            " token TEXT,"
+            " expires REAL,"
+            " error_class TEXT,"
+            " error TEXT,"
+            " result TEXT,"
+            " updated REAL NOT NULL,"
+            " UNIQUE (plate, state))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, available)"
+        )
+
+    def _write(self, statements):
+        """Run `statements(conn)` in one write transaction, returns its result."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                value = statements(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return value
+
+    def put(self, pairs):
+        now = time.time()
+        rows = [
+            cache_key(licence_number, location)
+            + (licence_number, location, QUEUED, now, now)
+            for licence_number, location in pairs
+        ]
+
+        def statements(conn):
+            requeued = conn.executemany(
+                "UPDATE jobs SET licence_number = ?, location = ?, status = ?,"
+                " attempts = 0, available = ?, worker = NULL, token = NULL,"
+                " expires = NULL, error_class = NULL, error = NULL, result = NULL,"
+                " updated = ? WHERE plate = ? AND state = ? AND status IN (?, ?)",
+                [row[2:] + row[:2] + (DONE, FAILED) for row in rows],
+            ).rowcount
+            added = conn.executemany(
+                "INSERT OR IGNORE INTO jobs"
+                " (plate, state, licence_number, location, status, available, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            ).rowcount
+            return requeued + added
+
+        return self._write(statements)
+
+    def lease(self, worker, limit=1, visibility=300, max_attempts=None):
+        def statements(conn):
+            now = time.time()
+            if max_attempts:
+                self._expire(conn, now, max_attempts)
+            rows = conn.execute(
+                "SELECT id, licence_number, location, attempts FROM jobs"
+                " WHERE (status = ? AND available <= ?) OR (status = ? AND expires < ?)"
+                " ORDER BY available, id LIMIT ?",
+                (QUEUED, now, LEASED, now, limit),
+            ).fetchall()
+            jobs = []
+            for job_id, licence_number, location, attempts in rows:
+                token = uuid.uuid4().hex
+                job = Job(job_id, licence_number, location, attempts + 1, token)
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = ?, worker = ?, token = ?,"
+                    " expires = ?, updated = ? WHERE id = ?",
+                    (LEASED, job.attempts, worker, token, now + visibility, now, job_id),
+                )
+                jobs.append(job)
+            return jobs
+
+        return self._write(statements)
+
+    @staticmethod
+    def _expire(conn, now, max_attempts):
+        """Fail expired jobs that used up their attempts, ie kept crashing workers."""
+        rows = conn.execute(
+            "SELECT id, licence_number, location FROM jobs"
+            " WHERE status = ? AND expires < ? AND attempts >= ?",
+            (LEASED, now, max_attempts),
+        ).fetchall()
+        for job_id, licence_number, location in rows:
+            result = {
+                "licence_number": licence_number,
+                "location": location,
+                "error": "Lease expired too often",
+                "error_class": LEASE_EXPIRED,
+            }
+            conn.execute(
+                "UPDATE jobs SET status = ?, error_class = ?, error = ?, result = ?,"
+                " token = NULL, updated = ? WHERE id = ?",
+                (
+                    FAILED,
+                    LEASE_EXPIRED,
+                    result["error"],
+                    json.dumps(result, sort_keys=True),
+                    now,
+                    job_id,
+                ),
+            )
+        if rows:
+            logger.warning("Failed {} jobs whose leases kept expiring", len(rows))
+
+    def _settle(self, job, assignments, values):
+        def statements(conn):
+            updated = conn.execute(
+                f"UPDATE jobs SET {assignments}, token = NULL, updated = ?"
+                " WHERE id = ? AND token = ?",
+                values + (time.time(), job.id, job.token),
+            ).rowcount
+            if not updated:
+                raise LeaseLost(f"{job} is no longer leased to this worker.")
+
+        self._write(statements)
+
+    def heartbeat(self, job, visibility=300):
+        def statements(conn):
+            updated = conn.execute(
+                "UPDATE jobs SET expires = ?, updated = ? WHERE id = ? AND token = ?",
+                (time.time() + visibility, time.time(), job.id, job.token),
+            ).rowcount
+            if not updated:
+                raise LeaseLost(f"{job} is no longer leased to this worker.")
+
+        self._write(statements)
+
+    def complete(self, job, result):
+        self._settle(
+            job,
+            "status = ?, error_class = NULL, error = NULL, result = ?",
+            (DONE, json.dumps(result, sort_keys=True)),
+        )
+
+    def fail(self, job, result, retry_at=None):
+        if retry_at is None:
+            status, available = FAILED, time.time()
+        else:
+            status, available = QUEUED, retry_at
+        self._settle(
+            job,
+            "status = ?, available = ?, error_class = ?, error = ?, result = ?",
+            (
+                status,
+                available,
+                result.get("error_class"),
+                result.get("error"),
+                json.dumps(result, sort_keys=True),
+            ),
+        )
+
+    def reclaim(self):
+        now = time.time()
+        return self._write(
+            lambda conn: conn.execute(
+                "UPDATE jobs SET status = ?, available = ?, token = NULL, updated = ?"
+                " WHERE status = ? AND expires < ?",
+                (QUEUED, now, now, LEASED, now),
+            ).rowcount
+        )
+
+    def counts(self):
+        with self._lock:
+            return dict(
+                self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+            )
+
+    def results(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT result FROM jobs WHERE status IN (?, ?) ORDER BY id",
+                (DONE, FAILED),
+            ).fetchall()
+        for (result,) in rows:
+            yield json.loads(result)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def default_worker_id():
+    """host:pid, unique across the workers of a fleet."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class _Heartbeat:
+    """Keep extending a job's lease on a background thread while it runs."""
+
+    def __init__(self, queue, job, visibility, interval):
+        self.queue = queue
+        self.job = job
+        self.visibility = visibility
+        self.interval = interval
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.queue.heartbeat(self.job, self.visibility)
+            except LeaseLost as err:
+                logger.warning("{}", err)
+                self.lost = True
+                return
+            except Exception as err:
+                logger.debug("Heartbeat of {} failed: {}", self.job, err)
+
+
+class QueueWorker:
+    """
+    Lease jobs from a shared queue and look them up until it is drained.
+
+    Every host or process runs its own worker with its own session, adding one
+    adds throughput. Failed lookups are retried, possibly by another worker,
+    with the backoff of `retry_policies`, like BatchJob does.
+
+    Usage:
+        queue = SQLiteQueue("/shared/plates.queue")
+        queue.put(pairs)
+        for result in QueueWorker(queue, VinScrapper(url=...)).run():
+            ...
+
+    Attributes:
+        queue (QueueBackend): Where the jobs are.
+        lookup (callable): Takes an iterable of pairs and yields result dicts,
+            a VinScrapper is wrapped into one.
+        worker_id (str): Recorded on leases, defaults to host:pid.
+        visibility (float): Seconds a lease lasts without a heartbeat.
+        heartbeat_interval (float): Seconds between heartbeats, a third of
+            `visibility` by default.
+        retry_policies (dict): error class -> RetryPolicy.
+        poll_interval (float): Seconds between polls of an empty queue.
+    """
+
+    def __init__(
+        self,
+        queue,
+        lookup,
+        worker_id=None,
+        visibility=300,
+        heartbeat_interval=None,
+        retry_policies=None,
+        poll_interval=1.0,
+    ):
+        self.queue = queue
+        self.lookup = lookup if callable(lookup) else self._session_lookup(lookup)
+        self.worker_id = worker_id or default_worker_id()
+        self.visibility = visibility
+        self.heartbeat_interval = heartbeat_interval or visibility / 3.0
+        self.retry_policies = (
+            default_retry_policies() if retry_policies is None else retry_policies
+        )
+        self.max_attempts = max(
+            [policy.max_attempts for policy in self.retry_policies.values()] or [1]
+        )
+        self.poll_interval = poll_interval
+        self.counters = Counter()
+
+    @staticmethod
+    def _session_lookup(scrapper):
+        def lookup(pairs):
+            for licence_number, location in pairs:
+                result = {"licence_number": licence_number, "location": location}
+                try:
+                    result.update(scrapper.lookup(licence_number, location))
+                except Exception as err:
+                    result["error"] = str(err) or err.__class__.__name__
+                    result["error_class"] = err.__class__.__name__
+                yield result
+
+        return lookup
+
+    def _settle(self, job, result):
+        """Write a result back, returns it when it is final."""
+        if "error" not in result:
+            self.queue.complete(job, result)
+            self.counters[DONE] += 1
+            return result
+        policy = self.retry_policies.get(result.get("error_class") or "Exception")
+        if policy is not None and job.attempts < policy.max_attempts:
+            delay = policy.delay(job.attempts)
+            logger.info(
+                "{} ({}) failed with {}, retry {} in {:.1f}s",
+                job.licence_number,
+                job.location,
+                result.get("error_class"),
+                job.attempts,
+                delay,
+            )
+            self.queue.fail(job, result, retry_at=time.time() + delay)
+            self.counters["retries"] += 1
+            return None
+        self.queue.fail(job, result)
+        self.counters[FAILED] += 1
+        return result
+
+    def run_one(self):
+        """Lease and run one job.
+
+        Returns:
+            tuple: (job, final result or None), None if no job was available.
+        """
+        jobs = self.queue.lease(
+            self.worker_id, visibility=self.visibility, max_attempts=self.max_attempts
+        )
+        if not jobs:
+            return None
+        job = jobs[0]
+        with _Heartbeat(self.queue, job, self.visibility, self.heartbeat_interval):
+            result = next(iter(self.lookup([(job.licence_number, job.location)])))
+        try:
+            return job, self._settle(job, result)
+        except LeaseLost as err:
+            logger.warning("Dropping the result of {}: {}", job, err)
+            self.counters["lost"] += 1
+            return job, None
+
+    def run(self, wait=False, stop=None):
+        """Work through the queue, yielding final results.
+
+        Args:
+            wait (bool, optional): Keep polling once the queue is drained, for
+                long running workers.
+            stop (threading.Event, optional): Set to stop after the current job.
+
+        Yields:
+            dict: Results of jobs that succeeded or failed for good.
+        """
+        while stop is None or not stop.is_set():
+            ran = self.run_one()
+            if ran is not None:
+                if ran[1] is not None:
+                    yield ran[1]
+                continue
+            counts = self.queue.counts()
+            if not wait and not counts.get(QUEUED) and not counts.get(LEASED):
+                return
+            time.sleep(self.poll_interval)
+
+    def summary(self):
+        return {
+            "worker": self.worker_id,
+            "done": self.counters[DONE],
+            "failed": self.counters[FAILED],
+            "retries": self.counters["retries"],
+            "lost": self.counters["lost"],
+            "queue_counts": self.queue.counts(),
+        }
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+
+"""Checkpointed, resumable batch jobs with per error class retries."""
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from loguru import logger
+
+from vin_scrapper.cache import cache_key
+
+__all__ = ["BatchJob", "JobJournal", "RetryPolicy", "default_retry_policies"]
+
+DONE = "done"
+FAILED = "failed"
+RETRYING = "retrying"
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with jitter for one class of errors.
+
+    The n-th retry waits between half and all of `base_delay * 2 ** (n - 1)`,
+    capped at `max_delay` seconds.
+
+    Attributes:
+        max_attempts (int): Attempts, first one included, before giving up.
+        base_delay (float): Seconds to back off before the first retry.
+        max_delay (float): Longest backoff in seconds.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=1.0, max_delay=60.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        """Seconds to wait after failed attempt number `attempt` (1 based)."""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+    def __repr__(self):
+        return (
+            f"RetryPolicy(max_attempts={self.max_attempts}, "
+            f"base_delay={self.base_delay}, max_delay={self.max_delay})"
+        )
+
+
+def default_retry_policies(max_attempts=3):
+    """Transient error classes worth retrying, anything else fails straight away."""
+    return {
+        "MissingPageSource": RetryPolicy(max_attempts, base_delay=2.0),
+        "TimeoutException": RetryPolicy(max_attempts, base_delay=5.0),
+        "LookupTimeout": RetryPolicy(max_attempts, base_delay=5.0),
+        "WebDriverException": RetryPolicy(max_attempts, base_delay=5.0),
+        "ConnectionError": RetryPolicy(max_attempts, base_delay=1.0),
+        "GraphQLError": RetryPolicy(max_attempts, base_delay=1.0),
+        "InvalidVIN": RetryPolicy(max_attempts, base_delay=1.0),
+    }
+
+
+class JobJournal:
+    """
+    SQLite journal of a batch job: one row per plate with its status and result.
+
+    Attributes:
+        path (str): SQLite database path, ":memory:" for a journal of this run only.
+    """
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            " plate TEXT NOT NULL,"
+            " state TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL,"
+            " error_class TEXT,"
+            " error TEXT,"
+            " result TEXT,"
+            " updated REAL NOT NULL,"
+            " PRIMARY KEY (plate, state))"
+        )
+        self._conn.commit()
+
+    def status(self, licence_number, state):
+        """Journaled (status, attempts) of a plate, None if it was never tried."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT status, attempts FROM items WHERE plate = ? AND state = ?",
+                cache_key(licence_number, state),
+            ).fetchone()
+
+    def record(self, licence_number, state, status, attempts, result):
+        """Write the outcome of an attempt, committed before the next one starts."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                cache_key(licence_number, state)
+                + (
+                    status,
+                    attempts,
+                    result.get("error_class"),
+                    result.get("error"),
+                    json.dumps(result, sort_keys=True),
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+
+    def counts(self):
+        """Number of journaled plates per status."""
+        with self._lock:
+            return dict(
+                self._conn.execute("SELECT status, COUNT(*) FROM items GROUP BY status")
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class BatchJob:
+    """
+    Run a batch of lookups, journaling every outcome so a rerun skips finished work.
+
+    Plates already done, or failed for good, in the journal are skipped. Failed
+    lookups whose `error_class` has a retry policy are retried with backoff, the
+    rest are failed straight away.
+
+    Usage:
+        job = BatchJob(JobJournal("plates.journal"))
+        for result in job.run(pairs, lambda pairs: lookup_each(scrapper, pairs)):
+            ...
+        job.write_summary("plates.summary.json")
+
+    Attributes:
+        journal (JobJournal): Where outcomes are checkpointed.
+        retry_policies (dict): error class -> RetryPolicy.
+        retry_failed (bool): Also rerun plates journaled as failed.
+    """
+
+    def __init__(self, journal=None, retry_policies=None, retry_failed=False):
+        self.journal = journal or JobJournal()
+        self.retry_policies = (
+            default_retry_policies() if retry_policies is None else retry_policies
+        )
+        self.retry_failed = retry_failed
+        self.counters = Counter()
+        self.errors = Counter()
+        self.failures = Counter()
+        self.started = None
+        self.finished = None
+
+    def _todo(self, pairs, attempts):
+        for licence_number, location in pairs:
+            self.counters["total"] += 1
+            key = cache_key(licence_number, location)
+            if key in attempts:
+                self.counters["duplicates"] += 1
+                continue
+            journaled = self.journal.status(licence_number, location)
+            if journaled is not None and (
+                journaled[0] == DONE or (journaled[0] == FAILED and not self.retry_failed)
+            ):
+                self.counters["skipped"] += 1
+                continue
+            attempts[key] = 0
+            yield licence_number, location
+
+    def _settle(self, result, attempts, retries):
+        """Journal a result and schedule a retry, returns it when it is final."""
+        licence_number, location = result["licence_number"], result["location"]
+        key = cache_key(licence_number, location)
+        attempts[key] += 1
+        if "error" not in result:
+            self.journal.record(licence_number, location, DONE, attempts[key], result)
+            self.counters[DONE] += 1
+            return result
+        error_class = result.get("error_class") or "Exception"
+        self.errors[error_class] += 1
+        policy = self.retry_policies.get(error_class)
+        if policy is not None and attempts[key] < policy.max_attempts:
+            delay = policy.delay(attempts[key])
+            logger.info(
+                "{} ({}) failed with {}, retry {} in {:.1f}s",
+                licence_number,
+                location,
+                error_class,
+                attempts[key],
+                delay,
+            )
+            self.journal.record(licence_number, location, RETRYING, attempts[key], result)
+            self.counters["retries"] += 1
+            retries.append((time.monotonic() + delay, licence_number, location))
+            return None
+        self.journal.record(licence_number, location, FAILED, attempts[key], result)
+        self.counters[FAILED] += 1
+        self.failures[error_class] += 1
+        return result
+
+    def run(self, pairs, lookup):
+        """Look up every pair not finished yet, yielding final results.
+
+        Args:
+            pairs (iterable): (licence_number, location) pairs, read lazily.
+            lookup (callable): Takes an iterable of pairs and yields result dicts
+                with `licence_number`, `location` and, on failure, `error` and
+                `error_class`, ie `lookup_each` or `WorkerFarm.map`.
+
+        Yields:
+            dict: Results of plates that succeeded or failed for good.
+        """
+        self.started = time.time()
+        attempts = {}
+        retries = []
+        try:
+            for result in lookup(self._todo(pairs, attempts)):
+                final = self._settle(result, attempts, retries)
+                if final is not None:
+                    yield final
+            while retries:
+                retries.sort()
+                wait = retries[0][0] - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                now = time.monotonic()
+                due = [(plate, state) for when, plate, state in retries if when <= now]
+                retries = [retry for retry in retries if retry[0] > now]
+                for result in lookup(due):
+                    final = self._settle(result, attempts, retries)
+                    if final is not None:
+                        yield final
+        finally:
+            self.finished = time.time()
+
+    def summary(self):
+        """Job level counts, error classes and throughput."""
+        seconds = (self.finished or time.time()) - (self.started or time.time())
+        processed = self.counters[DONE] + self.counters[FAILED]
+        return {
+            "journal": self.journal.path,
+            "started": self.started,
+            "finished": self.finished,
+            "seconds": round(seconds, 3),
+            "total": self.counters["total"],
+            "skipped": self.counters["skipped"],
+            "duplicates": self.counters["duplicates"],
+            "done": self.counters[DONE],
+            "failed": self.counters[FAILED],
+            "retries": self.counters["retries"],
+            "lookups_per_sec": round(processed / seconds, 3) if seconds else None,
+            "errors_by_class": dict(self.errors.most_common()),
+            "failures_by_class": dict(self.failures.most_common()),
+            "journal_counts": self.journal.counts(),
+        }
+
+    def write_summary(self, filename):
+        with open(filename, "w") as summary_file:
+            json.dump(self.summary(), summary_file, indent=4, sort_keys=True)
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+"""Deferred imports, so HTTP and cache-only lookups never load the browser stack."""
+
+import importlib
+import threading
+
+__all__ = ["LazyModule"]
+
+
+class LazyModule:
+    """
+    Stand-in for a module, or an attribute of one, imported on first use.
+
+    Usage:
+        webdriver = LazyModule("selenium.webdriver")
+        By = LazyModule("selenium.webdriver.common.by", "By")
+
+    Attribute access and calls are forwarded to the real object. Use a module
+    attribute in `except` clauses and `isinstance` checks, ie
+    `except exceptions.TimeoutException`, never the stand-in itself.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, module, attribute=None):
+        self.__dict__["_module"] = module
+        self.__dict__["_attribute"] = attribute
+        self.__dict__["_target"] = None
+
+    def _resolve(self):
+        target = self.__dict__["_target"]
+        if target is None:
+            with self._lock:
+                target = self.__dict__["_target"]
+                if target is None:
+                    target = importlib.import_module(self._module)
+                    if self._attribute:
+                        target = getattr(target, self._attribute)
+                    self.__dict__["_target"] = target
+        return target
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._resolve(), name, value)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        name = f"{self._module}.{self._attribute}" if self._attribute else self._module
+        state = "loaded" if self.__dict__["_target"] is not None else "not loaded"
+        return f"<LazyModule {name} ({state})>"
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+"""Per-stage latency instrumentation of the VinScrapper lifecycle."""
+
+import json
+import math
+import threading
+import time
+from collections import deque
+
+__all__ = ["StageMetrics"]
+
+QUANTILES = (("p50", "0.5"), ("p95", "0.95"), ("p99", "0.99"))
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ("_metrics", "_stage", "_start")
+
+    def __init__(self, metrics, stage):
+        self._metrics = metrics
+        self._stage = stage
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._metrics.record(
+            self._stage, time.perf_counter() - self._start, error=exc_type is not None
+        )
+        return False
+
+
+def _percentile(ordered, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(percent / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class StageMetrics:
+    """
+    Aggregate stage timings in-process: counts, errors and p50/p95/p99.
+
+    When disabled, `stage()` hands back a shared no-op context manager so the
+    instrumented code pays next to nothing.
+
+    Usage:
+        metrics = StageMetrics()
+        with metrics.stage("navigate"):
+            ...
+
+    Attributes:
+        enabled (bool): Whether timings are recorded.
+        window (int): Samples kept per stage for the percentiles.
+    """
+
+    def __init__(self, enabled=True, window=10000):
+        self.enabled = enabled
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._errors = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        """Time the enclosed block as stage `name`."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self, name)
+
+    def record(self, name, seconds, error=False):
+        with self._lock:
+            if name not in self._samples:
+                self._samples[name] = deque(maxlen=self.window)
+                self._counts[name] = self._errors[name] = 0
+                self._totals[name] = 0.0
+            self._samples[name].append(seconds)
+            self._counts[name] += 1
+            self._totals[name] += seconds
+            if error:
+                self._errors[name] += 1
+
+    def reset(self):
+        with self._lock:
+            for store in (self._samples, self._counts, self._errors, self._totals):
+                store.clear()
+
+    def summary(self):
+        """Per-stage statistics, latencies in seconds.
+
+        Returns:
+            dict: stage -> count, errors, total, p50, p95, p99 and max.
+        """
+        with self._lock:
+            snapshot = {name: sorted(samples) for name, samples in self._samples.items()}
+            counts, errors, totals = (
+                dict(self._counts),
+                dict(self._errors),
+                dict(self._totals),
+            )
+        return {
+            name: {
+                "count": counts[name],
+                "errors": errors[name],
+                "total": totals[name],
+                "p50": _percentile(ordered, 50),
+                "p95": _percentile(ordered, 95),
+                "p99": _percentile(ordered, 99),
+                "max": ordered[-1] if ordered else None,
+            }
+            for name, ordered in snapshot.items()
+        }
+
+    def to_json(self):
+        return json.dumps(self.summary(), indent=4, sort_keys=True)
+
+    def to_prometheus(self, prefix="vin_scrapper"):
+        """Prometheus text exposition format, as a summary per stage."""
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per VinScrapper stage.",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        errors = [
+            f"# HELP {prefix}_stage_errors_total Errors raised per VinScrapper stage.",
+            f"# TYPE {prefix}_stage_errors_total counter",
+        ]
+        for name, stats in sorted(self.summary().items()):
+            label = f'stage="{name}"'
+            for key, quantile in QUANTILES:
+                if stats[key] is not None:
+                    lines.append(
+                        f'{prefix}_stage_seconds{{{label},quantile="{quantile}"}} '
+                        f"{stats[key]:.6f}"
+                    )
+            lines.append(f"{prefix}_stage_seconds_sum{{{label}}} {stats['total']:.6f}")
+            lines.append(f"{prefix}_stage_seconds_count{{{label}}} {stats['count']}")
+            errors.append(f"{prefix}_stage_errors_total{{{label}}} {stats['errors']}")
+        return "\n".join(lines + errors) + "\n"
+
+    def dump(self, filename):
+        """Write the metrics, Prometheus text for .prom/.txt files, json otherwise."""
+        prometheus = filename.endswith((".prom", ".txt"))
+        with open(filename, "w") as metrics_file:
+            metrics_file.write(self.to_prometheus() if prometheus else self.to_json())
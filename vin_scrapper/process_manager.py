@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+"""Track and shut down the exact geckodriver/browser processes of a session."""
+
+import json
+import os
+import threading
+
+import psutil
+from loguru import logger
+
+__all__ = ["ProcessTracker"]
+
+DEFAULT_REGISTRY_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "vin_scrapper", "pids"
+)
+
+
+def _same_process(pid, create_time):
+    """Whether `pid` is still the process we recorded, not a recycled pid."""
+    try:
+        return abs(psutil.Process(pid).create_time() - create_time) < 0.01
+    except psutil.Error:
+        return False
+
+
+def _terminate(procs, deadline):
+    """Terminate processes, killing whatever is left after `deadline` seconds."""
+    for proc in procs:
+        try:
+            proc.terminate()
+        except psutil.NoSuchProcess:
+            pass
+    _, alive = psutil.wait_procs(procs, timeout=deadline)
+    for proc in alive:
+        logger.warning("Killing pid {} after {}s", proc.pid, deadline)
+        try:
+            proc.kill()
+        except psutil.NoSuchProcess:
+            pass
+    psutil.wait_procs(alive, timeout=deadline)
+    return alive
+
+
+class ProcessTracker:
+    """
+    Record the pids a webdriver spawned (driver plus browser children) and shut
+    down only that process tree.
+
+    Tracked pids are also written to a registry file, so that processes left
+    behind by a crashed session can be reaped later with `reap_orphans`.
+
+    Attributes:
+        pids (dict): Tracked pid -> process create time.
+        registry_dir (str): Where registry files are kept.
+    """
+
+    _orphans_reaped = False
+    _reap_lock = threading.Lock()
+
+    def __init__(self, registry_dir=DEFAULT_REGISTRY_DIR):
+        self.registry_dir = registry_dir
+        self.pids = {}
+        self._root = None
+        self._registry_file = None
+
+    def track(self, driver):
+        """Start tracking the processes behind a webdriver."""
+        service = getattr(driver, "service", None)
+        process = getattr(service, "process", None)
+        if process is None:
+            logger.debug("Driver has no local service process to track.")
+            return self
+        self._root = process.pid
+        self.refresh()
+        return self
+
+    def refresh(self):
+        """Pick up processes the browser spawned since tracking started."""
+        if self._root is None:
+            return
+        try:
+            root = psutil.Process(self._root)
+            procs = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return
+        for proc in procs:
+            try:
+                self.pids.setdefault(proc.pid, proc.create_time())
+            except psutil.Error:
+                pass
+        self._write_registry()
+
+    def _write_registry(self):
+        try:
+            os.makedirs(self.registry_dir, exist_ok=True)
+            self._registry_file = os.path.join(
+                self.registry_dir, f"{os.getpid()}-{self._root}.json"
+            )
+            with open(self._registry_file, "w") as registry:
+                json.dump(
+                    {
+                        "owner": os.getpid(),
+                        "owner_create_time": psutil.Process().create_time(),
+                        "pids": self.pids,
+                    },
+                    registry,
+                )
+        except OSError as err:
+            logger.debug("Could not write process registry: {}", err)
+
+    def _remove_registry(self):
+        if self._registry_file:
+            try:
+                os.remove(self._registry_file)
+            except OSError:
+                pass
+            self._registry_file = None
+
+    def processes(self):
+        """Tracked processes that are still alive."""
+        self.refresh()
+        procs = []
+        for pid, create_time in self.pids.items():
+            if _same_process(pid, create_time):
+                procs.append(psutil.Process(pid))
+        return procs
+
+    def rss(self):
+        """Resident memory of the tracked process tree, in bytes."""
+        total = 0
+        for proc in self.processes():
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    def shutdown(self, deadline=5):
+        """Terminate the tracked tree, escalating to kill after `deadline` seconds.
+
+        Call after `driver.quit()`, it only cleans up what quit left behind.
+        """
+        procs = self.processes()
+        if procs:
+            logger.info("Cleaning up {} leftover driver/browser processes", len(procs))
+            _terminate(procs, deadline)
+        self.pids.clear()
+        self._remove_registry()
+
+    @classmethod
+    def reap_orphans(cls, registry_dir=DEFAULT_REGISTRY_DIR, deadline=5):
+        """Shut down processes recorded by sessions whose owner process is gone.
+
+        Returns:
+            int: Number of orphaned processes terminated.
+        """
+        reaped = 0
+        try:
+            entries = os.listdir(registry_dir)
+        except OSError:
+            return reaped
+        for entry in entries:
+            path = os.path.join(registry_dir, entry)
+            try:
+                with open(path) as registry:
+                    record = json.load(registry)
+            except (OSError, ValueError):
+                continue
+            if _same_process(record["owner"], record["owner_create_time"]):
+                continue
+            procs = [
+                psutil.Process(int(pid))
+                for pid, create_time in record["pids"].items()
+                if _same_process(int(pid), create_time)
+            ]
+            if procs:
+                logger.warning("Reaping {} orphaned processes from {}", len(procs), entry)
+                _terminate(procs, deadline)
+                reaped += len(procs)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return reaped
+
+    @classmethod
+    def reap_orphans_once(cls, registry_dir=DEFAULT_REGISTRY_DIR):
+        """Reap orphans the first time a session starts in this process."""
+        with cls._reap_lock:
+            if cls._orphans_reaped:
+                return
+            cls._orphans_reaped = True
+        cls.reap_orphans(registry_dir)
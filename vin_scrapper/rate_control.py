@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+
+"""Adaptive (AIMD) concurrency and rate control per target host."""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+from loguru import logger
+
+__all__ = ["AIMDController", "classify", "controller_for", "controllers"]
+
+OK = "ok"
+SLOW = "slow"
+TIMEOUT = "timeout"
+THROTTLED = "throttled"
+SERVER_ERROR = "server_error"
+MISSING_RESULT = "missing_result"
+ERROR = "error"
+
+# Longest sleep of a coroutine waiting for a slot between checks.
+ASYNC_POLL_INTERVAL = 0.05
+
+# Outcomes that mean the host is overloaded and concurrency must back off.
+CONGESTION = {SLOW, TIMEOUT, THROTTLED, SERVER_ERROR, MISSING_RESULT}
+
+TIMEOUT_ERRORS = {
+    "TimeoutException",
+    "TimeoutError",
+    "Timeout",
+    "ReadTimeout",
+    "ConnectTimeout",
+    "LookupTimeout",
+}
+
+
+def classify(error):
+    """Map a lookup error to a controller outcome.
+
+    Args:
+        error (Exception): The error raised by a lookup.
+
+    Returns:
+        str: One of TIMEOUT, THROTTLED, SERVER_ERROR, MISSING_RESULT or ERROR.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status", None)
+    if status == 429:
+        return THROTTLED
+    if isinstance(status, int) and status >= 500:
+        return SERVER_ERROR
+    name = error.__class__.__name__
+    if name == "MissingPageSource":
+        return MISSING_RESULT
+    if name in TIMEOUT_ERRORS or isinstance(error, asyncio.TimeoutError):
+        return TIMEOUT
+    return ERROR
+
+
+class _Slot:
+    """Holds one unit of concurrency, records the outcome when released."""
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.outcome = None
+
+    def __enter__(self):
+        self.controller.acquire()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        latency = time.perf_counter() - self._start
+        self.controller.release()
+        if self.outcome is None:
+            self.outcome = classify(exc) if exc is not None else OK
+        self.controller.record(self.outcome, latency)
+        return False
+
+    async def __aenter__(self):
+        await self.controller.acquire_async()
+        self._start = time.perf_counter()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+class AIMDController:
+    """
+    Additive-increase/multiplicative-decrease concurrency limit for one host.
+
+    The limit grows by `increase` after a full window of healthy lookups, ie
+    `limit` lookups in a row under `latency_target`, and is multiplied by
+    `decrease` on timeouts, HTTP 429/5xx, missing results or slow lookups, at
+    most once per `backoff_interval` seconds. `max_rate` optionally caps lookup
+    starts per second on top of the concurrency limit.
+
+    Attributes:
+        host (str): Host the controller guards.
+        limit (float): Current concurrency limit.
+        in_flight (int): Lookups currently holding a slot.
+        decisions (deque): Most recent limit changes.
+    """
+
+    def __init__(
+        self,
+        host,
+        initial=4,
+        minimum=1,
+        maximum=64,
+        increase=1,
+        decrease=0.5,
+        latency_target=None,
+        backoff_interval=1.0,
+        max_rate=None,
+    ):
+        self.host = host
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.backoff_interval = backoff_interval
+        self.max_rate = max_rate
+        self.in_flight = 0
+        self.decisions = deque(maxlen=50)
+        self._healthy = 0
+        self._last_decrease = 0.0
+        self._last_start = 0.0
+        self._condition = threading.Condition()
+
+    def slot(self):
+        """Context manager (sync or async) holding a slot for one lookup."""
+        return _Slot(self)
+
+    def acquire(self, timeout=None):
+        """Block until a slot is free under the current limit.
+
+        Returns:
+            bool: False if `timeout` expired first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                wait = self._wait_time()
+                if wait == 0:
+                    break
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._condition.wait(wait)
+            self._take()
+            return True
+
+    async def acquire_async(self):
+        """Wait for a slot like `acquire` without blocking the event loop.
+
+        Checks again every ASYNC_POLL_INTERVAL seconds at most, a cancelled
+        waiter holds nothing.
+        """
+        while True:
+            with self._condition:
+                wait = self._wait_time()
+                if wait == 0:
+                    self._take()
+                    return True
+            await asyncio.sleep(
+                ASYNC_POLL_INTERVAL if wait is None else min(wait, ASYNC_POLL_INTERVAL)
+            )
+
+    def _wait_time(self):
+        """Seconds until a slot may be taken, 0 now, None until one is released.
+
+        The caller holds the condition.
+        """
+        if self.in_flight >= max(int(self.limit), self.minimum):
+            return None
+        if not self.max_rate:
+            return 0
+        return max(0, self._last_start + 1.0 / self.max_rate - time.monotonic())
+
+    def _take(self):
+        self.in_flight += 1
+        self._last_start = time.monotonic()
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def record(self, outcome, latency=None):
+        """Feed the outcome of a lookup into the controller.
+
+        Args:
+            outcome (str): OK, or one of the failure outcomes, see `classify`.
+            latency (float, optional): Lookup duration in seconds.
+        """
+        if (
+            outcome == OK
+            and latency is not None
+            and self.latency_target
+            and latency > self.latency_target
+        ):
+            outcome = SLOW
+        with self._condition:
+            if outcome == OK:
+                self._healthy += 1
+                if self._healthy >= self.limit and self.limit < self.maximum:
+                    self._change(min(self.maximum, self.limit + self.increase), outcome)
+                    self._condition.notify_all()
+            elif outcome in CONGESTION:
+                self._healthy = 0
+                now = time.monotonic()
+                if now - self._last_decrease >= self.backoff_interval:
+                    self._last_decrease = now
+                    self._change(max(self.minimum, self.limit * self.decrease), outcome)
+
+    def _change(self, limit, reason):
+        self._healthy = 0
+        if limit == self.limit:
+            return
+        action = "increase" if limit > self.limit else "decrease"
+        self.decisions.append(
+            {
+                "time": time.time(),
+                "action": action,
+                "from": round(self.limit, 2),
+                "to": round(limit, 2),
+                "reason": reason,
+            }
+        )
+        logger.debug(
+            "{} concurrency limit {} {:.2f} -> {:.2f} ({})",
+            self.host,
+            action,
+            self.limit,
+            limit,
+            reason,
+        )
+        self.limit = limit
+
+    def snapshot(self):
+        """Current limit, lookups in flight and recent decisions."""
+        with self._condition:
+            return {
+                "host": self.host,
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "decisions": list(self.decisions),
+            }
+
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def controller_for(url, **kwargs):
+    """Get the process-wide controller for a url's host, creating it on first use.
+
+    Args:
+        url (str): Any url on the target host.
+        **kwargs: AIMDController settings, only used when the controller is created.
+    """
+    host = urlparse(url or "").netloc or url
+    with _controllers_lock:
+        if host not in _controllers:
+            _controllers[host] = AIMDController(host, **kwargs)
+        return _controllers[host]
+
+
+def controllers():
+    """Snapshots of every host's controller."""
+    with _controllers_lock:
+        current = list(_controllers.values())
+    return [controller.snapshot() for controller in current]
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""Restart long-lived browsers before they grow too big or too old."""
+
+import threading
+import time
+from collections import Counter, deque
+
+from loguru import logger
+
+__all__ = ["RecyclePolicy"]
+
+LOOKUPS = "lookups"
+RSS = "rss"
+AGE = "age"
+
+
+class RecyclePolicy:
+    """
+    When a browser is due for a restart: after `max_lookups` lookups, above
+    `max_rss` bytes of resident memory for its whole process tree, or once it
+    is `max_age` seconds old. Limits left at None are not checked.
+
+    The policy is only consulted between lookups, a browser is never restarted
+    while it is working on a plate.
+
+    Usage:
+        policy = RecyclePolicy(max_lookups=500, max_rss=1.5 * 2 ** 30)
+        if policy.reason(driver):
+            ...
+
+    Attributes:
+        max_lookups (int): Lookups a browser may serve.
+        max_rss (int): Bytes of resident memory the browser tree may use.
+        max_age (float): Seconds a browser may live.
+        events (deque): The latest recycle events, see `record`.
+    """
+
+    def __init__(self, max_lookups=None, max_rss=None, max_age=None, history=50):
+        self.max_lookups = int(max_lookups) if max_lookups else None
+        self.max_rss = int(max_rss) if max_rss else None
+        self.max_age = float(max_age) if max_age else None
+        self.events = deque(maxlen=history)
+        self._reasons = Counter()
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return any((self.max_lookups, self.max_rss, self.max_age))
+
+    def __repr__(self):
+        return (
+            f"RecyclePolicy(max_lookups={self.max_lookups}, max_rss={self.max_rss}, "
+            f"max_age={self.max_age})"
+        )
+
+    @staticmethod
+    def started(driver):
+        """Mark a freshly started driver, so its lookups and age are counted."""
+        driver.started_at = time.monotonic()
+        driver.lookups = 0
+        return driver
+
+    @staticmethod
+    def served(driver):
+        """Count a lookup the driver finished."""
+        driver.lookups = getattr(driver, "lookups", 0) + 1
+
+    @staticmethod
+    def _rss(driver):
+        tracker = getattr(driver, "process_tracker", None)
+        return tracker.rss() if tracker is not None else 0
+
+    def reason(self, driver):
+        """Why the driver should be restarted now, None if it may carry on."""
+        if driver is None or not self:
+            return None
+        if self.max_lookups and getattr(driver, "lookups", 0) >= self.max_lookups:
+            return LOOKUPS
+        started_at = getattr(driver, "started_at", None)
+        if self.max_age and started_at is not None:
+            if time.monotonic() - started_at >= self.max_age:
+                return AGE
+        if self.max_rss and self._rss(driver) >= self.max_rss:
+            return RSS
+        return None
+
+    def record(self, driver, reason):
+        """Report that the driver is being restarted.
+
+        Returns:
+            dict: The event: reason, lookups, rss (bytes), age (seconds) and time.
+        """
+        started_at = getattr(driver, "started_at", None)
+        event = {
+            "reason": reason,
+            "lookups": getattr(driver, "lookups", 0),
+            "rss": self._rss(driver),
+            "age": round(time.monotonic() - started_at, 3) if started_at else None,
+            "time": time.time(),
+        }
+        with self._lock:
+            self.events.append(event)
+            self._reasons[reason] += 1
+        logger.info(
+            "Recycling browser ({reason}) after {lookups} lookups, "
+            "{rss} bytes RSS, {age}s old",
+            **event,
+        )
+        return event
+
+    def stats(self):
+        with self._lock:
+            return {
+                "recycled": sum(self._reasons.values()),
+                "by_reason": dict(self._reasons),
+                "last": self.events[-1] if self.events else None,
+            }
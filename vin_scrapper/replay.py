@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+
+"""Record a session's traffic with seleniumwire and replay it offline."""
+
+import base64
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urldefrag
+
+from loguru import logger
+
+from vin_scrapper.capture import CaptureMiss, _header, decode_body
+
+__all__ = ["TrafficArchive"]
+
+ARCHIVE_VERSION = 1
+# Framing of the original connection, not of the replayed response.
+HOP_BY_HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "upgrade"}
+# Describe the body as it went over the wire, bodies are archived decoded.
+BODY_FRAMING_HEADERS = {"content-encoding", "content-length"}
+# Replayed urls, http://127.0.0.1:<port>/<scheme>/<host>/<path>, see `install`.
+REPLAY_REWRITE = r"^(https?)://"
+
+
+def _request_key(method, url, body=b"", encoding=None):
+    """What a request is replayed by: method, url and body, JSON bodies canonical."""
+    digest = ""
+    if body:
+        try:
+            payload = json.loads(decode_body(body, encoding))
+            body = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+        except (ValueError, TypeError, OSError, zlib.error, CaptureMiss):
+            pass
+        digest = hashlib.sha1(body).hexdigest()
+    return f"{method.upper()} {urldefrag(url)[0]} {digest}"
+
+
+class TrafficArchive:
+    """
+    Request/response pairs of recorded sessions, written as one gzipped json file.
+
+    Response bodies are stored decoded, once per distinct content, so the same
+    script or stylesheet loaded on every page load only takes space once. A
+    replayed request gets the recorded responses of the same method, url and
+    body in recording order, repeating the last one; anything that was not
+    recorded is answered with a local 404 and never reaches the network.
+
+    Replaying serves the archive from a local HTTP server and has seleniumwire
+    rewrite every browser request to it, seleniumwire 1.0 has no way to answer
+    a request itself.
+
+    Usage:
+        archive = TrafficArchive()
+        archive.collect(driver)  # after each lookup, then del driver.requests
+        archive.save("lookups.replay.gz")
+
+        TrafficArchive.load("lookups.replay.gz").install(driver, latency=0.05)
+
+    Attributes:
+        entries (list): Recorded exchanges: key, method, url, status, response
+            headers and body digest.
+        bodies (dict): Body digest -> body.
+        stats (Counter): Requests replayed and missed.
+    """
+
+    def __init__(self, entries=None, bodies=None):
+        self.entries = list(entries or [])
+        self.bodies = dict(bodies or {})
+        self.stats = Counter()
+        self._index = None
+        self._served = Counter()
+        self._lock = threading.Lock()
+        self._server = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def collect(self, driver):
+        """Add the exchanges captured by a seleniumwire driver so far.
+
+        Requests without a response are skipped. Captured requests are not
+        marked, clear them once collected, see `VinScrapper._drain_captured`.
+
+        Returns:
+            int: Exchanges added.
+        """
+        added = 0
+        for request in driver.requests:
+            response = request.response
+            if response is None:
+                continue
+            body, decoded = response.body or b"", True
+            try:
+                body = decode_body(body, _header(response.headers, "content-encoding"))
+            except (OSError, zlib.error, CaptureMiss):
+                decoded = False
+            skipped = HOP_BY_HOP_HEADERS | (BODY_FRAMING_HEADERS if decoded else set())
+            digest = hashlib.sha1(body).hexdigest()
+            entry = {
+                "key": _request_key(
+                    request.method,
+                    request.path,
+                    request.body,
+                    _header(request.headers, "content-encoding"),
+                ),
+                "method": request.method,
+                "url": request.path,
+                "status": response.status_code,
+                "headers": [
+                    (name, value)
+                    for name, value in response.headers.items()
+                    if name.lower() not in skipped
+                ],
+                "body": digest,
+            }
+            with self._lock:
+                self.bodies.setdefault(digest, body)
+                self.entries.append(entry)
+                self._index = None
+            added += 1
+        return added
+
+    def save(self, path):
+        """Write the archive, atomically."""
+        with self._lock:
+            document = {
+                "version": ARCHIVE_VERSION,
+                "entries": list(self.entries),
+                "bodies": {
+                    digest: base64.b64encode(body).decode("ascii")
+                    for digest, body in self.bodies.items()
+                },
+            }
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, "wb") as tmp_file:
+            with gzip.GzipFile(fileobj=tmp_file, mode="wb") as archive:
+                archive.write(json.dumps(document, separators=(",", ":")).encode())
+        os.replace(tmp, path)
+        logger.info(
+            "Recorded {} exchanges ({} distinct bodies) to {}",
+            len(self.entries),
+            len(self.bodies),
+            path,
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Read an archive written by `save`.
+
+        Raises:
+            RuntimeError: If the file is not an archive of a known version.
+        """
+        with gzip.open(path, "rb") as archive:
+            document = json.loads(archive.read().decode())
+        if document.get("version") != ARCHIVE_VERSION:
+            raise RuntimeError(f"{path} is not a version {ARCHIVE_VERSION} archive.")
+        return cls(
+            document["entries"],
+            {
+                digest: base64.b64decode(body)
+                for digest, body in document["bodies"].items()
+            },
+        )
+
+    def match(self, method, url, body=b"", encoding=None):
+        """Next recorded exchange for a request, None if it was never recorded."""
+        key = _request_key(method, url, body, encoding)
+        with self._lock:
+            if self._index is None:
+                self._index = {}
+                for entry in self.entries:
+                    self._index.setdefault(entry["key"], []).append(entry)
+            recorded = self._index.get(key)
+            if not recorded:
+                self.stats["missed"] += 1
+                return None
+            entry = recorded[min(self._served[key], len(recorded) - 1)]
+            self._served[key] += 1
+            self.stats["replayed"] += 1
+            return entry
+
+    def serve(self, latency=0.0):
+        """Start answering requests from the archive on a local port, once.
+
+        Args:
+            latency (float, optional): Seconds added before every replayed response.
+
+        Returns:
+            int: The port.
+        """
+        with self._lock:
+            if self._server is None:
+                self._server = _ReplayServer(("127.0.0.1", 0), _ReplayHandler)
+                self._server.archive = self
+                threading.Thread(
+                    target=self._server.serve_forever,
+                    name="vin_scrapper-replay",
+                    daemon=True,
+                ).start()
+            self._server.latency = latency
+            return self._server.server_address[1]
+
+    def install(self, driver, latency=0.0):
+        """Answer every request of a seleniumwire driver from the archive.
+
+        Args:
+            driver (WebDriver): seleniumwire driver.
+            latency (float, optional): Seconds added before every replayed response.
+
+        Raises:
+            RuntimeError: If the driver cannot rewrite requests, ie it is not a
+                seleniumwire 1.0 driver, rather than let it reach the network.
+        """
+        if not hasattr(type(driver), "rewrite_rules"):
+            raise RuntimeError(
+                f"Cannot replay with {type(driver).__name__}, it has no rewrite_rules, "
+                "replaying needs selenium-wire 1.0."
+            )
+        port = self.serve(latency)
+        # Rules already set, ie by the blocking policy, take precedence.
+        driver.rewrite_rules = list(driver.rewrite_rules or []) + [
+            (REPLAY_REWRITE, f"http://127.0.0.1:{port}/\\1/")
+        ]
+
+    def close(self):
+        """Stop the replay server, a later `install` starts a new one."""
+        with self._lock:
+            server, self._server = self._server, None
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+class _ReplayServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    """Answer /<scheme>/<host>/<path> as the archive recorded <scheme>://<host>/<path>."""
+
+    def log_message(self, fmt, *args):
+        logger.trace("{} {}", self.address_string(), fmt % args)
+
+    def _replay(self):
+        scheme, _, rest = self.path.lstrip("/").partition("/")
+        url = f"{scheme}://{rest}"
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        entry = None
+        if scheme in ("http", "https"):
+            entry = self.server.archive.match(
+                self.command, url, body, self.headers.get("Content-Encoding")
+            )
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if entry is None:
+            logger.debug("Not in the archive: {} {}", self.command, url)
+            status, headers, body = 404, [], b""
+        else:
+            status = entry["status"]
+            headers = [
+                (name, value)
+                for name, value in entry["headers"]
+                if name.lower() != "content-length"
+            ]
+            body = self.server.archive.bodies[entry["body"]]
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_PATCH = do_DELETE = do_OPTIONS = _replay
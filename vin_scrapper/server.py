@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+
+"""Resident lookup service exposed over a small local HTTP/JSON API."""
+
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlparse
+
+from loguru import logger
+
+from vin_scrapper.rate_control import controllers
+from vin_scrapper.vin import InvalidPlate, validate_plate
+from vin_scrapper.vin_scrapper import AVAILABLE_LOCATIONS, VinScrapper
+
+__all__ = ["LookupServer", "LookupService", "QueueFull"]
+
+
+class QueueFull(Exception):
+    pass
+
+
+class LookupService:
+    """
+    Keep warm VinScrapper sessions resident and feed them lookups from a queue.
+
+    Each session is served by its own thread. Sessions share the template's
+    cache, driver pool, metrics and rate controller, see `VinScrapper.clone`.
+
+    Attributes:
+        sessions (int): Number of sessions, ie lookups running at once.
+        queue_size (int): Lookups allowed to wait for a session before new ones
+            are turned away with QueueFull.
+        warm (bool): Start the browsers up front, defaults to True unless the
+            engine is http.
+        template (VinScrapper): The first session, the others are its clones,
+            kept after `close` for its metrics and proxy statistics.
+        validate (bool): Whether plates are checked before they are queued, like
+            the sessions do unless `no_validate` is set.
+    """
+
+    def __init__(self, sessions=2, queue_size=100, warm=None, **scrapper_kwargs):
+        self.sessions = max(1, int(sessions))
+        self.queue_size = queue_size
+        self.scrapper_kwargs = scrapper_kwargs
+        self.warm = warm
+        self.template = None
+        self.validate = not scrapper_kwargs.get("no_validate")
+        self.started = None
+        self.served = 0
+        self._served_lock = threading.Lock()
+        self._closing = threading.Event()
+        self._jobs = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._sessions = []
+
+    def start(self):
+        if self._threads:
+            return
+        template = self.template = VinScrapper(**self.scrapper_kwargs)
+        if self.warm is None:
+            self.warm = template.engine != "http"
+        if self.warm:
+            self._warm_up(template)
+        self._sessions = [template]
+        for _ in range(self.sessions - 1):
+            session = template.clone()
+            if self.warm:
+                self._warm_up(session)
+            self._sessions.append(session)
+        for worker_id, session in enumerate(self._sessions):
+            thread = threading.Thread(
+                target=self._work,
+                args=(session,),
+                name=f"vin_scrapper-session-{worker_id}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+        self.started = time.time()
+        logger.info("Lookup service started with {} sessions", len(self._sessions))
+
+    def _warm_up(self, session):
+        """Open the search page so the first lookup skips the browser start."""
+        try:
+            session.open_site(headless=bool(session.headless))
+            session.login()
+        except Exception as err:
+            logger.warning("Could not warm up a session: {}", err)
+
+    def _work(self, session):
+        try:
+            for licence_number, location, future in iter(self._jobs.get, None):
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(session.lookup(licence_number, location))
+                except Exception as err:
+                    future.set_exception(err)
+                with self._served_lock:
+                    self.served += 1
+        finally:
+            session.close_session()
+
+    def submit(self, licence_number, location, block=False, timeout=None):
+        """Queue a lookup.
+
+        Args:
+            block (bool, optional): Wait for room in the queue instead of failing.
+            timeout (float, optional): Seconds to wait for room when blocking.
+
+        Returns:
+            Future: Resolves to the lookup result.
+
+        Raises:
+            QueueFull: If the queue is full or the service is closing.
+        """
+        if self._closing.is_set():
+            raise QueueFull("The lookup service is closing")
+        future = Future()
+        try:
+            self._jobs.put((licence_number, location, future), block, timeout)
+        except queue.Full:
+            raise QueueFull(f"{self.queue_size} lookups already queued")
+        return future
+
+    def stats(self):
+        template = self._sessions[0] if self._sessions else None
+        stats = {
+            "sessions": len(self._sessions),
+            "queued": self._jobs.qsize(),
+            "served": self.served,
+            "uptime": round(time.time() - self.started, 3) if self.started else 0,
+            "rate_control": controllers(),
+        }
+        if template is not None:
+            stats["stages"] = template.metrics.summary()
+            if template.cache is not None:
+                stats["cache"] = template.cache.stats()
+            if template.single_flight is not None:
+                stats["coalescing"] = template.single_flight.stats()
+            if template.recycle:
+                stats["recycling"] = template.recycle.stats()
+        return stats
+
+    def close(self):
+        """Stop the sessions, lookups still waiting in the queue are cancelled."""
+        self._closing.set()
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job[2].cancel()
+        # Only the session threads take from the queue now, they make room.
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._sessions = []
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service = None
+    request_timeout = None
+
+    def log_message(self, fmt, *args):
+        logger.debug("{} {}", self.address_string(), fmt % args)
+
+    def _send(self, status, body):
+        payload = json.dumps(body, sort_keys=True).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _resolve(self, licence_number, location, future):
+        result = {"licence_number": licence_number, "location": location}
+        try:
+            result.update(future.result(self.request_timeout))
+            return 200, result
+        except FutureTimeout:
+            future.cancel()
+            result["error"] = f"Lookup exceeded {self.request_timeout}s"
+            result["error_class"] = "LookupTimeout"
+            return 504, result
+        except Exception as err:
+            result["error"] = str(err) or err.__class__.__name__
+            result["error_class"] = err.__class__.__name__
+            return 502, result
+
+    def _lookup(self, params):
+        if not isinstance(params, dict):
+            self._send(400, {"error": "Expected an object"})
+            return
+        licence_number = params.get("licence_number")
+        location = params.get("location")
+        invalid = _invalid(licence_number, location, self.service.validate)
+        if invalid:
+            self._send(400, {"error": invalid})
+            return
+        try:
+            future = self.service.submit(licence_number, location)
+        except QueueFull as err:
+            self._send(503, {"error": str(err)})
+            return
+        self._send(*self._resolve(licence_number, location, future))
+
+    def _batch(self, items):
+        if isinstance(items, dict):
+            items = items.get("items")
+        if not isinstance(items, list):
+            self._send(400, {"error": "Expected a list of items"})
+            return
+        submitted = []
+        for item in items:
+            if isinstance(item, dict):
+                licence_number = item.get("licence_number")
+                location = item.get("location")
+                invalid = _invalid(licence_number, location, self.service.validate)
+            else:
+                licence_number = location = None
+                invalid = f"Expected an object, not {item!r}"
+            future = None
+            if not invalid:
+                # A batch waits for room in the queue rather than being turned away.
+                future = self.service.submit(
+                    licence_number, location, block=True, timeout=self.request_timeout
+                )
+            submitted.append((licence_number, location, invalid, future))
+        results = []
+        for licence_number, location, invalid, future in submitted:
+            if invalid:
+                results.append(
+                    {
+                        "licence_number": licence_number,
+                        "location": location,
+                        "error": invalid,
+                    }
+                )
+            else:
+                results.append(self._resolve(licence_number, location, future)[1])
+        self._send(200, {"results": results})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self._send(200, {"status": "ok"})
+        elif url.path == "/stats":
+            self._send(200, self.service.stats())
+        elif url.path == "/lookup":
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            self._lookup(params)
+        else:
+            self._send(404, {"error": f"Unknown path {url.path}"})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        try:
+            body = self._body()
+        except ValueError as err:
+            self._send(400, {"error": f"Invalid JSON: {err}"})
+            return
+        try:
+            if path == "/lookup":
+                self._lookup(body)
+            elif path == "/batch":
+                self._batch(body)
+            else:
+                self._send(404, {"error": f"Unknown path {path}"})
+        except QueueFull as err:
+            self._send(503, {"error": str(err)})
+
+
+def _invalid(licence_number, location, validate=True):
+    """Why a request cannot be looked up, None when it is fine.
+
+    Args:
+        validate (bool, optional): Check the plate itself, see `validate_plate`.
+    """
+    if not licence_number or not location:
+        return "licence_number and location are required"
+    if not isinstance(licence_number, str) or not isinstance(location, str):
+        return "licence_number and location must be strings"
+    if location.lower() not in AVAILABLE_LOCATIONS:
+        return f"Unknown location: {location}"
+    if not validate:
+        return None
+    try:
+        validate_plate(licence_number, location)
+    except InvalidPlate as err:
+        return str(err)
+    return None
+
+
+class LookupServer(ThreadingMixIn, HTTPServer):
+    """
+    HTTP/JSON front end of a LookupService.
+
+    Endpoints:
+        GET  /lookup?licence_number=7ABC123&location=CA
+        POST /lookup  {"licence_number": "7ABC123", "location": "CA"}
+        POST /batch   {"items": [{"licence_number": ..., "location": ...}, ...]}
+        GET  /stats   Sessions, queue, cache, coalescing and stage latencies.
+        GET  /health
+
+    Usage:
+        with LookupServer(LookupService(url=..., sessions=2)) as server:
+            server.serve_forever()
+    """
+
+    daemon_threads = True
+
+    def __init__(self, service, host="127.0.0.1", port=8580, request_timeout=120):
+        handler = type(
+            "Handler",
+            (_Handler,),
+            {"service": service, "request_timeout": request_timeout},
+        )
+        super().__init__((host, port), handler)
+        self.service = service
+
+    def __enter__(self):
+        self.service.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server_close()
+        self.service.close()
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+"""Startup shortcuts: driver binaries resolved once, Firefox profiles built once."""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from loguru import logger
+
+from vin_scrapper.lazy import LazyModule
+
+__all__ = ["DriverCache", "ProfileTemplates", "driver_cache", "profile_templates"]
+
+webdriver = LazyModule("selenium.webdriver")
+
+DEFAULT_DRIVER_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "vin_scrapper", "drivers.json"
+)
+# Unpinned ("latest") drivers are re-resolved after this many seconds.
+DEFAULT_DRIVER_MAX_AGE = 7 * 24 * 60 * 60
+
+
+class DriverCache:
+    """
+    Webdriver binaries resolved by webdriver_manager, remembered on disk.
+
+    `install()` checks versions online, so it is only called when there is no
+    usable record: the binary is gone, the pinned version changed, or an
+    unpinned record is older than `max_age`. Within a process a binary is only
+    resolved once.
+
+    Attributes:
+        path (str): json file with one record per driver and version.
+        max_age (float): Seconds an unpinned record stays valid.
+    """
+
+    def __init__(self, path=DEFAULT_DRIVER_CACHE_PATH, max_age=DEFAULT_DRIVER_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._resolved = {}
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with open(self.path) as records:
+                return json.load(records)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, records):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)))
+            with os.fdopen(fd, "w") as tmp_file:
+                json.dump(records, tmp_file, indent=4, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as err:
+            logger.debug("Could not write the driver cache: {}", err)
+
+    def resolve(self, name, install, version=None):
+        """Path of a driver binary, calling `install()` only when needed.
+
+        Args:
+            name (str): Driver name, ie "geckodriver".
+            install (callable): Downloads the driver and returns its path.
+            version (str, optional): Pinned driver version, None for latest.
+
+        Returns:
+            str: Path of the driver binary.
+        """
+        key = f"{name}@{version or 'latest'}"
+        with self._lock:
+            if key in self._resolved:
+                return self._resolved[key]
+            record = self._read().get(key)
+            usable = (
+                record is not None
+                and os.access(record["path"], os.X_OK)
+                and (version or time.time() - record["resolved"] < self.max_age)
+            )
+            if usable:
+                path = record["path"]
+            else:
+                path = install()
+                records = self._read()
+                records[key] = {"path": path, "resolved": time.time()}
+                self._write(records)
+                logger.debug("Resolved {} to {}", key, path)
+            self._resolved[key] = path
+            return path
+
+    def clear(self):
+        with self._lock:
+            self._resolved.clear()
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+_profile_class = None
+
+
+def _prebuilt_profile_class():
+    """FirefoxProfile subclass serving an already encoded profile.
+
+    Defined on first use, so selenium is only imported with a browser.
+    """
+    global _profile_class
+    if _profile_class is None:
+
+        class PrebuiltProfile(webdriver.FirefoxProfile):
+            def __init__(self, encoded):
+                super().__init__()
+                self._encoded = encoded
+
+            @property
+            def encoded(self):
+                return self._encoded
+
+        _profile_class = PrebuiltProfile
+    return _profile_class
+
+
+class ProfileTemplates:
+    """
+    Firefox profiles built and encoded once per configuration, ie per proxy and
+    blocking policy, then handed to every new driver.
+
+    Building a FirefoxProfile writes a temporary profile directory and encoding
+    it zips the whole directory, for every driver start. A template skips both.
+    """
+
+    def __init__(self):
+        self._encoded = {}
+        self._lock = threading.Lock()
+        self.built = 0
+        self.reused = 0
+
+    def prepare(self, key, build):
+        """Encoded profile for configuration `key`, `build()` makes it the first time."""
+        with self._lock:
+            encoded = self._encoded.get(key)
+            if encoded is None:
+                profile = build()
+                encoded = self._encoded[key] = profile.encoded
+                shutil.rmtree(profile.path, ignore_errors=True)
+                self.built += 1
+            return encoded
+
+    def get(self, key, build):
+        """Profile for configuration `key`, ready to hand to a new driver."""
+        built = self.built
+        encoded = self.prepare(key, build)
+        if self.built == built:
+            self.reused += 1
+        return _prebuilt_profile_class()(encoded)
+
+    def clear(self):
+        with self._lock:
+            self._encoded.clear()
+
+
+_driver_cache = DriverCache()
+_profile_templates = ProfileTemplates()
+
+
+def driver_cache():
+    """The process-wide DriverCache."""
+    return _driver_cache
+
+
+def profile_templates():
+    """The process-wide ProfileTemplates."""
+    return _profile_templates
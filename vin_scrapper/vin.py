@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+
+"""Offline VIN checks and decoding, and licence plate format checks per state."""
+
+import re
+
+__all__ = [
+    "InvalidPlate",
+    "InvalidVIN",
+    "check_digit",
+    "decode_vin",
+    "enrich",
+    "is_valid_vin",
+    "model_year",
+    "normalize_vin",
+    "validate_plate",
+    "validate_plates",
+    "validate_vin",
+    "validate_vins",
+]
+
+VIN_LENGTH = 17
+# ISO 3779 transliteration, I, O and Q never appear in a VIN.
+VIN_VALUES = dict(zip("0123456789", range(10)))
+VIN_VALUES.update(zip("ABCDEFGH", range(1, 9)))
+VIN_VALUES.update(zip("JKLMN", range(1, 6)))
+VIN_VALUES.update({"P": 7, "R": 9})
+VIN_VALUES.update(zip("STUVWXYZ", range(2, 10)))
+VIN_WEIGHTS = (8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2)
+# Position 9 is the check digit, the weighted sum modulo 11 with 10 written as X.
+CHECK_DIGITS = "0123456789X"
+
+# Position 10, the same code comes back every 30 years.
+MODEL_YEAR_CODES = "ABCDEFGHJKLMNPRSTVWXY123456789"
+MODEL_YEARS = {code: 1980 + offset for offset, code in enumerate(MODEL_YEAR_CODES)}
+
+REGIONS = (
+    ("ABCDEFGH", "Africa"),
+    ("JKLMNPR", "Asia"),
+    ("STUVWXYZ", "Europe"),
+    ("12345", "North America"),
+    ("67", "Oceania"),
+    ("890", "South America"),
+)
+REGION_BY_CODE = {code: region for codes, region in REGIONS for code in codes}
+
+COUNTRIES = {
+    "1": "United States",
+    "4": "United States",
+    "5": "United States",
+    "2": "Canada",
+    "3": "Mexico",
+    "J": "Japan",
+    "K": "South Korea",
+    "L": "China",
+    "S": "United Kingdom",
+    "W": "Germany",
+    "Y": "Sweden",
+    "Z": "Italy",
+}
+
+# World manufacturer identifiers, the first three VIN characters.
+MANUFACTURERS = {
+    "19U": "Acura",
+    "JH4": "Acura",
+    "WAU": "Audi",
+    "WBA": "BMW",
+    "WBS": "BMW",
+    "5UX": "BMW",
+    "1G4": "Buick",
+    "1G6": "Cadillac",
+    "1G1": "Chevrolet",
+    "1GC": "Chevrolet",
+    "1GN": "Chevrolet",
+    "2G1": "Chevrolet",
+    "3GN": "Chevrolet",
+    "1C3": "Chrysler",
+    "1C4": "Chrysler",
+    "2C3": "Chrysler",
+    "1B3": "Dodge",
+    "1D7": "Dodge",
+    "ZFF": "Ferrari",
+    "ZFA": "Fiat",
+    "1FA": "Ford",
+    "1FD": "Ford",
+    "1FM": "Ford",
+    "1FT": "Ford",
+    "2FA": "Ford",
+    "3FA": "Ford",
+    "1GK": "GMC",
+    "1GT": "GMC",
+    "1HG": "Honda",
+    "2HG": "Honda",
+    "5FN": "Honda",
+    "5J6": "Honda",
+    "JHM": "Honda",
+    "5NP": "Hyundai",
+    "KMH": "Hyundai",
+    "SAJ": "Jaguar",
+    "1J4": "Jeep",
+    "1J8": "Jeep",
+    "KNA": "Kia",
+    "KND": "Kia",
+    "5XY": "Kia",
+    "SAL": "Land Rover",
+    "JTH": "Lexus",
+    "JTJ": "Lexus",
+    "1LN": "Lincoln",
+    "2LM": "Lincoln",
+    "5LM": "Lincoln",
+    "1YV": "Mazda",
+    "JM1": "Mazda",
+    "JM3": "Mazda",
+    "4JG": "Mercedes-Benz",
+    "WDB": "Mercedes-Benz",
+    "WDD": "Mercedes-Benz",
+    "4A3": "Mitsubishi",
+    "JA3": "Mitsubishi",
+    "JA4": "Mitsubishi",
+    "1N4": "Nissan",
+    "1N6": "Nissan",
+    "3N1": "Nissan",
+    "5N1": "Nissan",
+    "JN1": "Nissan",
+    "JN8": "Nissan",
+    "1G2": "Pontiac",
+    "WP0": "Porsche",
+    "WP1": "Porsche",
+    "1G8": "Saturn",
+    "4S3": "Subaru",
+    "4S4": "Subaru",
+    "JF1": "Subaru",
+    "JF2": "Subaru",
+    "5YJ": "Tesla",
+    "7SA": "Tesla",
+    "2T1": "Toyota",
+    "2T3": "Toyota",
+    "4T1": "Toyota",
+    "4T3": "Toyota",
+    "5TD": "Toyota",
+    "5TF": "Toyota",
+    "JTD": "Toyota",
+    "JTE": "Toyota",
+    "1VW": "Volkswagen",
+    "3VW": "Volkswagen",
+    "WVG": "Volkswagen",
+    "WVW": "Volkswagen",
+    "YV1": "Volvo",
+    "YV4": "Volvo",
+}
+
+# Position 11 is manufacturer specific, only these manufacturers are decoded.
+PLANTS = {
+    "Ford": {
+        "A": "Atlanta, Georgia",
+        "B": "Oakville, Ontario",
+        "C": "Ontario Truck, Ontario",
+        "D": "Avon Lake, Ohio",
+        "E": "Louisville, Kentucky (Kentucky Truck)",
+        "F": "Dearborn, Michigan",
+        "G": "Chicago, Illinois",
+        "H": "Lorain, Ohio",
+        "K": "Claycomo, Missouri",
+        "L": "Wayne, Michigan (Michigan Truck)",
+        "M": "Cuautitlan, Mexico",
+        "P": "St. Paul, Minnesota",
+        "R": "Hermosillo, Mexico",
+        "T": "Edison, New Jersey",
+        "U": "Louisville, Kentucky",
+        "W": "Wayne, Michigan",
+        "X": "St. Thomas, Ontario",
+        "Z": "Hazelwood, Missouri",
+    },
+    "Honda": {
+        "A": "Marysville, Ohio",
+        "C": "Alliston, Ontario",
+        "L": "East Liberty, Ohio",
+    },
+    "Tesla": {
+        "A": "Austin, Texas",
+        "B": "Berlin, Germany",
+        "C": "Shanghai, China",
+        "F": "Fremont, California",
+    },
+}
+
+# Longest standard or vanity plate per state, plates are 1 to 8 characters
+# from A-Z and 0-9 once spaces, dashes and dots are removed.
+PLATE_MAX_LENGTH = dict.fromkeys(
+    "al ak az ar ca co ct de dc fl ga hi id il in ia ks ky la me md ma mi mn ms mo mt "
+    "ne nv nh nj nm ny nc nd oh ok or pa ri sc sd tn tx ut vt va wa wv wi wy".split(),
+    8,
+)
+PLATE_MAX_LENGTH.update({"ca": 7, "fl": 7, "tx": 7, "wa": 7})
+
+_PLATE_SEPARATORS = re.compile(r"[\s.\-]+")
+_PLATE = re.compile(r"[A-Z0-9]+")
+
+
+class InvalidVIN(Exception):
+    pass
+
+
+class InvalidPlate(Exception):
+    pass
+
+
+def normalize_vin(vin):
+    return str(vin or "").strip().upper()
+
+
+def check_digit(vin):
+    """ISO 3779 check digit a VIN should carry at position 9.
+
+    Raises:
+        InvalidVIN: If the VIN is not 17 VIN characters.
+    """
+    vin = normalize_vin(vin)
+    if len(vin) != VIN_LENGTH:
+        raise InvalidVIN(f"{vin!r} is {len(vin)} characters, a VIN is {VIN_LENGTH}.")
+    try:
+        total = sum(VIN_VALUES[char] * weight for char, weight in zip(vin, VIN_WEIGHTS))
+    except KeyError as err:
+        raise InvalidVIN(f"{vin!r} has {err.args[0]!r}, not a VIN character.")
+    return CHECK_DIGITS[total % 11]
+
+
+def validate_vin(vin):
+    """Check a VIN's length, characters and check digit.
+
+    Returns:
+        str: The VIN, stripped and upper cased.
+
+    Raises:
+        InvalidVIN: Saying what is wrong with it.
+    """
+    vin = normalize_vin(vin)
+    expected = check_digit(vin)
+    if vin[8] != expected:
+        raise InvalidVIN(f"{vin!r} has check digit {vin[8]!r}, expected {expected!r}.")
+    return vin
+
+
+def is_valid_vin(vin):
+    try:
+        validate_vin(vin)
+    except InvalidVIN:
+        return False
+    return True
+
+
+def validate_vins(vins):
+    """Check many VINs in one call.
+
+    Returns:
+        list: One bool per VIN, in order.
+    """
+    values = VIN_VALUES
+    weights = VIN_WEIGHTS
+    digits = CHECK_DIGITS
+    valid = []
+    for vin in vins:
+        vin = normalize_vin(vin)
+        if len(vin) != VIN_LENGTH:
+            valid.append(False)
+            continue
+        total = 0
+        for char, weight in zip(vin, weights):
+            value = values.get(char)
+            if value is None:
+                break
+            total += value * weight
+        else:
+            valid.append(vin[8] == digits[total % 11])
+            continue
+        valid.append(False)
+    return valid
+
+
+def model_year(vin):
+    """Model year from position 10.
+
+    Position 7 tells the two 30 year cycles apart for North American light
+    vehicles: a digit means 1980-2009, a letter 2010-2039.
+    """
+    year = MODEL_YEARS.get(vin[9])
+    if year is None:
+        return None
+    return year + 30 if vin[6].isalpha() else year
+
+
+def decode_vin(vin):
+    """Decode what a VIN says without any lookup.
+
+    Returns:
+        dict: "WMI", "Manufacturer", "Country", "Region", "Model Year",
+            "Plant Code" and "Plant", unknown values are None.
+
+    Raises:
+        InvalidVIN: If the VIN does not validate.
+    """
+    vin = validate_vin(vin)
+    wmi = vin[:3]
+    manufacturer = MANUFACTURERS.get(wmi)
+    return {
+        "WMI": wmi,
+        "Manufacturer": manufacturer,
+        "Country": COUNTRIES.get(vin[0]),
+        "Region": REGION_BY_CODE.get(vin[0]),
+        "Model Year": model_year(vin),
+        "Plant Code": vin[10],
+        "Plant": PLANTS.get(manufacturer, {}).get(vin[10]),
+    }
+
+
+def enrich(data_structure):
+    """Check the "VIN Number" of a result and add what it decodes to, in place.
+
+    A result without a VIN, ie an unknown plate, is left alone.
+
+    Returns:
+        dict: The data structure.
+
+    Raises:
+        InvalidVIN: If the site answered with something that is not a VIN.
+    """
+    vin = normalize_vin(data_structure.get("VIN Number"))
+    if vin:
+        data_structure.update(decode_vin(vin))
+        data_structure["VIN Number"] = vin
+    return data_structure
+
+
+def validate_plate(licence_number, location):
+    """Check a licence plate against the format of its state.
+
+    Args:
+        licence_number (str): Licence plate number.
+        location (str): Two letter state code, ie CA.
+
+    Returns:
+        str: The plate without separators, upper cased, ie "7ABC123".
+
+    Raises:
+        InvalidPlate: Saying what is wrong with it.
+    """
+    state = str(location or "").strip().lower()
+    max_length = PLATE_MAX_LENGTH.get(state)
+    if max_length is None:
+        raise InvalidPlate(f"{location!r} is not a supported state.")
+    plate = _PLATE_SEPARATORS.sub("", str(licence_number or "").upper())
+    if not plate:
+        raise InvalidPlate("Empty licence plate.")
+    if not _PLATE.fullmatch(plate):
+        raise InvalidPlate(f"{licence_number!r} may only have letters and digits.")
+    if len(plate) > max_length:
+        raise InvalidPlate(
+            f"{licence_number!r} is {len(plate)} characters, {state.upper()} plates "
+            f"have at most {max_length}."
+        )
+    return plate
+
+
+def validate_plates(pairs):
+    """Check many (licence_number, location) pairs in one call.
+
+    Returns:
+        list: One error message per pair, None for a valid plate.
+    """
+    errors = []
+    for licence_number, location in pairs:
+        try:
+            validate_plate(licence_number, location)
+        except InvalidPlate as err:
+            errors.append(str(err))
+        else:
+            errors.append(None)
+    return errors
@@ -9,50 +9,145 @@ import subprocess
 import sys
 import time
 from base64 import b64encode
+from collections import Counter
 
-import psutil
-from bs4 import BeautifulSoup
 from loguru import logger
-from selenium import webdriver
-from seleniumwire import webdriver as wirewebdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.proxy import Proxy, ProxyType
-from selenium.webdriver.firefox.options import Options
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
-from webdriver_manager import chrome as chrome_manager, firefox as firefox_manager
-
-
-class ProxySettings:
-    """
-    Proxy contains information about proxy type and necessary proxy settings.
-
-    Attributes:
-        host (str): host
-        password (str): password
-        port (str): port
-        username (str): username
-    """
-
-    def __init__(self, **kwargs):
-        self.host = kwargs.get("host", None)
-        self.port = kwargs.get("port", None)
-        self.username = kwargs.get("username", None)
-        self.password = kwargs.get("password", None)
-        self.seleniumwire = kwargs.get("alt_proxy", False)
-
-    def __repr__(self):
-        return repr(
-            "<{}(host='{}', port='{}', username='{}', password='{}') at 0x{:x}>".format(
-                self.__class__.__name__,
-                self.host,
-                self.port,
-                self.username,
-                self.password,
-                id(self),
-            )
-        )
+
+from vin_scrapper.aio import lookup_many
+from vin_scrapper.backends import firefox_proxy_profile, get_backend
+from vin_scrapper.blocking import BlockingPolicy
+from vin_scrapper.cache import ResultCache, cache_key
+from vin_scrapper.capture import (
+    CaptureMiss,
+    clear_captured,
+    supports_capture,
+    wait_for_licence_plate,
+)
+from vin_scrapper.coalesce import SingleFlight, default_single_flight
+from vin_scrapper.driver_pool import DriverPool
+from vin_scrapper.graphql import GraphQLEngine, graphql_url_for
+from vin_scrapper.lazy import LazyModule
+from vin_scrapper.metrics import StageMetrics
+from vin_scrapper.process_manager import ProcessTracker
+from vin_scrapper.proxy import ProxyPool, ProxySettings
+from vin_scrapper.rate_control import AIMDController, classify, controller_for
+from vin_scrapper.recycle import RecyclePolicy
+from vin_scrapper.replay import TrafficArchive
+from vin_scrapper.vin import InvalidVIN, enrich, is_valid_vin, validate_plate
+
+__all__ = ["AVAILABLE_LOCATIONS", "DataStructure", "MissingPageSource", "VinScrapper"]
+
+# The browser stack is only imported once a browser is actually needed.
+BeautifulSoup = LazyModule("bs4", "BeautifulSoup")
+webdriver = LazyModule("selenium.webdriver")
+exceptions = LazyModule("selenium.common.exceptions")
+By = LazyModule("selenium.webdriver.common.by", "By")
+Keys = LazyModule("selenium.webdriver.common.keys", "Keys")
+EC = LazyModule("selenium.webdriver.support.expected_conditions")
+WebDriverWait = LazyModule("selenium.webdriver.support.ui", "WebDriverWait")
+
+
+AVAILABLE_LOCATIONS = {
+    "al": "alabama",
+    "ak": "alaska",
+    "az": "arizona",
+    "ar": "arkansas",
+    "ca": "california",
+    "co": "colorado",
+    "ct": "connecticut",
+    "de": "delaware",
+    "dc": "district of columbia",
+    "fl": "florida",
+    "ga": "georgia",
+    "hi": "hawaii",
+    "id": "idaho",
+    "il": "illinois",
+    "in": "indiana",
+    "ia": "iowa",
+    "ks": "kansas",
+    "ky": "kentucky",
+    "la": "louisiana",
+    "me": "maine",
+    "md": "maryland",
+    "ma": "massachusetts",
+    "mi": "michigan",
+    "mn": "minnesota",
+    "ms": "mississippi",
+    "mo": "missouri",
+    "mt": "montana",
+    "ne": "nebraska",
+    "nv": "nevada",
+    "nh": "new hampshire",
+    "nj": "new jersey",
+    "nm": "new mexico",
+    "ny": "new york",
+    "nc": "north carolina",
+    "nd": "north dakota",
+    "oh": "ohio",
+    "ok": "oklahoma",
+    "or": "oregon",
+    "pa": "pennsylvania",
+    "ri": "rhode island",
+    "sc": "south carolina",
+    "sd": "south dakota",
+    "tn": "tennessee",
+    "tx": "texas",
+    "ut": "utah",
+    "vt": "vermont",
+    "va": "virginia",
+    "wa": "washington",
+    "wv": "west virginia",
+    "wi": "wisconsin",
+    "wy": "wyoming",
+}
+
+
+# Installs a MutationObserver once per page load and returns (page token, DOM version),
+# the version is bumped on every DOM mutation so a cached parse can be reused safely.
+DOM_VERSION_SCRIPT = """
+if (!window.__vinScrapperDom) {
+    window.__vinScrapperDom = {token: Math.random().toString(36).slice(2), version: 0};
+    new MutationObserver(function () { window.__vinScrapperDom.version++; })
+        .observe(document, {subtree: true, childList: true, attributes: true,
+                            characterData: true});
+}
+return [window.__vinScrapperDom.token, window.__vinScrapperDom.version];
+"""
+
+# Returns the licence plate input ids and the dropdown list-item id -> label map.
+FORM_STATE_SCRIPT = """
+const inputs = Array.from(
+    document.querySelectorAll('input[data-cy="license-plate-txt-field"]'));
+const options = {};
+for (const item of document.querySelectorAll('div[id*="list"]')) {
+    options[item.id] = item.textContent.trim().toLowerCase();
+}
+return {
+    inputs: inputs.map(i => i.id),
+    interactable: inputs.filter(i => i.offsetParent !== null && !i.disabled)
+                        .map(i => i.id),
+    options: options,
+};
+"""
+
+# Brings a known dropdown list-item into view, returns false if it is not rendered.
+SHOW_OPTION_SCRIPT = """
+const item = document.getElementById(arguments[0]);
+if (!item) {
+    return false;
+}
+item.scrollIntoView({block: "nearest"});
+return true;
+"""
+
+# Drops the previous result so it is not mistaken for the next plate's, returns
+# whether the search form is still on the page.
+RESET_FORM_SCRIPT = """
+for (const result of Array.from(document.getElementsByClassName(arguments[0]))) {
+    result.remove();
+}
+return document.querySelector('input[data-cy="license-plate-txt-field"]') !== null;
+"""
 
 
 class DataStructure:
@@ -69,6 +164,7 @@ class MissingPageSource(Exception):
 
 class VinScrapper:
     def __init__(self, log_level="INFO", timeout=60, **kwargs):
+        self._init_args = dict(kwargs, log_level=log_level, timeout=timeout)
         self.logger = logger
         self.logger.level(log_level.upper())
         self.data_structure = DataStructure.asdict()
@@ -76,6 +172,15 @@ class VinScrapper:
         self._closed = False
         self.proxy = None
         self._page_source = None
+        self._page_source_version = None
+        self._http_engine = None
+        self._owns_driver_pool = False
+        self._state_map = {}
+        self._state_map_token = None
+        self._page_dirty = False
+        self._search_url = None
+        self.driver = None
+        self.wait_timings = {}
         self.check_kwargs(kwargs)
 
     def check_kwargs(self, kwargs):
@@ -104,75 +209,167 @@ class VinScrapper:
 
         self.location = None
         if kwargs.get("location"):
-            self.location = kwargs.get("location")
-            if self._licence_plate_webstate:
-                available_locations = {
-                    "al": "alabama",
-                    "ak": "alaska",
-                    "az": "arizona",
-                    "ar": "arkansas",
-                    "ca": "california",
-                    "co": "colorado",
-                    "ct": "connecticut",
-                    "de": "delaware",
-                    "dc": "district of columbia",
-                    "fl": "florida",
-                    "ga": "georgia",
-                    "hi": "hawaii",
-                    "id": "idaho",
-                    "il": "illinois",
-                    "in": "indiana",
-                    "ia": "iowa",
-                    "ks": "kansas",
-                    "ky": "kentucky",
-                    "la": "louisiana",
-                    "me": "maine",
-                    "md": "maryland",
-                    "ma": "massachusetts",
-                    "mi": "michigan",
-                    "mn": "minnesota",
-                    "ms": "mississippi",
-                    "mo": "missouri",
-                    "mt": "montana",
-                    "ne": "nebraska",
-                    "nv": "nevada",
-                    "nh": "new hampshire",
-                    "nj": "new jersey",
-                    "nm": "new mexico",
-                    "ny": "new york",
-                    "nc": "north carolina",
-                    "nd": "north dakota",
-                    "oh": "ohio",
-                    "ok": "oklahoma",
-                    "or": "oregon",
-                    "pa": "pennsylvania",
-                    "ri": "rhode island",
-                    "sc": "south carolina",
-                    "sd": "south dakota",
-                    "tn": "tennessee",
-                    "tx": "texas",
-                    "ut": "utah",
-                    "vt": "vermont",
-                    "va": "virginia",
-                    "wa": "washington",
-                    "wv": "west virginia",
-                    "wi": "wisconsin",
-                    "wy": "wyoming",
-                }
-                try:
-                    self._licence_plate_webstate["state"] = available_locations[
-                        self.location.lower()
-                    ]
-                except KeyError:
-                    raise RuntimeError(
-                        f"{self.location} cannot be found in the available "
-                        f"locations: {available}"
+            self.set_location(kwargs.get("location"))
+
+        self.engine = "http"
+        if kwargs.get("engine"):
+            self.engine = kwargs.get("engine")
+
+        self.graphql_url = graphql_url_for(self.url)
+        if kwargs.get("graphql_url"):
+            self.graphql_url = kwargs.get("graphql_url")
+
+        self.driver_pool = None
+        if kwargs.get("driver_pool") is not None:
+            self.driver_pool = kwargs.get("driver_pool")
+
+        self.pool_size = None
+        if kwargs.get("pool_size"):
+            self.pool_size = int(kwargs.get("pool_size"))
+
+        self.cache = None
+        if kwargs.get("cache") is not None:
+            self.cache = kwargs.get("cache")
+        elif kwargs.get("cache_path") and not kwargs.get("no_cache"):
+            self.cache = ResultCache(
+                kwargs.get("cache_path"),
+                **{
+                    key: kwargs[key]
+                    for key in ("ttl", "negative_ttl", "max_entries")
+                    if kwargs.get(key) is not None
+                },
+            )
+
+        self.no_cache = None
+        if kwargs.get("no_cache"):
+            self.no_cache = kwargs.get("no_cache")
+
+        self.refresh_cache = None
+        if kwargs.get("refresh_cache"):
+            self.refresh_cache = kwargs.get("refresh_cache")
+
+        self.single_flight = None
+        if isinstance(kwargs.get("single_flight"), SingleFlight):
+            self.single_flight = kwargs.get("single_flight")
+        elif not kwargs.get("no_coalesce"):
+            self.single_flight = default_single_flight()
+
+        self.metrics = StageMetrics(enabled=False)
+        if isinstance(kwargs.get("metrics"), StageMetrics):
+            self.metrics = kwargs.get("metrics")
+        elif kwargs.get("metrics") or kwargs.get("metrics_file"):
+            self.metrics = StageMetrics()
+
+        self.rate_controller = None
+        if isinstance(kwargs.get("rate_control"), AIMDController):
+            self.rate_controller = kwargs.get("rate_control")
+        elif kwargs.get("rate_control", True) and not kwargs.get("no_rate_control"):
+            self.rate_controller = controller_for(
+                self.url,
+                **{
+                    setting: float(kwargs[key])
+                    for key, setting in (
+                        ("max_concurrency", "maximum"),
+                        ("latency_target", "latency_target"),
+                        ("max_rate", "max_rate"),
                     )
+                    if kwargs.get(key) is not None
+                },
+            )
+
+        self.shutdown_deadline = 5
+        if kwargs.get("shutdown_deadline"):
+            self.shutdown_deadline = float(kwargs.get("shutdown_deadline"))
+
+        if isinstance(kwargs.get("recycle"), RecyclePolicy):
+            self.recycle = kwargs.get("recycle")
+        else:
+            self.recycle = RecyclePolicy(
+                max_lookups=kwargs.get("recycle_after"),
+                max_rss=float(kwargs.get("max_rss_mb") or 0) * 2 ** 20,
+                max_age=kwargs.get("max_browser_age"),
+            )
+
+        self.poll_frequency = 0.1
+        if kwargs.get("poll_frequency"):
+            self.poll_frequency = float(kwargs.get("poll_frequency"))
+
+        self.wait_timeout = 10
+        if kwargs.get("wait_timeout"):
+            self.wait_timeout = float(kwargs.get("wait_timeout"))
+
+        self.capture = None
+        if kwargs.get("capture"):
+            self.capture = kwargs.get("capture")
+
+        self.record = None
+        if kwargs.get("record"):
+            self.record = kwargs.get("record")
+
+        self.replay = None
+        if kwargs.get("replay"):
+            self.replay = kwargs.get("replay")
+
+        self.replay_latency = 0.0
+        if kwargs.get("replay_latency"):
+            self.replay_latency = float(kwargs.get("replay_latency"))
+
+        self.traffic = None
+        self._owns_traffic = False
+        if kwargs.get("traffic") is not None:
+            self.traffic = kwargs.get("traffic")
+        elif self.replay:
+            self.traffic = TrafficArchive.load(self.replay)
+            self._owns_traffic = True
+        elif self.record:
+            self.traffic = TrafficArchive()
+        if self.record or self.replay:
+            # Only browser traffic goes through seleniumwire, so only it is archived.
+            self.capture = True
+            self.engine = "selenium"
 
         self.headless = None
         if kwargs.get("headless"):
             self.headless = kwargs.get("headless")
 
+        self.validate = True
+        if kwargs.get("no_validate"):
+            self.validate = False
+
+        self.reload_page = None
+        if kwargs.get("reload_page"):
+            self.reload_page = kwargs.get("reload_page")
+
+        self.page_load_timeout = None
+        if kwargs.get("page_load_timeout"):
+            self.page_load_timeout = float(kwargs.get("page_load_timeout"))
+
+        self.blocking = BlockingPolicy()
+        if isinstance(kwargs.get("blocking"), BlockingPolicy):
+            self.blocking = kwargs.get("blocking")
+        elif kwargs.get("blocking") is not None:
+            self.blocking = BlockingPolicy.from_string(kwargs.get("blocking"))
+        self.blocking_report = None
+        self.blocking_totals = Counter()
+
+        self.driver_version = None
+        if kwargs.get("driver_version"):
+            self.driver_version = kwargs.get("driver_version")
+
+        self.browser = "firefox"
+        if kwargs.get("browser"):
+            self.browser = kwargs.get("browser")
+        self.backend = get_backend(self.browser)(
+            headless=bool(self.headless),
+            timeout=self._timeout,
+            page_load_timeout=self.page_load_timeout,
+            blocking=self.blocking,
+            capture=bool(self.capture),
+            metrics=self.metrics,
+            driver_version=self.driver_version,
+        )
+        self._prebuilt = False
+
         self.no_json = None
         if kwargs.get("no_json"):
             self.no_json = kwargs.get("no_json")
@@ -181,6 +378,14 @@ class VinScrapper:
         if kwargs.get("host"):
             self.proxy = ProxySettings(**kwargs)
 
+        self.proxy_pool = None
+        if kwargs.get("proxy_pool") is not None:
+            self.proxy_pool = kwargs.get("proxy_pool")
+        elif kwargs.get("proxy_file"):
+            self.proxy_pool = ProxyPool.from_file(
+                kwargs.get("proxy_file"), alt_proxy=kwargs.get("alt_proxy", False)
+            )
+
         self.port = None
         if kwargs.get("port"):
             self.port = kwargs.get("port")
@@ -201,6 +406,27 @@ class VinScrapper:
         if kwargs.get("web_password"):
             self.web_password = kwargs.get("web_password")
 
+    def set_location(self, location):
+        """Set the location where the licence is registered.
+
+        Args:
+            location (str): Two letter state code, ie CA.
+
+        Raises:
+            RuntimeError: If the location is not one of the available locations.
+        """
+        self.location = location
+        if self._licence_plate_webstate:
+            try:
+                self._licence_plate_webstate["state"] = AVAILABLE_LOCATIONS[
+                    self.location.lower()
+                ]
+            except KeyError:
+                raise RuntimeError(
+                    f"{self.location} cannot be found in the available "
+                    f"locations: {', '.join(AVAILABLE_LOCATIONS)}"
+                )
+
     def _disable_Images_Firefox_Profile(self):
         """Summary
 
@@ -220,89 +446,52 @@ class VinScrapper:
 
     def _setup_proxy(self):
         """Simplified Firefox Proxy settings"""
-        firefox_profile = webdriver.FirefoxProfile()
-        # Direct = 0, Manual = 1, PAC = 2, AUTODETECT = 4, SYSTEM = 5
-        firefox_profile.set_preference("network.proxy.type", 1)
-        firefox_profile.set_preference("signon.autologin.proxy", True)
-        firefox_profile.set_preference("network.websocket.enabled", False)
-        firefox_profile.set_preference("network.proxy.http", self.proxy.host)
-        firefox_profile.set_preference("network.proxy.http_port", int(self.proxy.port))
-        firefox_profile.set_preference("network.proxy.ssl", self.proxy.host)
-        firefox_profile.set_preference("network.proxy.ssl_port", int(self.proxy.port))
-        firefox_profile.set_preference("network.proxy.socks", self.proxy.host)
-        firefox_profile.set_preference("network.proxy.socks_port", int(self.proxy.port))
-        # firefox_profile.set_preference("network.automatic-ntlm-auth.allow-proxies", False)
-        # firefox_profile.set_preference("network.negotiate-auth.allow-proxies", False)
-        firefox_profile.set_preference(
-            "network.proxy.no_proxies_on", "localhost, 127.0.0.1"
-        )
-        # Disable images for website to load quicker
-        firefox_profile.set_preference("permissions.default.image", 2)
-        # Disable Flash for website to load quicker
-        firefox_profile.set_preference(
-            "dom.ipc.plugins.enabled.libflashplayer.so", "false"
-        )
-        if self.proxy.username and self.proxy.password:
-            firefox_profile.set_preference(
-                "network.proxy.socks_username", self.proxy.username
-            )
-            firefox_profile.set_preference(
-                "network.proxy.socks_password", self.proxy.password
-            )
-            firefox_profile.set_preference(
-                "network.proxy.https_username", self.proxy.username
-            )
-            firefox_profile.set_preference(
-                "network.proxy.https_password", self.proxy.password
-            )
-        firefox_profile.update_preferences()
-        return firefox_profile
+        return firefox_proxy_profile(self.proxy)
+
+    def _start_driver(self, headless=False):
+        """Start a new webdriver of the session's browser backend.
+
+        With a proxy pool, a proxy is picked from the pool for the new driver and
+        kept on it as `driver.proxy_settings`. The driver and browser processes are
+        tracked in `driver.process_tracker`.
+
+        Returns:
+            Object: WebDriver
+        """
+        ProcessTracker.reap_orphans_once()
+        if self.proxy_pool is not None:
+            if not self._prebuilt:
+                self.backend.prebuild(self.proxy_pool.proxies)
+                self._prebuilt = True
+            self.proxy = self.proxy_pool.acquire()
+        driver = self.backend.start(proxy=self.proxy, headless=headless)
+        if self.replay:
+            self.traffic.install(driver, latency=self.replay_latency)
+        driver.proxy_settings = self.proxy
+        driver.process_tracker = ProcessTracker().track(driver)
+        return RecyclePolicy.started(driver)
 
     def open_site(self, headless=False):
         """Simple selenium webdriver to open a known url"""
-        options = Options()
-        options.headless = headless
-        profile = None
-
-        if self.proxy:
-            if self.proxy.seleniumwire:
-                self.logger.info(
-                    "Accessing URL using alternative proxy settings: {}", self.proxy
-                )
-                proxy_settings = f"http://{self.proxy.username}:{self.proxy.password}@{self.proxy.host}:{self.proxy.port}"
-                seleniumwire_options = {
-                    "proxy": {
-                        "http": proxy_settings,
-                        "https": proxy_settings,
-                        "socks": proxy_settings,
-                        "no_proxy": "localhost,127.0.0.1",
-                    }
-                }
-                self.driver = wirewebdriver.Firefox(executable_path=firefox_manager.GeckoDriverManager().install(),
-                    options=options,
-                    seleniumwire_options=seleniumwire_options,
-                    timeout=self._timeout,
-                )
-            else:
-                self.logger.info("Accessing URL using proxy settings: {}", self.proxy)
-                profile = self._setup_proxy()
-                self.driver = webdriver.Firefox(
-                    executable_path=firefox_manager.GeckoDriverManager().install(),
-                    options=options,
-                    firefox_profile=profile,
-                    timeout=self._timeout,
-                )
-
-        else:
-            self.driver = webdriver.Firefox(
-                executable_path=firefox_manager.GeckoDriverManager().install(),
-                options=options,
-                firefox_profile=profile,
-                timeout=self._timeout,
+        self._closed = False
+        self.invalidate_snapshot()
+        if self.pool_size and self.driver_pool is None:
+            self.driver_pool = DriverPool(
+                lambda: self._start_driver(headless=headless),
+                url=self.url,
+                size=self.pool_size,
+                recycle=self.recycle,
             )
+            self._owns_driver_pool = True
 
+        if self.driver_pool is not None:
+            self.driver = self.driver_pool.lease(timeout=self._timeout)
+            self.logger.info("Leased a warm driver on: {}", self.url)
+            return
+
+        self.driver = self._start_driver(headless=headless)
         self.logger.info("Accessing: {}", self.url)
-        self.driver.get(self.url)
+        self._load_search_page()
         self.logger.info("Successfully opened: {}", self.url)
 
     def login(self):
@@ -319,80 +508,542 @@ class VinScrapper:
         # curl 'https://www.vehiclehistory.com/graphql' \
         # --data-binary $'{"operationName":"licensePlate","variables":{"number":"","state":""},"query":"query licensePlate($number: String\u0021, $state: String\u0021) {\\n  licensePlate(number: $number, state: $state) {\\n    vin\\n    __typename\\n  }\\n}\\n"}' \
 
-        ids = [
-            i.get("id")
-            for i in self.page_source.find_all(
-                "input", attrs={"data-cy": "license-plate-txt-field"}
-            )
-        ]
+        self.wait_timings = {}
+        ids = self._wait_until(
+            self._licence_plate_input_interactable, "licence plate input interactable"
+        )
         self.logger.debug(f"Found input tag from page source: {ids}")
         for _id in ids:
             licence_plate_input = self.driver.find_element_by_id(_id)
             try:
+                licence_plate_input.clear()
                 licence_plate_input.send_keys(self.licence_number)
                 self.logger.debug(f"Sent keys: {self.licence_number} on tag id: {_id}")
             except webdriver.remote.errorhandler.ElementNotInteractableException:
                 pass
             except Exception as err:
                 raise err
-        time.sleep(1)  # Wait a second before hitting the Enter
-        # Press Enter key
-        dropdown_selector = self.driver.find_element_by_css_selector(
-            self._dropdown_css_selector
-        )
 
+        dropdown_selector = self._wait_until(
+            EC.element_to_be_clickable((By.CSS_SELECTOR, self._dropdown_css_selector)),
+            "state dropdown clickable",
+        )
         dropdown_selector.click()
-        time.sleep(1)  # Wait a second before hitting the Enter
-        if not dropdown_selector.is_displayed():
-            raise MissingPageSource("Could not select the dropdown menu.")
 
-        time.sleep(1)  # Wait a second before hitting the Enter
         dropdown_menu_table = "/html/body/div[1]/div/div/div[2]"
-        dropdown_menu = self.driver.find_element_by_xpath(dropdown_menu_table)
-        for i in range(4):
-            time.sleep(0.5)
+        try:
+            dropdown_menu = self._wait_until(
+                EC.visibility_of_element_located((By.XPATH, dropdown_menu_table)),
+                "state dropdown list rendered",
+            )
+        except exceptions.TimeoutException:
+            raise MissingPageSource("Could not select the dropdown menu.")
+
+        selected_location = self._state_option(
+            dropdown_menu, self._licence_plate_webstate["state"]
+        )
+        self._wait_until(
+            EC.element_to_be_clickable((By.ID, selected_location)),
+            "state option clickable",
+        ).click()
+
+        search_button = self._wait_until(
+            EC.element_to_be_clickable(
+                (By.CSS_SELECTOR, self._search_button_css_selector)
+            ),
+            "search button clickable",
+        )
+        search_button.click()
+
+    def _page_token(self):
+        try:
+            return self.driver.execute_script(DOM_VERSION_SCRIPT)[0]
+        except Exception:
+            return None
+
+    def _state_option(self, dropdown_menu, state):
+        """Dropdown list-item id of a state, from the map kept for this page load.
+
+        The map is built by scrolling through the whole list once per page load,
+        later plates on the same page go straight to the list-item. The list is
+        only scanned again when the item is no longer rendered.
+
+        Args:
+            dropdown_menu (WebElement): The open state dropdown list.
+            state (str): Lowercase state name, ie "california".
+
+        Returns:
+            str: The list-item id.
+        """
+        token = self._page_token()
+        if token is None or token != self._state_map_token:
+            with self.metrics.stage("state_map"):
+                self._state_map = self._build_state_map(dropdown_menu)
+            self._state_map_token = token
+        option_id = self._state_map.get(state)
+        if option_id is not None and self.driver.execute_script(
+            SHOW_OPTION_SCRIPT, option_id
+        ):
+            return option_id
+
+        # The list renders lazily, keep scrolling until the wanted state shows up.
+        def state_option_present(driver):
+            options = self.form_state()["options"]
+            self._state_map.update((label, _id) for _id, label in options.items())
+            if state in self._state_map:
+                return self._state_map[state]
+            dropdown_menu.send_keys(Keys.END)
+            return False
+
+        selected_location = self._wait_until(
+            state_option_present, "state option present"
+        )
+        dropdown_menu.send_keys(Keys.HOME)
+        return selected_location
+
+    def _build_state_map(self, dropdown_menu):
+        """Scroll through the state dropdown, returns the state -> list-item id map."""
+        states = set(AVAILABLE_LOCATIONS.values())
+        state_map = {}
+        deadline = time.perf_counter() + self.wait_timeout
+        idle = 0
+        while not states <= state_map.keys() and idle < 3:
+            options = self.form_state()["options"]
+            found = {label: option_id for option_id, label in options.items()}
+            idle = idle + 1 if found.keys() <= state_map.keys() else 0
+            state_map.update(found)
+            if time.perf_counter() > deadline:
+                break
             dropdown_menu.send_keys(Keys.END)
+            if idle:
+                time.sleep(self.poll_frequency)
         dropdown_menu.send_keys(Keys.HOME)
+        self.logger.debug(
+            "Mapped {} of {} states in the dropdown",
+            len(states & state_map.keys()),
+            len(states),
+        )
+        return state_map
+
+    def reset_search(self):
+        """Get the search form ready for the next plate.
+
+        The form is reset in place on the page the last lookup left behind, the
+        page is only reloaded after a failed lookup, when the form is gone, or with
+        `reload_page`.
+        """
+        self.invalidate_snapshot()
+        ready = False
+        if not (self.reload_page or self._page_dirty):
+            try:
+                with self.metrics.stage("form_reset"):
+                    ready = self.driver.execute_script(
+                        RESET_FORM_SCRIPT, self._vin_number_class
+                    )
+            except Exception as err:
+                self.logger.debug("Could not reset the search form: {}", err)
+        if not ready:
+            self._load_search_page()
+
+    def _load_search_page(self):
+        """Load the search page, dropping the browser if it died.
+
+        Raises:
+            WebDriverException: If the page cannot be loaded, the browser is quit so
+                the next lookup starts a fresh one, see `open_site`.
+        """
+        try:
+            with self.metrics.stage("page_load"):
+                self.driver.get(self.url)
+        except exceptions.WebDriverException as err:
+            self.logger.warning("Restarting the browser, the search page failed: {}", err)
+            self._quit_driver()
+            raise
+        self._search_url = self.driver.current_url
+        self._page_dirty = False
+
+    def return_to_search(self):
+        """Leave the result view the search switched to, if it did."""
+        try:
+            if self.driver.current_url != self._search_url:
+                with self.metrics.stage("form_reset"):
+                    self.driver.back()
+        except Exception as err:
+            self.logger.debug("Could not return to the search view: {}", err)
+            self._page_dirty = True
+
+    def _licence_plate_input_interactable(self, driver):
+        return self.form_state()["interactable"] or False
+
+    def _wait_until(self, condition, description):
+        """Wait for a condition, polling every `poll_frequency` seconds.
+
+        Args:
+            condition (callable): Expected condition, called with the driver.
+            description (str): Name used for the timing report and timeout message.
+
+        Returns:
+            The condition's truthy return value.
+
+        Raises:
+            TimeoutException: If the condition is not met within `wait_timeout`.
+        """
+        start = time.perf_counter()
+        try:
+            return WebDriverWait(
+                self.driver, self.wait_timeout, poll_frequency=self.poll_frequency
+            ).until(condition, message=f"Timed out waiting for {description}")
+        finally:
+            elapsed = time.perf_counter() - start
+            self.wait_timings[description] = elapsed
+            self.logger.debug("Waited {:.3f}s for {}", elapsed, description)
+
+    def http_lookup(self):
+        """Get vehicle details straight from the GraphQL API, without a browser.
+
+        Raises:
+            GraphQLError: If the API answers with GraphQL errors.
+        """
+        if self._http_engine is None:
+            self._http_engine = GraphQLEngine(
+                url=self.graphql_url, proxy=self.proxy, timeout=self._timeout
+            )
+        self.logger.info("Querying: {}", self.graphql_url)
+        proxy = self.proxy_pool.acquire() if self.proxy_pool is not None else None
+        start = time.perf_counter()
+        try:
+            with self.metrics.stage("http_lookup"):
+                self._http_engine.lookup(
+                    self.licence_number, self.location, self.data_structure, proxy=proxy
+                )
+            self._set_vin(self.data_structure["VIN Number"])
+        except Exception as err:
+            if proxy is not None:
+                self.proxy_pool.report(proxy, False, error=err)
+            raise
+        if proxy is not None:
+            self.proxy_pool.report(proxy, True, time.perf_counter() - start)
+
+    def lookup(self, licence_number, location, engine=None):
+        """Look up a single licence plate, reusing the current session.
+
+        Results are served from and written to the cache when one is set, see
+        `no_cache` and `refresh_cache`. The HTTP engine is tried next, a plate it
+        reports as unknown is final; selenium is only used when it fails.
+        The browser is only started on the first lookup that needs it, later
+        lookups reset the search form on the same page, so a warm page resolves
+        plate after plate without reloading, see `reset_search`. With a
+        driver pool, a warm driver is leased for the lookup and released after.
+        Lookups hitting the site hold a slot of the host's `rate_controller`.
+        Concurrent lookups of the same plate, from any session in the process,
+        share a single site lookup, see `single_flight`. Unless `no_validate` is
+        set, malformed plates are rejected before any of that and the VIN the site
+        answers with is checked and decoded, see `vin_scrapper.vin`.
+
+        Args:
+            licence_number (str): Licence plate number.
+            location (str): Two letter state code, ie CA.
+            engine (str, optional): Overrides the session's engine for this lookup.
+
+        Returns:
+            dict: A copy of the data structure for this licence plate.
+
+        Raises:
+            InvalidPlate: If the plate cannot exist in its state.
+        """
+        self.licence_number = licence_number
+        self.set_location(location)
+        if self.validate:
+            validate_plate(licence_number, location)
+        self.data_structure = DataStructure.asdict()
+        use_cache = self.cache is not None and not self.no_cache
+        if use_cache and not self.refresh_cache:
+            with self.metrics.stage("cache_lookup"):
+                cached = self.cache.get(licence_number, location)
+            if cached is not None:
+                self.logger.info("Cache hit for {} ({})", licence_number, location)
+                self.data_structure.update(cached)
+                return dict(self.data_structure)
+
+        if self.single_flight is None:
+            return self._uncached_lookup(engine, use_cache)
+        key = (self.url,) + cache_key(licence_number, location)
+        result = self.single_flight.do(key, self._uncached_lookup, engine, use_cache)
+        self.data_structure = dict(result)
+        return dict(self.data_structure)
+
+    def _uncached_lookup(self, engine=None, use_cache=False):
+        if self.rate_controller is None:
+            self._site_lookup(engine)
+        else:
+            with self.rate_controller.slot() as slot:
+                self._site_lookup(engine, slot)
+        if use_cache:
+            self.cache.put(self.licence_number, self.location, self.data_structure)
+        return dict(self.data_structure)
+
+    def _site_lookup(self, engine=None, slot=None):
+        """Look the current plate up on the site, over HTTP or with selenium.
+
+        A failed HTTP lookup is the outcome recorded by the rate controller `slot`,
+        even when selenium answers instead.
+        """
+        answered = False
+        if (engine or self.engine) == "http":
+            try:
+                self.http_lookup()
+                answered = True
+            except Exception as err:
+                if slot is not None:
+                    slot.outcome = classify(err)
+                self.logger.warning(
+                    "HTTP lookup failed ({}), falling back to selenium.", err
+                )
+        if not answered:
+            if self.driver is not None and not self._closed and self.driver_pool is None:
+                reason = self.recycle.reason(self.driver)
+                if reason is not None:
+                    self.recycle_browser(reason)
+            if self.driver is None or self._closed:
+                self.open_site(headless=bool(self.headless))
+                self.login()
+            elif self.driver_pool is None:
+                self.reset_search()
+            proxy = getattr(self.driver, "proxy_settings", None)
+            start = time.perf_counter()
+            failed = False
+            # Only this lookup's traffic should be scanned for its answer.
+            self._drain_captured()
+            try:
+                with self.metrics.stage("navigate"):
+                    self.navigate_site()
+                self.get_vehicle_details()
+                self._report_blocking()
+                if self.driver_pool is None:
+                    self.return_to_search()
+            except Exception as err:
+                failed = True
+                self._page_dirty = True
+                if self.proxy_pool is not None and proxy is not None:
+                    self.proxy_pool.report(proxy, False, error=err)
+                raise
+            else:
+                if self.proxy_pool is not None and proxy is not None:
+                    self.proxy_pool.report(proxy, True, time.perf_counter() - start)
+            finally:
+                self._lookup_done()
+                # Drop browsers stuck on a benched proxy so the next one rotates.
+                rotate = (
+                    failed
+                    and self.proxy_pool is not None
+                    and proxy is not None
+                    and self.proxy_pool.is_benched(proxy)
+                )
+                if self.driver_pool is not None:
+                    # Hand the driver back so it is reset for the next lease.
+                    if rotate:
+                        self.driver_pool.discard(self.driver)
+                    else:
+                        self.driver_pool.release(self.driver)
+                    self.driver = None
+                elif rotate:
+                    self.close_session()
+
+    def _lookup_done(self):
+        """Count the lookup against the browser and drop the traffic it captured."""
+        RecyclePolicy.served(self.driver)
+        try:
+            self._drain_captured()
+        except Exception as err:
+            self.logger.debug("Could not clear captured requests: {}", err)
 
-        # locations_dict = {
-        #     location.lower(): f"{self._dropdown_list_item}-{count}"
-        #     for count, location in enumerate(dropdown_menu.text.split("\n"))
-        # }
-
-        id_tags = [i for i in self.page_source("div") if i.get("id")]
-        id_lists = [i for i in id_tags if "list" in i.attrs.get("id")]
-        selected_location = "".join(
-            idx.attrs["id"]
-            for idx in id_lists
-            if idx.text.lower() == self._licence_plate_webstate["state"]
+    def _drain_captured(self):
+        """Drop captured requests, counting blocked ones and recording them first."""
+        if self.blocking and supports_capture(self.driver):
+            self.blocking.count(self.driver)
+        if self.record and supports_capture(self.driver):
+            self.traffic.collect(self.driver)
+        clear_captured(self.driver)
+
+    def recycle_browser(self, reason):
+        """Restart the browser between lookups, see `recycle`.
+
+        Args:
+            reason (str): Why, ie "lookups", "rss" or "age".
+        """
+        self.recycle.record(self.driver, reason)
+        with self.metrics.stage("recycle"):
+            try:
+                self._drain_captured()
+            except Exception as err:
+                self.logger.debug("Could not clear captured requests: {}", err)
+            self._quit_driver()
+
+    def _quit_driver(self):
+        """Quit the browser, then only this session's leftover processes.
+
+        A browser that already crashed cannot be closed, the error is only logged
+        and the session is left without a driver either way.
+        """
+        tracker = getattr(self.driver, "process_tracker", None)
+        if tracker is not None:
+            tracker.refresh()
+        try:
+            self.driver.close()
+            self.driver.quit()
+        except Exception as err:
+            self.logger.warning("Could not quit the browser cleanly: {}", err)
+        finally:
+            # Only this session's driver and browser, never other scrapers'.
+            if tracker is not None:
+                tracker.shutdown(deadline=self.shutdown_deadline)
+            self.driver = None
+            self._closed = True
+
+    def _report_blocking(self):
+        """Record the requests and bytes the blocking policy saved on this lookup."""
+        if not self.blocking:
+            return
+        self.blocking_report = self.blocking.report(self.driver)
+        self.blocking_totals["lookups"] += 1
+        for key in ("requests_blocked", "bytes_saved_estimate"):
+            self.blocking_totals[key] += self.blocking_report[key]
+        self.logger.debug(
+            "Blocked {requests_blocked} requests, about {bytes_saved_estimate} bytes "
+            "saved: {by_category}, the page references {resources_referenced}",
+            **self.blocking_report,
         )
 
-        location_selector = self.driver.find_element_by_id(selected_location)
-        location_selector.click()
-        time.sleep(0.5)  # Wait a second before hitting the Enter
+    def clone(self):
+        """New session with the same settings, sharing cache, pools, metrics and more."""
+        kwargs = dict(self._init_args)
+        if self.cache is not None:
+            kwargs["cache"] = self.cache
+        if self.driver_pool is not None:
+            kwargs["driver_pool"] = self.driver_pool
+        if self.proxy_pool is not None:
+            kwargs["proxy_pool"] = self.proxy_pool
+        kwargs["metrics"] = self.metrics
+        kwargs["recycle"] = self.recycle
+        if self.traffic is not None:
+            kwargs["traffic"] = self.traffic
+        return VinScrapper(**kwargs)
+
+    def lookup_many(self, pairs, concurrency=4, timeout=None):
+        """Look up many licence plates concurrently, see `vin_scrapper.aio.lookup_many`.
+
+        Usage:
+            async for result in scrapper.lookup_many(pairs, concurrency=8):
+                ...
 
-        search_button = self.driver.find_element_by_css_selector(
-            self._search_button_css_selector
+        Args:
+            pairs (iterable): (licence_number, location) pairs, sync or async.
+            concurrency (int, optional): Maximum number of sessions/lookups in flight.
+            timeout (float, optional): Seconds allowed per lookup.
+
+        Returns:
+            Async iterator of results in completion order.
+        """
+        return lookup_many(
+            self.clone, pairs, concurrency=concurrency, timeout=timeout, template=self
         )
-        search_button.click()
 
     @property
     def page_source(self):
-        """Get page source as object"""
-        self._page_source = BeautifulSoup(self.driver.page_source, "html.parser")
+        """Get page source as object, re-parsed only when the DOM changed"""
+        return self.snapshot()
+
+    def snapshot(self, refresh=False):
+        """Parse the current DOM, reusing the last parse while the DOM is unchanged.
+
+        Args:
+            refresh (bool, optional): Re-parse even if the DOM looks unchanged.
+
+        Returns:
+            Object: BeautifulSoup
+        """
+        try:
+            version = tuple(self.driver.execute_script(DOM_VERSION_SCRIPT))
+        except Exception:
+            version = None
+        if (
+            refresh
+            or version is None
+            or self._page_source is None
+            or version != self._page_source_version
+        ):
+            self._page_source = BeautifulSoup(self.driver.page_source, "html.parser")
+            self._page_source_version = version
         return self._page_source
 
+    def invalidate_snapshot(self):
+        """Drop the cached parse, ie after navigating to a new page."""
+        self._page_source = None
+        self._page_source_version = None
+
+    def form_state(self):
+        """Extract only what navigate_site needs, in a single browser round trip.
+
+        Returns:
+            dict: `inputs` and `interactable` licence plate input ids, and `options`,
+                the dropdown list-item id -> lowercase label map.
+        """
+        return self.driver.execute_script(FORM_STATE_SCRIPT)
+
     def get_vehicle_details(self):
         """Get vehicle details.
 
+        With a seleniumwire driver, ie `capture` or an alternative proxy, the VIN is
+        read from the intercepted `licensePlate` GraphQL response as soon as it
+        arrives. The rendered page is only waited for when nothing usable was
+        captured.
+
         Raises:
             MissingPageSource: If missing page source, raises error and closes browser
+            InvalidVIN: If the page keeps showing something that is not a VIN.
         """
+        if supports_capture(self.driver):
+            try:
+                with self.metrics.stage("vin_capture"):
+                    licence_plate = wait_for_licence_plate(
+                        self.driver,
+                        self.licence_number,
+                        self.location,
+                        timeout=self.wait_timeout,
+                        poll_frequency=self.poll_frequency,
+                    )
+                self._set_vin((licence_plate or {}).get("vin") or "")
+                return
+            except (CaptureMiss, InvalidVIN) as err:
+                self.logger.debug("Falling back to the page for the VIN: {}", err)
 
-        vin_number = WebDriverWait(self.driver, self._timeout).until(
-            EC.presence_of_element_located((By.CLASS_NAME, self._vin_number_class))
-        )
-        self.data_structure["VIN Number"] = vin_number.text.split()[-1]
+        with self.metrics.stage("vin_wait"):
+            vin_number = WebDriverWait(self.driver, self._timeout).until(
+                EC.presence_of_element_located((By.CLASS_NAME, self._vin_number_class))
+            )
+        vin = vin_number.text.split()[-1]
+        if self.validate and not is_valid_vin(vin):
+            # Probably caught mid-render, give the page a moment to settle.
+            def vin_rendered(driver):
+                element = driver.find_element(By.CLASS_NAME, self._vin_number_class)
+                words = element.text.split()
+                return words[-1] if words and is_valid_vin(words[-1]) else False
+
+            try:
+                vin = self._wait_until(vin_rendered, "valid VIN rendered")
+            except exceptions.TimeoutException:
+                raise InvalidVIN(f"The site answered with {vin!r}, not a VIN.")
+        self._set_vin(vin)
+
+    def _set_vin(self, vin):
+        """Store the VIN, checked and decoded unless `no_validate` is set.
+
+        Raises:
+            InvalidVIN: If it is not a valid VIN.
+        """
+        self.data_structure["VIN Number"] = vin
+        if self.validate:
+            enrich(self.data_structure)
 
     @property
     def data_as_json(self):
@@ -421,18 +1072,41 @@ class VinScrapper:
 
     def close_session(self):
         """Close browser and cleanup"""
+        if self._http_engine is not None:
+            self._http_engine.close()
+            self._http_engine = None
+        if self.cache is not None:
+            self.logger.debug("Cache stats: {}", self.cache.stats())
+        if self.single_flight is not None:
+            self.logger.debug("Coalescing stats: {}", self.single_flight.stats())
+        if self.blocking_totals:
+            self.logger.debug("Blocking stats: {}", dict(self.blocking_totals))
+        if self.recycle:
+            self.logger.info("Recycle stats: {}", self.recycle.stats())
+        if self.record:
+            if not self._closed and supports_capture(self.driver):
+                self.traffic.collect(self.driver)
+            self.traffic.save(self.record)
+        if self.replay:
+            self.logger.info("Replay stats: {}", dict(self.traffic.stats))
+            if self._owns_traffic:
+                # Clones share the replay server, the session that loaded it stops it.
+                self.traffic.close()
+        if self.driver_pool is not None:
+            if self.driver is not None and not self._closed:
+                self.driver_pool.release(self.driver)
+            self.driver = None
+            self._closed = True
+            if self._owns_driver_pool:
+                self.logger.info("Closing the driver pool...")
+                self.driver_pool.close()
+                self.driver_pool = None
+                self._owns_driver_pool = False
+            return
+        if self.driver is None:
+            return
         if not self._closed:
             self.logger.info("Closing the browser...")
-            self.driver.close()
-            self.driver.quit()
-            time.sleep(1)
-
-            PROCNAME = "geckodriver"
-            self.logger.info("Cleaning up by killing {} process", PROCNAME)
-            _ = [
-                proc.terminate()
-                for proc in psutil.process_iter()
-                if proc.name() == PROCNAME
-            ]
-            self._closed = True
+            with self.metrics.stage("close"):
+                self._quit_driver()
             self.logger.info("Done...")